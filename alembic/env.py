@@ -20,8 +20,22 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 from app.models.models import *
 from app.core.database import Base
+from app.models.search_index import SHADOW_TABLES, TRIGRAM_INDEXES
 target_metadata = Base.metadata
 
+_shadow_prefixes = tuple(shadow for shadow, _, _ in SHADOW_TABLES.values())
+_trigram_indexes = {index.name for index in TRIGRAM_INDEXES}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # FTS5 search tables (and their internal tables) are created by migrations, not models
+    if type_ == "table" and reflected and compare_to is None and name.startswith(_shadow_prefixes):
+        return False
+    # Trigram indexes only exist on PostgreSQL
+    if type_ == "index" and name in _trigram_indexes and context.get_context().dialect.name != "postgresql":
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +60,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -67,7 +82,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,40 @@
+"""add tenant scoped composite indexes
+
+Revision ID: 4b7d1e9c2a53
+Revises: 6812c0ffa6b9
+Create Date: 2026-10-18 10:12:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7d1e9c2a53'
+down_revision: Union[str, Sequence[str], None] = '6812c0ffa6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_tenant_user', 'users', ['tenant_id', 'user_id'], unique=False)
+    op.create_index('ix_roles_tenant_role', 'roles', ['tenant_id', 'role_id'], unique=False)
+    op.create_index('ix_role_user_mappings_tenant_user', 'role_user_mappings', ['tenant_id', 'user_id', 'role_id'], unique=False)
+    op.create_index('ix_role_user_mappings_tenant_role', 'role_user_mappings', ['tenant_id', 'role_id'], unique=False)
+    op.create_index('ix_app_role_mappings_tenant_product', 'app_role_mappings', ['tenant_id', 'product_id'], unique=False)
+    op.create_index('ix_app_role_mappings_tenant_role', 'app_role_mappings', ['tenant_id', 'role_id', 'product_id'], unique=False)
+    op.create_index('ix_token_usage_storage_tenant_created', 'token_usage_storage', ['tenant_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_usage_storage_tenant_created', table_name='token_usage_storage')
+    op.drop_index('ix_app_role_mappings_tenant_role', table_name='app_role_mappings')
+    op.drop_index('ix_app_role_mappings_tenant_product', table_name='app_role_mappings')
+    op.drop_index('ix_role_user_mappings_tenant_role', table_name='role_user_mappings')
+    op.drop_index('ix_role_user_mappings_tenant_user', table_name='role_user_mappings')
+    op.drop_index('ix_roles_tenant_role', table_name='roles')
+    op.drop_index('ix_users_tenant_user', table_name='users')
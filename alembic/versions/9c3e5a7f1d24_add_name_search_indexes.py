@@ -0,0 +1,85 @@
+"""add name search indexes
+
+Revision ID: 9c3e5a7f1d24
+Revises: 4b7d1e9c2a53
+Create Date: 2026-10-18 14:03:27.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e5a7f1d24'
+down_revision: Union[str, Sequence[str], None] = '4b7d1e9c2a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite: FTS5 trigram shadow tables kept in step by triggers, as of this revision.
+# Spelled out here so later changes to app/models/search_index.py can't alter history.
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_search USING fts5(product_name, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_search(rowid, product_name) VALUES (new.product_id, new.product_name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_search_ad AFTER DELETE ON products BEGIN "
+    "DELETE FROM products_search WHERE rowid = old.product_id; END",
+    "CREATE TRIGGER IF NOT EXISTS products_search_au AFTER UPDATE OF product_name ON products BEGIN "
+    "UPDATE products_search SET product_name = new.product_name WHERE rowid = old.product_id; END",
+    "INSERT INTO products_search(rowid, product_name) SELECT product_id, product_name FROM products "
+    "WHERE product_id NOT IN (SELECT rowid FROM products_search)",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS roles_search USING fts5(role_name, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS roles_search_ai AFTER INSERT ON roles BEGIN "
+    "INSERT INTO roles_search(rowid, role_name) VALUES (new.role_id, new.role_name); END",
+    "CREATE TRIGGER IF NOT EXISTS roles_search_ad AFTER DELETE ON roles BEGIN "
+    "DELETE FROM roles_search WHERE rowid = old.role_id; END",
+    "CREATE TRIGGER IF NOT EXISTS roles_search_au AFTER UPDATE OF role_name ON roles BEGIN "
+    "UPDATE roles_search SET role_name = new.role_name WHERE rowid = old.role_id; END",
+    "INSERT INTO roles_search(rowid, role_name) SELECT role_id, role_name FROM roles "
+    "WHERE role_id NOT IN (SELECT rowid FROM roles_search)",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_search USING fts5(username, email, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_search_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_search(rowid, username, email) VALUES (new.user_id, new.username, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_search_ad AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_search WHERE rowid = old.user_id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_search_au AFTER UPDATE OF username, email ON users BEGIN "
+    "UPDATE users_search SET username = new.username, email = new.email WHERE rowid = old.user_id; END",
+    "INSERT INTO users_search(rowid, username, email) SELECT user_id, username, email FROM users "
+    "WHERE user_id NOT IN (SELECT rowid FROM users_search)",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {shadow}_{suffix}"
+    for shadow in ("users_search", "roles_search", "products_search")
+    for suffix in ("au", "ad", "ai")
+] + [f"DROP TABLE IF EXISTS {shadow}" for shadow in ("users_search", "roles_search", "products_search")]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_products_name_trgm', 'products', ['product_name'], unique=False, postgresql_using='gin', postgresql_ops={'product_name': 'gin_trgm_ops'})
+        op.create_index('ix_roles_name_trgm', 'roles', ['role_name'], unique=False, postgresql_using='gin', postgresql_ops={'role_name': 'gin_trgm_ops'})
+        op.create_index('ix_users_username_trgm', 'users', ['username'], unique=False, postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+        op.create_index('ix_users_email_trgm', 'users', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        for statement in SQLITE_CREATE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_users_email_trgm', table_name='users')
+        op.drop_index('ix_users_username_trgm', table_name='users')
+        op.drop_index('ix_roles_name_trgm', table_name='roles')
+        op.drop_index('ix_products_name_trgm', table_name='products')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DROP:
+            op.execute(statement)
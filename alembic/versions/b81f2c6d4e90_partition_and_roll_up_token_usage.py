@@ -0,0 +1,129 @@
+"""partition and roll up token usage
+
+Revision ID: b81f2c6d4e90
+Revises: 9c3e5a7f1d24
+Create Date: 2026-10-18 16:21:05.331870
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f2c6d4e90'
+down_revision: Union[str, Sequence[str], None] = '9c3e5a7f1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = "id, token, tenant_id, user_id, product_id, created_at"
+# Fixed here rather than read from app code, so this revision never changes;
+# the compactor keeps creating partitions ahead from then on
+PREMAKE_DAYS = 7
+
+
+def _partition_ddl(day) -> str:
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS token_usage_storage_p{day:%Y%m%d} PARTITION OF token_usage_storage_new "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def _backfill_daily() -> None:
+    # Rows stored so far were never counted by the flush-time rollup; count
+    # them now, or pruning them would take their history with them
+    if op.get_bind().dialect.name == 'postgresql':
+        day = "(created_at AT TIME ZONE 'UTC')::date"
+    else:
+        day = "date(created_at)"
+    op.execute(
+        "INSERT INTO token_usage_daily (day, tenant_id, product_id, user_id, launches) "
+        f"SELECT {day}, tenant_id, product_id, COALESCE(user_id, 0), COUNT(*) FROM token_usage_storage "
+        "WHERE created_at IS NOT NULL AND tenant_id IS NOT NULL AND product_id IS NOT NULL "
+        f"GROUP BY {day}, tenant_id, product_id, COALESCE(user_id, 0)"
+    )
+
+
+def _partition_postgresql() -> None:
+    # Primary and unique keys of a partitioned table must include the partition key
+    op.execute("""
+        CREATE TABLE token_usage_storage_new (
+            id SERIAL,
+            token VARCHAR(255),
+            tenant_id INTEGER REFERENCES tenants (tenant_id),
+            user_id INTEGER REFERENCES users (user_id),
+            product_id INTEGER REFERENCES products (product_id),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE token_usage_storage_default PARTITION OF token_usage_storage_new DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    for offset in range(0, PREMAKE_DAYS + 1):
+        op.execute(_partition_ddl(today + timedelta(days=offset)))
+    op.execute(
+        f"INSERT INTO token_usage_storage_new ({_COLUMNS}) "
+        f"SELECT id, token, tenant_id, user_id, product_id, COALESCE(created_at, now()) FROM token_usage_storage"
+    )
+    op.execute("DROP TABLE token_usage_storage")
+    op.execute("ALTER TABLE token_usage_storage_new RENAME TO token_usage_storage")
+    op.execute("ALTER SEQUENCE token_usage_storage_new_id_seq RENAME TO token_usage_storage_id_seq")
+    op.execute("SELECT setval('token_usage_storage_id_seq', COALESCE((SELECT MAX(id) FROM token_usage_storage), 0) + 1, false)")
+    op.create_index('ix_token_usage_storage_id', 'token_usage_storage', ['id'], unique=False)
+    op.create_index('ix_token_usage_storage_token', 'token_usage_storage', ['token', 'created_at'], unique=True)
+    op.create_index('ix_token_usage_storage_tenant_created', 'token_usage_storage', ['tenant_id', 'created_at'], unique=False)
+
+
+def _unpartition_postgresql() -> None:
+    op.execute("""
+        CREATE TABLE token_usage_storage_old (
+            id SERIAL PRIMARY KEY,
+            token VARCHAR(255),
+            tenant_id INTEGER REFERENCES tenants (tenant_id),
+            user_id INTEGER REFERENCES users (user_id),
+            product_id INTEGER REFERENCES products (product_id),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute(f"INSERT INTO token_usage_storage_old ({_COLUMNS}) SELECT {_COLUMNS} FROM token_usage_storage")
+    op.execute("DROP TABLE token_usage_storage")
+    op.execute("ALTER TABLE token_usage_storage_old RENAME TO token_usage_storage")
+    op.execute("ALTER SEQUENCE token_usage_storage_old_id_seq RENAME TO token_usage_storage_id_seq")
+    op.execute("SELECT setval('token_usage_storage_id_seq', COALESCE((SELECT MAX(id) FROM token_usage_storage), 0) + 1, false)")
+    op.create_index('ix_token_usage_storage_id', 'token_usage_storage', ['id'], unique=False)
+    op.create_index('ix_token_usage_storage_token', 'token_usage_storage', ['token'], unique=True)
+    op.create_index('ix_token_usage_storage_tenant_created', 'token_usage_storage', ['tenant_id', 'created_at'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('token_usage_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('launches', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'tenant_id', 'product_id', 'user_id', name='uq_token_usage_daily_key')
+    )
+    op.create_index('ix_token_usage_daily_tenant_day', 'token_usage_daily', ['tenant_id', 'day'], unique=False)
+    _backfill_daily()
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_postgresql()
+    op.create_index('ix_token_usage_storage_created', 'token_usage_storage', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_usage_storage_created', table_name='token_usage_storage')
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_postgresql()
+
+    op.drop_index('ix_token_usage_daily_tenant_day', table_name='token_usage_daily')
+    op.drop_table('token_usage_daily')
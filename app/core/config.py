@@ -1,5 +1,6 @@
 
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,3 +18,140 @@ SMTP_USER: str = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM_EMAIL: str = os.getenv("SMTP_FROM_EMAIL", "")
 SMTP_FROM_NAME: str = os.getenv("SMTP_FROM_NAME", "Console App")
+# Set to false for a plain local relay (e.g. aiosmtpd in development)
+SMTP_START_TLS: bool = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+# Long-lived SMTP connections, one per sender task
+SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Emails waiting to be sent; beyond this requests get a 503
+EMAIL_QUEUE_MAX: int = int(os.getenv("EMAIL_QUEUE_MAX", "1000"))
+EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "1"))
+EMAIL_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("EMAIL_DRAIN_TIMEOUT_SECONDS", "10"))
+
+# Email OTPs. Wrong codes count per email across re-sends; reaching the limit
+# within the window locks the email out of both requesting and verifying.
+OTP_TTL_SECONDS: int = int(os.getenv("OTP_TTL_SECONDS", "300"))
+OTP_COOLDOWN_SECONDS: int = int(os.getenv("OTP_COOLDOWN_SECONDS", "60"))
+OTP_MAX_ATTEMPTS: int = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_ATTEMPT_WINDOW_SECONDS: int = int(os.getenv("OTP_ATTEMPT_WINDOW_SECONDS", "900"))
+OTP_LOCKOUT_SECONDS: int = int(os.getenv("OTP_LOCKOUT_SECONDS", "900"))
+# How long a verified email may be used to sign up / reset a password
+VERIFIED_EMAIL_TTL_SECONDS: int = int(os.getenv("VERIFIED_EMAIL_TTL_SECONDS", "900"))
+
+# MX checks on signup/OTP emails (cached per domain, clamped to these bounds)
+MX_CACHE_MAX_ENTRIES: int = int(os.getenv("MX_CACHE_MAX_ENTRIES", "10000"))
+MX_CACHE_MIN_SECONDS: int = int(os.getenv("MX_CACHE_MIN_SECONDS", "60"))
+MX_CACHE_MAX_SECONDS: int = int(os.getenv("MX_CACHE_MAX_SECONDS", "86400"))
+MX_NEGATIVE_CACHE_SECONDS: int = int(os.getenv("MX_NEGATIVE_CACHE_SECONDS", "300"))
+MX_LOOKUP_TIMEOUT_SECONDS: float = float(os.getenv("MX_LOOKUP_TIMEOUT_SECONDS", "3"))
+# Optional "addr,ipv4:port,[ipv6]:port,..." to use instead of the system resolvers
+MX_NAMESERVERS: str = os.getenv("MX_NAMESERVERS", "")
+# Comma-separated domains trusted to accept mail without a lookup
+MX_ALLOWLIST_EXTRA: str = os.getenv("MX_ALLOWLIST_EXTRA", "")
+
+# Session identity cache (in-process, per worker)
+SESSION_CACHE_MAX_ENTRIES: int = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+SESSION_CACHE_TTL_SECONDS: int = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_INVALIDATION_CHANNEL: str = os.getenv("SESSION_INVALIDATION_CHANNEL", "session_invalidations")
+# Stateless mode: login/refresh hand out a signed access credential as the
+# session_id, verified locally on every request; Redis is only read on
+# refresh and to share revoked (logged out / rotated) credentials.
+SESSION_STATELESS: bool = os.getenv("SESSION_STATELESS", "false").lower() == "true"
+# Rollout only: while switching to stateless mode, keep accepting plain
+# session ids issued before the switch (a refresh swaps one for a credential)
+SESSION_STATELESS_ACCEPT_BARE: bool = os.getenv("SESSION_STATELESS_ACCEPT_BARE", "false").lower() == "true"
+SESSION_REVOCATION_CHANNEL: str = os.getenv("SESSION_REVOCATION_CHANNEL", "session_revocations")
+
+# Database connection pool (applies to both the sync and the async engine)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Defaults to DATABASE_URL with the matching asyncio driver (aiosqlite/asyncpg/aiomysql)
+ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Password hashing (bcrypt runs on a dedicated thread pool, off the event loop)
+# Stored hashes with a different cost are rehashed on the next successful login.
+# Use `python -m app.core.hash_policy --target-ms 250` to pick a value for a host.
+BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Hash jobs allowed queued or running at once; beyond this requests get a 503
+PASSWORD_HASH_MAX_IN_FLIGHT: int = int(os.getenv("PASSWORD_HASH_MAX_IN_FLIGHT", "32"))
+# Bulk user imports hash on their own pool so they never queue ahead of logins
+BULK_HASH_WORKERS: int = int(os.getenv("BULK_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Login
+# Emails with no tenant/user behind them are remembered for this long so
+# repeated attempts against them skip the database
+LOGIN_NEGATIVE_CACHE_SECONDS: int = int(os.getenv("LOGIN_NEGATIVE_CACHE_SECONDS", "300"))
+
+# Per-user product entitlement index kept in Redis
+ENTITLEMENT_CACHE_SECONDS: int = int(os.getenv("ENTITLEMENT_CACHE_SECONDS", "3600"))
+
+# List endpoints (keyset pagination)
+DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# Rows fetched per round trip (and written per chunk) by ?format=ndjson exports
+EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Pre-serialized marketplace responses kept per worker
+CATALOG_CACHE_MAX_ENTRIES: int = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1024"))
+
+# Name/email search filters: auto | trigram | fts5 | memory | like
+# auto picks trigram on PostgreSQL and fts5 on SQLite when the shadow tables exist
+SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "auto")
+SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+
+# Write-behind queue for TokenUsageStorage rows
+USAGE_QUEUE_MAX: int = int(os.getenv("USAGE_QUEUE_MAX", "10000"))
+USAGE_BATCH_SIZE: int = int(os.getenv("USAGE_BATCH_SIZE", "500"))
+USAGE_FLUSH_SECONDS: float = float(os.getenv("USAGE_FLUSH_SECONDS", "1.0"))
+USAGE_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("USAGE_DRAIN_TIMEOUT_SECONDS", "10"))
+# How long a request waits for room in a full queue before getting a 503
+USAGE_ENQUEUE_TIMEOUT_SECONDS: float = float(os.getenv("USAGE_ENQUEUE_TIMEOUT_SECONDS", "2"))
+
+# token_usage_storage retention: raw rows older than this are rolled up and pruned
+USAGE_RETENTION_DAYS: int = int(os.getenv("USAGE_RETENTION_DAYS", "30"))
+USAGE_COMPACT_INTERVAL_SECONDS: int = int(os.getenv("USAGE_COMPACT_INTERVAL_SECONDS", "3600"))
+# Daily partitions created ahead of time (PostgreSQL only)
+USAGE_PARTITION_PREMAKE_DAYS: int = int(os.getenv("USAGE_PARTITION_PREMAKE_DAYS", "7"))
+USAGE_PRUNE_BATCH_SIZE: int = int(os.getenv("USAGE_PRUNE_BATCH_SIZE", "5000"))
+
+# Magic-link tokens and the product launch URLs they point at
+PRODUCT_TOKEN_TTL_SECONDS: int = int(os.getenv("PRODUCT_TOKEN_TTL_SECONDS", "10"))
+PRODUCT_CACHE_SECONDS: int = int(os.getenv("PRODUCT_CACHE_SECONDS", "3600"))
+PRODUCT_LINKS_MAX_BATCH: int = int(os.getenv("PRODUCT_LINKS_MAX_BATCH", "100"))
+
+# Bulk user import (POST /users/import)
+USER_IMPORT_MAX_ROWS: int = int(os.getenv("USER_IMPORT_MAX_ROWS", "10000"))
+USER_IMPORT_CHUNK_SIZE: int = int(os.getenv("USER_IMPORT_CHUNK_SIZE", "500"))
+
+# Bulk RBAC assignment (POST /roles/{role_id}/users and /roles/{role_id}/products)
+BULK_ASSIGN_MAX_IDS: int = int(os.getenv("BULK_ASSIGN_MAX_IDS", "5000"))
+
+# Request rate limits (GCRA in Redis, with a local pre-filter per worker).
+# Each policy allows `rate` requests per `per` seconds with bursts of up to
+# `burst`, counted per `key`: ip, email (from the JSON body), tenant (from
+# session_id) or session. path "*" matches every route. Override the whole
+# list with RATE_LIMIT_POLICIES as JSON.
+RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_POLICIES: list = json.loads(os.getenv("RATE_LIMIT_POLICIES", "null")) or [
+    {"method": "POST", "path": "/auth/login", "key": "ip", "rate": 30, "per": 60, "burst": 10},
+    {"method": "POST", "path": "/auth/login", "key": "email", "rate": 10, "per": 60, "burst": 5},
+    {"method": "POST", "path": "/auth/request-otp", "key": "ip", "rate": 10, "per": 60, "burst": 5},
+    {"method": "POST", "path": "/auth/request-otp", "key": "email", "rate": 3, "per": 300, "burst": 3},
+    {"method": "POST", "path": "/auth/verify-otp", "key": "ip", "rate": 30, "per": 60, "burst": 10},
+    {"method": "POST", "path": "/auth/forgot-password-request", "key": "ip", "rate": 10, "per": 60, "burst": 5},
+    {"method": "POST", "path": "/auth/reset-password", "key": "ip", "rate": 10, "per": 60, "burst": 5},
+    {"method": "POST", "path": "/auth/signup", "key": "ip", "rate": 10, "per": 60, "burst": 5},
+    {"method": "POST", "path": "/users/import", "key": "tenant", "rate": 5, "per": 3600, "burst": 2},
+    {"method": "*", "path": "*", "key": "tenant", "rate": 1200, "per": 60, "burst": 200},
+]
+# Broad policies spend tokens leased from Redis in batches of up to this many
+RATE_LIMIT_LEASE_MAX: int = int(os.getenv("RATE_LIMIT_LEASE_MAX", "20"))
+RATE_LIMIT_LOCAL_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))
+# Only behind a proxy that sets it; otherwise clients could pick their own IP
+RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
@@ -0,0 +1,92 @@
+import argparse
+import time
+from typing import Optional, Dict, Any
+
+import bcrypt
+
+from .config import BCRYPT_ROUNDS
+
+# bcrypt itself rejects anything outside this range
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+_stats = {"rehashed": 0}
+
+
+def current_cost() -> int:
+    return BCRYPT_ROUNDS
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Read the cost out of a modular-crypt bcrypt hash, e.g. $2b$12$..."""
+    if not hashed_password:
+        return None
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or parts[1] not in ("2a", "2b", "2y"):
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # Rehash both weaker and stronger hashes so a lowered cost is honoured too
+    return hash_cost(hashed_password) != current_cost()
+
+
+def record_rehash():
+    _stats["rehashed"] += 1
+
+
+def policy_stats() -> Dict[str, Any]:
+    return {"cost": current_cost(), **_stats}
+
+
+def _verify_ms(rounds: int, samples: int) -> float:
+    password = b"benchmark-password"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.checkpw(password, hashed)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_cost(target_ms: float = 250.0, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> Dict[str, Any]:
+    """
+    Pick the highest cost whose verify time on this host stays within target_ms.
+    Every extra round doubles the work, so we stop at the first cost over target.
+    """
+    min_rounds = max(min_rounds, MIN_ROUNDS)
+    max_rounds = min(max_rounds, MAX_ROUNDS)
+
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = round(_verify_ms(rounds, samples), 2)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+
+    return {
+        "target_ms": target_ms,
+        "recommended_rounds": chosen,
+        "verify_ms": timings,
+        "current_rounds": current_cost(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for a target verify latency on this host")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    result = benchmark_cost(args.target_ms, args.min_rounds, args.max_rounds)
+    for rounds, ms in result["verify_ms"].items():
+        print(f"rounds={rounds:<3} verify={ms} ms")
+    print(f"Recommended BCRYPT_ROUNDS={result['recommended_rounds']} (currently {result['current_rounds']})")
@@ -1,9 +1,23 @@
 import redis
+import redis.asyncio as aioredis
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 redis_host = os.getenv("REDIS_HOST", "localhost")
 redis_port = int(os.getenv("REDIS_PORT", "6379"))
+redis_max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "100"))
 
+# Sync client, only for plain `def` routes (they already run in the threadpool)
 redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+
+# Async client for everything that runs on the event loop. The blocking pool
+# makes callers wait for a free connection instead of failing under bursts.
+async_redis_pool = aioredis.BlockingConnectionPool(
+    host=redis_host,
+    port=redis_port,
+    decode_responses=True,
+    max_connections=redis_max_connections,
+    timeout=5,
+)
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
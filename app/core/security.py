@@ -1,14 +1,22 @@
+import asyncio
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Dict, Any, List
+from fastapi import HTTPException
 from jose import JWTError, jwt
 import bcrypt
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES
+from .config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_IN_FLIGHT, BULK_HASH_WORKERS
+)
+from .hash_policy import current_cost
 
 def hash_password(password: str) -> str:
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=current_cost())
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -17,6 +25,82 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(pwd_bytes, hashed_bytes)
 
+
+# bcrypt releases the GIL, so a thread pool hashes on all cores without
+# tying up the request threadpool or the event loop.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Only touched from the event loop, so a plain counter is enough
+_hash_in_flight = 0
+_hash_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "queue_wait_ms_total": 0.0,
+    "queue_wait_ms_max": 0.0,
+}
+
+
+async def _run_hash_job(fn, *args):
+    global _hash_in_flight
+    if _hash_in_flight >= PASSWORD_HASH_MAX_IN_FLIGHT:
+        _hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    submitted_at = time.perf_counter()
+
+    def job():
+        waited = time.perf_counter() - submitted_at
+        return waited, fn(*args)
+
+    _hash_in_flight += 1
+    try:
+        waited, result = await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+    finally:
+        _hash_in_flight -= 1
+
+    wait_ms = waited * 1000
+    _hash_stats["completed"] += 1
+    _hash_stats["queue_wait_ms_total"] += wait_ms
+    _hash_stats["queue_wait_ms_max"] = max(_hash_stats["queue_wait_ms_max"], wait_ms)
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash_job(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+# Separate pool for imports: thousands of hashes would otherwise sit in front
+# of every login in the shared queue (and trip the in-flight cap at once)
+_bulk_hash_executor = ThreadPoolExecutor(max_workers=BULK_HASH_WORKERS, thread_name_prefix="bcrypt-bulk")
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel, results in input order."""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*[
+        loop.run_in_executor(_bulk_hash_executor, hash_password, password)
+        for password in passwords
+    ])
+
+
+def password_hash_stats() -> Dict[str, Any]:
+    completed = _hash_stats["completed"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_in_flight": PASSWORD_HASH_MAX_IN_FLIGHT,
+        "in_flight": _hash_in_flight,
+        "completed": completed,
+        "rejected": _hash_stats["rejected"],
+        "queue_wait_ms_avg": round(_hash_stats["queue_wait_ms_total"] / completed, 3) if completed else 0.0,
+        "queue_wait_ms_max": round(_hash_stats["queue_wait_ms_max"], 3),
+    }
+
 def create_access_token(subject: str, claims: Dict[str, Any] = {}):
     jti = str(uuid.uuid4())
     now = datetime.now(timezone.utc)
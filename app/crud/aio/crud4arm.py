@@ -0,0 +1,114 @@
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.models.models import AppRoleMapping, Role, Product
+from app.schemas.app_role_mapping import AppRoleMappingCreate
+
+from typing import Optional, List
+from app.service import entitlements
+from app.utils.pagination import paginate_async
+from app.utils.upsert import insert_ignore
+from app.core.config import BULK_ASSIGN_MAX_IDS
+
+async def create_app_role_mapping(db: AsyncSession, app_role_mapping: AppRoleMappingCreate, tenant_id: int):
+    # Enforce tenant_id from session
+    mapping_data = app_role_mapping.model_dump()
+    mapping_data["tenant_id"] = tenant_id
+
+    # Verify Role exists in this Tenant
+    role = await db.scalar(select(Role).where(Role.role_id == mapping_data["role_id"], Role.tenant_id == tenant_id))
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found in this tenant")
+
+    # Find existing mapping for this PRODUCT and TENANT
+    existing_mapping = await db.scalar(select(AppRoleMapping).where(
+        AppRoleMapping.product_id == mapping_data["product_id"],
+        AppRoleMapping.tenant_id == tenant_id
+    ))
+
+    if existing_mapping:
+        # Update existing record
+        existing_mapping.role_id = mapping_data["role_id"]
+        db_app_role_mapping = existing_mapping
+    else:
+        # Create new record
+        db_app_role_mapping = AppRoleMapping(**mapping_data)
+        db.add(db_app_role_mapping)
+
+    await db.commit()
+    await db.refresh(db_app_role_mapping)
+    # Every user holding the old or the new role is affected
+    await entitlements.invalidate_tenant_async(tenant_id)
+    return db_app_role_mapping
+
+
+async def get_all_app_role_mappings(db: AsyncSession, tenant_id: int, product_id: Optional[int] = None, role_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    stmt = select(AppRoleMapping).where(AppRoleMapping.tenant_id == tenant_id)
+
+    if product_id:
+        stmt = stmt.where(AppRoleMapping.product_id == product_id)
+    if role_id:
+        stmt = stmt.where(AppRoleMapping.role_id == role_id)
+
+    return await paginate_async(db, stmt, AppRoleMapping.id, limit, cursor)
+
+async def get_app_role_mapping_by_id(db: AsyncSession, app_role_mapping_id: int, tenant_id: int):
+    return await db.scalar(select(AppRoleMapping).where(
+        AppRoleMapping.id == app_role_mapping_id,
+        AppRoleMapping.tenant_id == tenant_id
+    ))
+
+
+async def delete_app_role_mapping(db: AsyncSession, app_role_mapping_id: int, tenant_id: int):
+    db_app_role_mapping = await get_app_role_mapping_by_id(db, app_role_mapping_id, tenant_id)
+    if db_app_role_mapping is None:
+        raise HTTPException(status_code=404, detail="App role mapping not found")
+    await db.delete(db_app_role_mapping)
+    await db.commit()
+    await entitlements.invalidate_tenant_async(tenant_id)
+    return db_app_role_mapping
+
+
+async def assign_products_to_role(db: AsyncSession, role_id: int, product_ids: List[int], tenant_id: int):
+    """
+    Map many products to one role in a single transaction. Like the single
+    POST /app_role_mappings, this replaces whatever role each product was
+    mapped to in this tenant; products already on the role are left as they are.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids or len(product_ids) > BULK_ASSIGN_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {BULK_ASSIGN_MAX_IDS} product ids")
+
+    # Verify Role exists in this Tenant
+    role = await db.scalar(select(Role.role_id).where(Role.role_id == role_id, Role.tenant_id == tenant_id))
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found in this tenant")
+
+    # Verify every Product exists, in one query
+    found = set((await db.scalars(select(Product.product_id).where(Product.product_id.in_(product_ids)))).all())
+    missing = [product_id for product_id in product_ids if product_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+
+    # One role per product per tenant: drop their other mappings, then add the missing ones
+    replaced = await db.execute(delete(AppRoleMapping).where(
+        AppRoleMapping.tenant_id == tenant_id,
+        AppRoleMapping.product_id.in_(product_ids),
+        AppRoleMapping.role_id != role_id
+    ))
+    result = await db.execute(insert_ignore(
+        db.bind.dialect.name,
+        AppRoleMapping,
+        [{"product_id": product_id, "role_id": role_id, "tenant_id": tenant_id} for product_id in product_ids],
+        ["product_id", "role_id", "tenant_id"],
+    ))
+    await db.commit()
+    # Every user holding the old or the new role is affected
+    await entitlements.invalidate_tenant_async(tenant_id)
+    return {
+        "role_id": role_id,
+        "requested": len(product_ids),
+        "assigned": result.rowcount,
+        "already_assigned": len(product_ids) - result.rowcount,
+        "replaced_mappings": replaced.rowcount,
+    }
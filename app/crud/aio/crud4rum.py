@@ -0,0 +1,120 @@
+from fastapi import HTTPException
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import RoleUserMapping, User, Role
+from app.schemas.role_user_mapping import RoleUserMappingCreate
+from typing import Optional, List
+from app.service import entitlements
+from app.utils.pagination import paginate_async
+from app.utils.upsert import insert_ignore
+from app.core.config import BULK_ASSIGN_MAX_IDS
+
+async def create_role_user_mapping(db: AsyncSession, role_user_mapping: RoleUserMappingCreate, user_id: int, tenant_id: int):
+    # Enforce tenant_id from session
+    mapping_data = role_user_mapping.model_dump()
+    mapping_data["tenant_id"] = tenant_id
+    mapping_data["user_id"] = user_id
+
+    # Verify User exists in this Tenant
+    user = await db.scalar(select(User).where(User.user_id == user_id, User.tenant_id == tenant_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found in this tenant")
+
+    # Verify Role exists in this Tenant
+    role = await db.scalar(select(Role).where(Role.role_id == mapping_data["role_id"], Role.tenant_id == tenant_id))
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found in this tenant")
+
+    # Find existing mapping for this USER and TENANT
+    existing_mapping = await db.scalar(select(RoleUserMapping).where(
+        RoleUserMapping.user_id == user_id,
+        RoleUserMapping.tenant_id == tenant_id
+    ))
+
+    if existing_mapping:
+        # Update existing record
+        existing_mapping.role_id = mapping_data["role_id"]
+        db_role_user_mapping = existing_mapping
+    else:
+        # Create new record
+        db_role_user_mapping = RoleUserMapping(**mapping_data)
+        db.add(db_role_user_mapping)
+
+    await db.commit()
+    await db.refresh(db_role_user_mapping)
+    await entitlements.invalidate_user_async(tenant_id, user_id)
+    return db_role_user_mapping
+
+
+async def get_role_user_mapping_by_id(db: AsyncSession, role_user_mapping_id: int, tenant_id: int):
+    return await db.scalar(select(RoleUserMapping).where(
+        RoleUserMapping.id == role_user_mapping_id,
+        RoleUserMapping.tenant_id == tenant_id
+    ))
+
+
+async def get_all_role_user_mappings(db: AsyncSession, tenant_id: int, user_id: Optional[int] = None, role_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    stmt = select(RoleUserMapping).where(RoleUserMapping.tenant_id == tenant_id)
+
+    if user_id:
+        stmt = stmt.where(RoleUserMapping.user_id == user_id)
+    if role_id:
+        stmt = stmt.where(RoleUserMapping.role_id == role_id)
+
+    return await paginate_async(db, stmt, RoleUserMapping.id, limit, cursor)
+
+
+async def delete_role_user_mapping(db: AsyncSession, role_user_mapping_id: int, tenant_id: int):
+    db_role_user_mapping = await get_role_user_mapping_by_id(db, role_user_mapping_id, tenant_id)
+    if not db_role_user_mapping:
+        return None
+    await db.delete(db_role_user_mapping)
+    await db.commit()
+    await entitlements.invalidate_user_async(tenant_id, db_role_user_mapping.user_id)
+    return db_role_user_mapping
+
+
+async def assign_role_to_users(db: AsyncSession, role_id: int, user_ids: List[int], tenant_id: int):
+    """
+    Give many users one role in a single transaction. Like the single-user
+    POST /role_user_mappings, the role replaces whatever role each user held
+    in this tenant; users who already hold it are left as they are.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids or len(user_ids) > BULK_ASSIGN_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {BULK_ASSIGN_MAX_IDS} user ids")
+
+    # Verify Role exists in this Tenant
+    role = await db.scalar(select(Role.role_id).where(Role.role_id == role_id, Role.tenant_id == tenant_id))
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found in this tenant")
+
+    # Verify every User exists in this Tenant, in one query
+    found = set((await db.scalars(
+        select(User.user_id).where(User.tenant_id == tenant_id, User.user_id.in_(user_ids))
+    )).all())
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found in this tenant: {missing}")
+
+    # One role per user per tenant: drop their other mappings, then add the missing ones
+    replaced = await db.execute(delete(RoleUserMapping).where(
+        RoleUserMapping.tenant_id == tenant_id,
+        RoleUserMapping.user_id.in_(user_ids),
+        RoleUserMapping.role_id != role_id
+    ))
+    result = await db.execute(insert_ignore(
+        db.bind.dialect.name,
+        RoleUserMapping,
+        [{"user_id": user_id, "role_id": role_id, "tenant_id": tenant_id} for user_id in user_ids],
+        ["user_id", "role_id", "tenant_id"],
+    ))
+    await db.commit()
+    await entitlements.invalidate_users_async(tenant_id, user_ids)
+    return {
+        "role_id": role_id,
+        "requested": len(user_ids),
+        "assigned": result.rowcount,
+        "already_assigned": len(user_ids) - result.rowcount,
+        "replaced_mappings": replaced.rowcount,
+    }
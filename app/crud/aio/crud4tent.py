@@ -0,0 +1,87 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.models import User, RoleUserMapping
+from app.schemas.user import UserCreate
+from fastapi import HTTPException
+from app.core.security import hash_password_async
+from app.service import login_identity, entitlements
+from typing import Optional
+from app.utils.pagination import paginate_async, paginate_ranked_async
+from app.service import search
+
+async def get_user_by_id(db: AsyncSession, user_id: int, tenant_id: int):
+    return await db.scalar(select(User).where(User.user_id == user_id, User.tenant_id == tenant_id))
+
+async def create_user(db: AsyncSession, user: UserCreate, tenant_id: int):
+    # Check if email is already taken in this tenant
+    existing_user = await db.scalar(select(User).where(User.email == user.email, User.tenant_id == tenant_id))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="User with this email already exists in this tenant")
+
+    hashed_password = await hash_password_async(user.password)
+    db_user = User(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password,
+        tenant_id=tenant_id,
+        is_active=True,
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await login_identity.forget_unknown_email(db_user.email)
+    return db_user
+
+
+async def delete_user(db: AsyncSession, user_id: int, tenant_id: int):
+    # Cascaded collections must be loaded up front, async sessions can't lazy load
+    user = await db.scalar(
+        select(User)
+        .options(selectinload(User.user_roles))
+        .where(User.user_id == user_id, User.tenant_id == tenant_id)
+    )
+    if not user:
+        return None
+    await db.delete(user)
+    await db.commit()
+    await entitlements.invalidate_user_async(tenant_id, user_id)
+    return user
+
+async def get_all_users(db: AsyncSession, tenant_id: int, name: Optional[str] = None, email: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    stmt = (
+        select(User)
+        .options(
+            selectinload(User.user_roles)
+            .selectinload(RoleUserMapping.role)
+        )
+        .where(User.tenant_id == tenant_id)
+    )
+
+    ranked = await search.ranked_ids_async(
+        db,
+        {"username": name, "email": email},
+        within=select(User.user_id).where(User.tenant_id == tenant_id)
+    )
+    if ranked is not None:
+        users, next_cursor = await paginate_ranked_async(db, stmt, User.user_id, ranked, limit, cursor)
+    else:
+        users, next_cursor = await paginate_async(db, stmt, User.user_id, limit, cursor)
+
+    result = [
+        {
+            "user_id": user.user_id,
+            "username": user.username,
+            "email": user.email,
+            "is_active": user.is_active,
+            "tenant_id": user.tenant_id,
+            # Get unique role names, filtering to ensure we only get roles for THIS tenant
+            "roles": list(set([
+                mapping.role.role_name
+                for mapping in user.user_roles
+                if mapping.role and mapping.role.tenant_id == tenant_id
+            ]))
+        }
+        for user in users
+    ]
+    return result, next_cursor
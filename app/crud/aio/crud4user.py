@@ -0,0 +1,39 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import User
+from app.schemas.user import UserUpdate
+from app.core.security import hash_password_async, verify_password_async
+from fastapi import HTTPException
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email).limit(1))
+
+
+async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate, tenant_id: int):
+    db_user = await get_user(db, user_id, tenant_id)
+    if not db_user:
+        return None
+
+    update_data = user_update.model_dump(exclude_unset=True)
+
+    if "password" in update_data and update_data["password"]:
+        if "old_password" not in update_data or not update_data["old_password"]:
+            raise HTTPException(status_code=400, detail="Current password is required to set a new password")
+
+        if not await verify_password_async(update_data.pop("old_password"), db_user.hashed_password):
+            raise HTTPException(status_code=400, detail="Invalid current password")
+
+        update_data["hashed_password"] = await hash_password_async(update_data.pop("password"))
+    elif "old_password" in update_data:
+        update_data.pop("old_password")
+
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_user(db: AsyncSession, user_id: int, tenant_id: int):
+    return await db.scalar(select(User).where(User.user_id == user_id, User.tenant_id == tenant_id))
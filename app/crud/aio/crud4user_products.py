@@ -0,0 +1,15 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Product
+from app.service import entitlements
+from typing import List
+
+async def get_user_products(db: AsyncSession, user_id: int, tenant_id: int) -> List[Product]:
+    product_ids = await entitlements.user_product_ids_async(db, tenant_id, user_id)
+    if not product_ids:
+        return []
+    stmt = select(Product).where(Product.product_id.in_(product_ids)).order_by(Product.product_id)
+    return (await db.scalars(stmt)).all()
+
+async def check_user_product_access(db: AsyncSession, user_id: int, tenant_id: int, product_id: int) -> bool:
+    return await entitlements.has_product_access_async(db, tenant_id, user_id, product_id)
@@ -0,0 +1,89 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.models import Product, TenantProductMapping
+from typing import Optional, List, Dict
+from app.utils.pagination import paginate_async, paginate_ranked_async
+from app.service import search
+from app.service import catalog, product_auth, entitlements
+
+
+async def get_all_products(db: AsyncSession, product_name: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    stmt = select(Product)
+
+    # Filter by product_name if provided (case-insensitive, partial match, best match first)
+    ranked = await search.ranked_ids_async(db, {"product_name": product_name})
+    if ranked is not None:
+        return await paginate_ranked_async(db, stmt, Product.product_id, ranked, limit, cursor)
+
+    return await paginate_async(db, stmt, Product.product_id, limit, cursor)
+
+async def get_product_by_id(db: AsyncSession, product_id: int):
+    return await db.get(Product, product_id)
+
+
+async def get_tenant_products(db: AsyncSession, tenant_id: int, product_name: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Get all products that a tenant has subscribed to via TenantProductMapping.
+    Returns products WITH launch_url for authorized access.
+    """
+    stmt = select(Product).join(
+        TenantProductMapping,
+        Product.product_id == TenantProductMapping.product_id
+    ).where(
+        TenantProductMapping.tenant_id == tenant_id
+    )
+
+    ranked = await search.ranked_ids_async(
+        db,
+        {"product_name": product_name},
+        within=select(TenantProductMapping.product_id).where(TenantProductMapping.tenant_id == tenant_id)
+    )
+    if ranked is not None:
+        return await paginate_ranked_async(db, stmt, Product.product_id, ranked, limit, cursor)
+
+    return await paginate_async(db, stmt, Product.product_id, limit, cursor)
+
+
+async def get_tenant_product_by_id(db: AsyncSession, tenant_id: int, product_id: int):
+    """
+    Get a specific product if tenant has access via TenantProductMapping.
+    Returns None if tenant doesn't have access.
+    """
+    return await db.scalar(select(Product).join(
+        TenantProductMapping,
+        Product.product_id == TenantProductMapping.product_id
+    ).where(
+        TenantProductMapping.tenant_id == tenant_id,
+        Product.product_id == product_id
+    ))
+
+
+async def get_tenant_launch_urls(db: AsyncSession, tenant_id: int, product_ids: List[int]) -> Dict[int, str]:
+    """Launch URLs of the given products this tenant is subscribed to, in one query."""
+    rows = (await db.execute(
+        select(Product.product_id, Product.launch_url)
+        .join(TenantProductMapping, Product.product_id == TenantProductMapping.product_id)
+        .where(TenantProductMapping.tenant_id == tenant_id, Product.product_id.in_(product_ids))
+    )).all()
+    return dict(rows)
+
+
+async def delete_product(db: AsyncSession, product_id: int):
+    # Cascaded collections must be loaded up front, async sessions can't lazy load
+    product = await db.scalar(
+        select(Product)
+        .options(selectinload(Product.tenant_mappings), selectinload(Product.app_roles))
+        .where(Product.product_id == product_id)
+    )
+    if not product:
+        return None
+    # Tenants whose roles granted it; their cached entitlement sets still list it
+    tenant_ids = {mapping.tenant_id for mapping in product.app_roles}
+    await db.delete(product)
+    await db.commit()
+    await catalog.bump_version_async()
+    await product_auth.forget_product_async(product_id, deleted=True)
+    for tenant_id in tenant_ids:
+        await entitlements.invalidate_tenant_async(tenant_id)
+    return product
@@ -4,6 +4,8 @@ from app.models.models import AppRoleMapping, Role
 from app.schemas.app_role_mapping import AppRoleMappingCreate,AppRoleMappingInDBBase
 
 from typing import Optional
+from app.service import entitlements
+from app.utils.pagination import paginate
 
 def create_app_role_mapping(db: Session, app_role_mapping: AppRoleMappingCreate, tenant_id: int):
     # Enforce tenant_id from session
@@ -32,10 +34,12 @@ def create_app_role_mapping(db: Session, app_role_mapping: AppRoleMappingCreate,
 
     db.commit()
     db.refresh(db_app_role_mapping)
+    # Every user holding the old or the new role is affected
+    entitlements.invalidate_tenant(tenant_id)
     return db_app_role_mapping
 
 
-def get_all_app_role_mappings(db: Session, tenant_id: int, product_id: Optional[int] = None, role_id: Optional[int] = None):
+def get_all_app_role_mappings(db: Session, tenant_id: int, product_id: Optional[int] = None, role_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(AppRoleMapping).filter(AppRoleMapping.tenant_id == tenant_id)
     
     if product_id:
@@ -43,7 +47,7 @@ def get_all_app_role_mappings(db: Session, tenant_id: int, product_id: Optional[
     if role_id:
         query = query.filter(AppRoleMapping.role_id == role_id)
         
-    return query.all()
+    return paginate(query, AppRoleMapping.id, limit, cursor)
 
 def get_app_role_mapping_by_id(db: Session, app_role_mapping_id: int, tenant_id: int):
     return db.query(AppRoleMapping).filter(
@@ -61,4 +65,5 @@ def delete_app_role_mapping(db: Session, app_role_mapping_id: int, tenant_id: in
         raise HTTPException(status_code=404, detail="App role mapping not found")
     db.delete(db_app_role_mapping)
     db.commit()
+    entitlements.invalidate_tenant(tenant_id)
     return db_app_role_mapping
@@ -3,21 +3,27 @@ from app.models.models import Role
 from app.schemas.role import RoleInDBBase, RoleCreate, RoleUpdate
 from fastapi import HTTPException
 from typing import Optional
+from app.service import entitlements
+from app.utils.pagination import paginate, paginate_ranked
+from app.service import search
+from sqlalchemy import select
 
 
 def get_role_by_id(db: Session, role_id: int, tenant_id: int):
     return db.query(Role).filter(Role.role_id == role_id, Role.tenant_id == tenant_id).first()
 
-def get_all_roles(db: Session, tenant_id: int = None, role_name: Optional[str] = None):
+def get_all_roles(db: Session, tenant_id: int = None, role_name: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(Role)
     if tenant_id:
         query = query.filter(Role.tenant_id == tenant_id)
     
-    # Filter by role_name if provided (case-insensitive, partial match)
-    if role_name:
-        query = query.filter(Role.role_name.ilike(f"%{role_name}%"))
+    # Filter by role_name if provided (case-insensitive, partial match, best match first)
+    within = select(Role.role_id).where(Role.tenant_id == tenant_id) if tenant_id else None
+    ranked = search.ranked_ids(db, {"role_name": role_name}, within=within)
+    if ranked is not None:
+        return paginate_ranked(query, Role.role_id, ranked, limit, cursor)
     
-    return query.all()
+    return paginate(query, Role.role_id, limit, cursor)
 
 def create_role(db: Session, role: RoleCreate, tenant_id: int):
     # Check if role name already exists in this tenant
@@ -55,4 +61,6 @@ def delete_role(db: Session, role_id: int, tenant_id: int):
         return None
     db.delete(db_role)
     db.commit()
+    # Role and product mappings of the role went with it
+    entitlements.invalidate_tenant(tenant_id)
     return db_role
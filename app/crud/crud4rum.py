@@ -3,6 +3,8 @@ from app.models.models import RoleUserMapping, User, Role
 from app.schemas.role_user_mapping import RoleUserMappingCreate
 from sqlalchemy.orm import Session
 from typing import Optional
+from app.service import entitlements
+from app.utils.pagination import paginate
 
 def create_role_user_mapping(db: Session, role_user_mapping: RoleUserMappingCreate, user_id: int, tenant_id: int):
     # Enforce tenant_id from session
@@ -37,6 +39,7 @@ def create_role_user_mapping(db: Session, role_user_mapping: RoleUserMappingCrea
 
     db.commit()
     db.refresh(db_role_user_mapping)
+    entitlements.invalidate_user(tenant_id, user_id)
     return db_role_user_mapping
 
 
@@ -47,7 +50,7 @@ def get_role_user_mapping_by_id(db: Session, role_user_mapping_id: int, tenant_i
     ).first()
 
 
-def get_all_role_user_mappings(db: Session, tenant_id: int, user_id: Optional[int] = None, role_id: Optional[int] = None):
+def get_all_role_user_mappings(db: Session, tenant_id: int, user_id: Optional[int] = None, role_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(RoleUserMapping).filter(RoleUserMapping.tenant_id == tenant_id)
     
     if user_id:
@@ -56,7 +59,7 @@ def get_all_role_user_mappings(db: Session, tenant_id: int, user_id: Optional[in
         query = query.filter(RoleUserMapping.role_id == role_id)
     
         
-    return query.all()
+    return paginate(query, RoleUserMapping.id, limit, cursor)
 
 
 
@@ -70,4 +73,5 @@ def delete_role_user_mapping(db: Session, role_user_mapping_id: int, tenant_id:
         return None
     db.delete(db_role_user_mapping)
     db.commit()
+    entitlements.invalidate_user(tenant_id, db_role_user_mapping.user_id)
     return db_role_user_mapping
@@ -5,6 +5,9 @@ from app.schemas.tenant import TenantInDBBase
 from app.schemas.tenant_product_map import TenantProductMapInDBBase
 from sqlalchemy.orm import Session
 from typing import Optional, List
+from sqlalchemy import select
+from app.utils.pagination import paginate
+from app.core.config import EXPORT_BATCH_SIZE
 
 
 def create_super_admin(db: Session, schema: SuperAdminCreate):
@@ -36,11 +39,30 @@ def update_super_admin(db: Session, super_admin_id: int, super_admin: SuperAdmin
     db.refresh(db_super_admin)
     return db_super_admin
 
-def get_all_tenant(db: Session):
-    return db.query(Tenant).all()
+def get_all_tenant(db: Session, limit: Optional[int] = None, cursor: Optional[str] = None):
+    return paginate(db.query(Tenant), Tenant.tenant_id, limit, cursor)
 
-def get_product_mappings_for_a_tenant(db: Session, tenant_id: Optional[int] = None):
+def get_product_mappings_for_a_tenant(db: Session, tenant_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(TenantProductMapping)
     if tenant_id:
         query = query.filter(TenantProductMapping.tenant_id == tenant_id)
-    return query.all()
\ No newline at end of file
+    return paginate(query, TenantProductMapping.id, limit, cursor)
+
+def _export_columns(model, schema):
+    # Only the columns the API exposes, as plain rows rather than ORM objects
+    return [getattr(model, field) for field in schema.model_fields]
+
+def stream_tenants(db: Session):
+    stmt = (
+        select(*_export_columns(Tenant, TenantInDBBase))
+        .order_by(Tenant.tenant_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    return db.execute(stmt)
+
+def stream_product_mappings(db: Session, tenant_id: Optional[int] = None):
+    stmt = select(*_export_columns(TenantProductMapping, TenantProductMapInDBBase))
+    if tenant_id:
+        stmt = stmt.where(TenantProductMapping.tenant_id == tenant_id)
+    stmt = stmt.order_by(TenantProductMapping.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return db.execute(stmt)
@@ -2,6 +2,10 @@ from app.models.models import User, RoleUserMapping, Role
 from app.schemas.user import UserCreate, UserUpdate
 from fastapi import HTTPException
 from app.core.security import hash_password
+from app.service import login_identity, entitlements
+from app.utils.pagination import paginate, paginate_ranked
+from app.service import search
+from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload, joinedload
 from typing import Optional, List, Dict, Any
 
@@ -25,6 +29,7 @@ def create_user(db: Session, user: UserCreate, tenant_id: int):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    login_identity.forget_unknown_email_sync(db_user.email)
     return db_user
 
 
@@ -36,9 +41,10 @@ def delete_user(db: Session, user_id: int, tenant_id: int):
         return None
     db.delete(user)
     db.commit()
+    entitlements.invalidate_user(tenant_id, user_id)
     return user
 
-def get_all_users(db: Session, tenant_id: int, name: Optional[str] = None, email: Optional[str] = None):
+def get_all_users(db: Session, tenant_id: int, name: Optional[str] = None, email: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = (
         db.query(User)
         .options(
@@ -48,13 +54,15 @@ def get_all_users(db: Session, tenant_id: int, name: Optional[str] = None, email
         .filter(User.tenant_id == tenant_id)
     )
     
-    if name:
-        query = query.filter(User.username.ilike(f"%{name}%"))
-    
-    if email:
-        query = query.filter(User.email.ilike(f"%{email}%"))
-
-    users = query.all()
+    ranked = search.ranked_ids(
+        db,
+        {"username": name, "email": email},
+        within=select(User.user_id).where(User.tenant_id == tenant_id)
+    )
+    if ranked is not None:
+        users, next_cursor = paginate_ranked(query, User.user_id, ranked, limit, cursor)
+    else:
+        users, next_cursor = paginate(query, User.user_id, limit, cursor)
 
     # Optimized aggregation using list comprehension
     result = []
@@ -73,4 +81,4 @@ def get_all_users(db: Session, tenant_id: int, name: Optional[str] = None, email
             ]))
         })
 
-    return result
\ No newline at end of file
+    return result, next_cursor
\ No newline at end of file
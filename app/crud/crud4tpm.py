@@ -5,13 +5,15 @@ from app.schemas.tenant_product_map import TenantProductMapInDBBase, TenantProdu
 
 
 from typing import Optional
+from app.service import entitlements
+from app.utils.pagination import paginate
 
 
-def get_all_tenant_product_maps(db: Session, tenant_id: int, product_id: Optional[int] = None):
+def get_all_tenant_product_maps(db: Session, tenant_id: int, product_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(TenantProductMapping).filter(TenantProductMapping.tenant_id == tenant_id)
     if product_id:
         query = query.filter(TenantProductMapping.product_id == product_id)
-    return query.all()
+    return paginate(query, TenantProductMapping.id, limit, cursor)
 
 
 def get_tenant_product_map_by_id(db: Session, tenant_product_map_id: int, tenant_id: int):
@@ -41,6 +43,7 @@ def create_tenant_product_map(db: Session, tenant_product_map: TenantProductMapC
     db.add(db_tenant_product_map)
     db.commit()
     db.refresh(db_tenant_product_map)
+    entitlements.invalidate_tenant(tenant_id)
     return db_tenant_product_map
 
 
@@ -52,5 +55,6 @@ def delete_tenant_product_map(db: Session, tenant_product_map_id: int, tenant_id
     if db_tenant_product_map:
         db.delete(db_tenant_product_map)
         db.commit()
+        entitlements.invalidate_tenant(tenant_id)
     return db_tenant_product_map
 
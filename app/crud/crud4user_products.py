@@ -1,32 +1,18 @@
 from sqlalchemy.orm import Session
-from app.models.models import RoleUserMapping, AppRoleMapping, Product
+from app.models.models import Product
+from app.service import entitlements
 from typing import List
 
 def get_user_products(db: Session, user_id: int, tenant_id: int) -> List[Product]:
+    product_ids = entitlements.user_product_ids(db, tenant_id, user_id)
+    if not product_ids:
+        return []
     return (
         db.query(Product)
-        .join(AppRoleMapping, AppRoleMapping.product_id == Product.product_id)
-        .join(RoleUserMapping, RoleUserMapping.role_id == AppRoleMapping.role_id)
-        .filter(
-            RoleUserMapping.user_id == user_id,
-            RoleUserMapping.tenant_id == tenant_id,
-            AppRoleMapping.tenant_id == tenant_id
-        )
-        .distinct()
+        .filter(Product.product_id.in_(product_ids))
+        .order_by(Product.product_id)
         .all()
     )
 
 def check_user_product_access(db: Session, user_id: int, tenant_id: int, product_id: int) -> bool:
-    count = (
-        db.query(Product.product_id)
-        .join(AppRoleMapping, AppRoleMapping.product_id == Product.product_id)
-        .join(RoleUserMapping, RoleUserMapping.role_id == AppRoleMapping.role_id)
-        .filter(
-            RoleUserMapping.user_id == user_id,
-            RoleUserMapping.tenant_id == tenant_id,
-            AppRoleMapping.tenant_id == tenant_id,
-            Product.product_id == product_id
-        )
-        .count()
-    )
-    return count > 0
+    return entitlements.has_product_access(db, tenant_id, user_id, product_id)
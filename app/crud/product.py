@@ -3,22 +3,27 @@ from app.models.models import Product, TenantProductMapping
 from app.schemas.product import ProductInDBBase, ProductCreate, ProductUpdate
 from fastapi import HTTPException
 from typing import Optional
+from app.utils.pagination import paginate, paginate_ranked
+from app.service import search
+from sqlalchemy import select
+from app.service import catalog, product_auth, entitlements
 
 
-def get_all_products(db: Session, product_name: Optional[str] = None):
+def get_all_products(db: Session, product_name: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(Product)
     
-    # Filter by product_name if provided (case-insensitive, partial match)
-    if product_name:
-        query = query.filter(Product.product_name.ilike(f"%{product_name}%"))
+    # Filter by product_name if provided (case-insensitive, partial match, best match first)
+    ranked = search.ranked_ids(db, {"product_name": product_name})
+    if ranked is not None:
+        return paginate_ranked(query, Product.product_id, ranked, limit, cursor)
     
-    return query.all()
+    return paginate(query, Product.product_id, limit, cursor)
 
 def get_product_by_id(db: Session, product_id: int):
     return db.query(Product).filter(Product.product_id == product_id).first()
 
 
-def get_tenant_products(db: Session, tenant_id: int, product_name: Optional[str] = None):
+def get_tenant_products(db: Session, tenant_id: int, product_name: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     """
     Get all products that a tenant has subscribed to via TenantProductMapping.
     Returns products WITH launch_url for authorized access.
@@ -30,10 +35,15 @@ def get_tenant_products(db: Session, tenant_id: int, product_name: Optional[str]
         TenantProductMapping.tenant_id == tenant_id
     )
     
-    if product_name:
-        query = query.filter(Product.product_name.ilike(f"%{product_name}%"))
+    ranked = search.ranked_ids(
+        db,
+        {"product_name": product_name},
+        within=select(TenantProductMapping.product_id).where(TenantProductMapping.tenant_id == tenant_id)
+    )
+    if ranked is not None:
+        return paginate_ranked(query, Product.product_id, ranked, limit, cursor)
     
-    return query.all()
+    return paginate(query, Product.product_id, limit, cursor)
 
 
 def get_tenant_product_by_id(db: Session, tenant_id: int, product_id: int):
@@ -59,7 +69,9 @@ def create_product(schema: ProductCreate, db: Session):
     product = Product(product_name=schema.product_name, price=schema.price, product_logo=schema.product_logo, product_description=schema.product_description, launch_url=schema.launch_url, sub_mode=schema.sub_mode)
     db.add(product)
     db.commit()
+    catalog.bump_version()
     db.refresh(product)
+    product_auth.forget_product(product.product_id)
     return product
 
 def update_product(schema: ProductUpdate, db: Session, product_id: int):
@@ -79,13 +91,21 @@ def update_product(schema: ProductUpdate, db: Session, product_id: int):
         setattr(product, key, value)
 
     db.commit()
+    catalog.bump_version()
     db.refresh(product)
+    product_auth.forget_product(product.product_id)
     return product
 
 def delete_product(db: Session, product_id: int):
     product = db.query(Product).filter(Product.product_id == product_id).first()
     if not product:
         return None
+    # Tenants whose roles granted it; their cached entitlement sets still list it
+    tenant_ids = {mapping.tenant_id for mapping in product.app_roles}
     db.delete(product)
     db.commit()
+    catalog.bump_version()
+    product_auth.forget_product(product_id, deleted=True)
+    for tenant_id in tenant_ids:
+        entitlements.invalidate_tenant(tenant_id)
     return product
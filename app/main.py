@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import HTTPException
@@ -8,13 +9,35 @@ from app.router import market as market_router
 from app.router import userpurpose as userpurpose_router
 from app.router import getlink as getlink_router
 from app.router import superadmin as superadmin_router
-from app.core.database import engine, Base
+from app.core.database import engine, Base, dispose_async_engine
+from app.core.redis import async_redis_client
+from app.core.config import SESSION_STATELESS
+from app.utils import session_cache, session_revocation
+from app.utils.rate_limit import RateLimitMiddleware
+from app.service import usage_writer, usage_retention, mailer
 
 from .models import models
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Console API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_cache.start_listener()
+    if SESSION_STATELESS:
+        session_revocation.start_listener()
+    usage_writer.start_writer()
+    usage_retention.start_compactor()
+    mailer.start_mailer()
+    yield
+    await mailer.stop_mailer()
+    await usage_retention.stop_compactor()
+    await usage_writer.stop_writer()
+    await session_revocation.stop_listener()
+    await session_cache.stop_listener()
+    await async_redis_client.aclose()
+    await dispose_async_engine()
+
+app = FastAPI(title="Console API", lifespan=lifespan)
 
 @app.get("/")
 async def root():
@@ -28,9 +51,13 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "status": "error",
             "message": exc.detail,
             "data": None
-        }
+        },
+        headers=exc.headers
     )
 
+# Rate limiting sits inside CORS so 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # CORS
 origins = ["*"]
 app.add_middleware(
@@ -6,7 +6,9 @@ from sqlalchemy import (
     ForeignKey,
     Boolean,
     UniqueConstraint,
-    DateTime
+    DateTime,
+    Date,
+    Index
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -50,6 +52,7 @@ class User(Base):
 
     __table_args__ = (
         UniqueConstraint("email", "tenant_id", name="uq_user_email_tenant"),
+        Index("ix_users_tenant_user", "tenant_id", "user_id"),
     )
 
     tenant = relationship("Tenant", back_populates="users")
@@ -65,6 +68,7 @@ class Role(Base):
 
     __table_args__ = (
         UniqueConstraint("role_name", "tenant_id", name="uq_role_tenant"),
+        Index("ix_roles_tenant_role", "tenant_id", "role_id"),
     )
 
     tenant = relationship("Tenant", back_populates="roles")
@@ -82,6 +86,8 @@ class RoleUserMapping(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "role_id", "tenant_id", name="uq_user_role_tenant"),
+        Index("ix_role_user_mappings_tenant_user", "tenant_id", "user_id", "role_id"),
+        Index("ix_role_user_mappings_tenant_role", "tenant_id", "role_id"),
     )
 
     tenant = relationship("Tenant")
@@ -137,6 +143,8 @@ class AppRoleMapping(Base):
             "tenant_id",
             name="uq_app_role_tenant"
         ),
+        Index("ix_app_role_mappings_tenant_product", "tenant_id", "product_id"),
+        Index("ix_app_role_mappings_tenant_role", "tenant_id", "role_id", "product_id"),
     )
 
     product = relationship("Product", back_populates="app_roles")
@@ -154,6 +162,35 @@ class TokenUsageStorage(Base):
     product_id = Column(Integer, ForeignKey("products.product_id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_token_usage_storage_tenant_created", "tenant_id", "created_at"),
+        # Retention prunes by age alone
+        Index("ix_token_usage_storage_created", "created_at"),
+    )
+
     tenant = relationship("Tenant")
     user = relationship("User")
-    product = relationship("Product")
\ No newline at end of file
+    product = relationship("Product")
+
+
+class TokenUsageDaily(Base):
+    """Launch counts rolled up from token_usage_storage, kept after raw rows expire."""
+    __tablename__ = "token_usage_daily"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    # No foreign keys: history outlives deleted tenants, users and products
+    tenant_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    # 0 for launches by the tenant owner, who has no user row
+    user_id = Column(Integer, nullable=False, default=0)
+    launches = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "tenant_id", "product_id", "user_id", name="uq_token_usage_daily_key"),
+        Index("ix_token_usage_daily_tenant_day", "tenant_id", "day"),
+    )
+
+
+# Registers the search indexes against the tables above
+from . import search_index  # noqa: E402,F401
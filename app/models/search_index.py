@@ -0,0 +1,59 @@
+"""
+Database-side indexes for the name/email search filters (see app/service/search.py).
+
+PostgreSQL: GIN trigram indexes, which serve ILIKE '%term%' and similarity().
+SQLite: FTS5 shadow tables using the trigram tokenizer, kept in step with
+their source table by triggers. rowid is the source table's primary key.
+"""
+from sqlalchemy import DDL, Index, event
+from ..core.database import Base
+from .models import Product, Role, User
+
+# source table -> (shadow table, primary key, searchable columns)
+SHADOW_TABLES = {
+    "products": ("products_search", "product_id", ["product_name"]),
+    "roles": ("roles_search", "role_id", ["role_name"]),
+    "users": ("users_search", "user_id", ["username", "email"]),
+}
+
+TRIGRAM_INDEXES = [
+    Index("ix_products_name_trgm", Product.product_name, postgresql_using="gin", postgresql_ops={"product_name": "gin_trgm_ops"}),
+    Index("ix_roles_name_trgm", Role.role_name, postgresql_using="gin", postgresql_ops={"role_name": "gin_trgm_ops"}),
+    Index("ix_users_username_trgm", User.username, postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+    Index("ix_users_email_trgm", User.email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+]
+for _index in TRIGRAM_INDEXES:
+    _index.ddl_if(dialect="postgresql")
+
+
+def sqlite_create_statements(table: str):
+    shadow, key, columns = SHADOW_TABLES[table]
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    assignments = ", ".join(f"{c} = new.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {shadow} USING fts5({cols}, tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {shadow}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {shadow}(rowid, {cols}) VALUES (new.{key}, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {shadow}_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {shadow} WHERE rowid = old.{key}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {shadow}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"UPDATE {shadow} SET {assignments} WHERE rowid = old.{key}; END",
+        # Backfill rows that existed before the shadow table
+        f"INSERT INTO {shadow}(rowid, {cols}) SELECT {key}, {cols} FROM {table} "
+        f"WHERE {key} NOT IN (SELECT rowid FROM {shadow})",
+    ]
+
+
+def sqlite_drop_statements(table: str):
+    shadow = SHADOW_TABLES[table][0]
+    return [f"DROP TRIGGER IF EXISTS {shadow}_{suffix}" for suffix in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {shadow}"
+    ]
+
+
+# create_all() path; Alembic-managed databases get the same objects from a migration
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+for _model in (Product, Role, User):
+    for _statement in sqlite_create_statements(_model.__tablename__):
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.service import product_auth
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.service import product_auth, entitlements
 from app.utils.response import wrap_response
-from app.crud import product as product_crud
-from app.crud.crud4user_products import check_user_product_access
+from app.schemas.product import ProductLinkBatch
+from app.core.config import PRODUCT_LINKS_MAX_BATCH
+from app.crud.aio import product as product_crud
+from app.crud.aio.crud4user_products import check_user_product_access
 
-from app.utils.session_resolver import get_session_identity
+from app.utils.session_resolver import get_session_identity_async
 
 router = APIRouter()
 
 @router.get("/products/{product_id}/get-link")
-async def get_link(session_id: str, product_id: int, request: Request, db: Session = Depends(get_db)):
-    auth_ctx = get_session_identity(session_id)
+async def get_link(session_id: str, product_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    auth_ctx = await get_session_identity_async(session_id)
  
     ua = request.headers.get("user-agent")
     ip = request.client.host
@@ -20,22 +22,53 @@ async def get_link(session_id: str, product_id: int, request: Request, db: Sessi
     user_id = auth_ctx.get("user_id")
     
     # 🔒 SECURITY CHECK: Verify access before generating link
+    product = None
     if user_id:
         # Check if user has role-based access to this product
-        if not check_user_product_access(db, user_id, tenant_id, product_id):
+        if not await check_user_product_access(db, user_id, tenant_id, product_id):
             raise HTTPException(status_code=403, detail="Access denied: You do not have permission to launch this product")
     else:
         # Direct tenant login - Check if tenant has access to this product
-        if not product_crud.get_tenant_product_by_id(db, tenant_id, product_id):
+        product = await product_crud.get_tenant_product_by_id(db, tenant_id, product_id)
+        if not product:
             raise HTTPException(status_code=403, detail="Access denied: Tenant is not subscribed to this product")
 
-    result = await product_auth.generate_product_token(product_id, db, ua, ip, tenant_id, user_id)
+    result = await product_auth.generate_product_token(product_id, db, ua, ip, tenant_id, user_id, product=product)
     return wrap_response(data=result, message="Magic link generated successfully")
 
+@router.post("/products/get-links")
+async def get_links(session_id: str, batch: ProductLinkBatch, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Magic links for several products at once (launcher dashboards)."""
+    product_ids = list(dict.fromkeys(batch.product_ids))
+    if len(product_ids) > PRODUCT_LINKS_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {PRODUCT_LINKS_MAX_BATCH} products per request")
+
+    auth_ctx = await get_session_identity_async(session_id)
+
+    ua = request.headers.get("user-agent")
+    ip = request.client.host
+    tenant_id = auth_ctx["tenant_id"]
+    user_id = auth_ctx.get("user_id")
+
+    # 🔒 SECURITY CHECK: one entitlement lookup for the whole batch
+    if user_id:
+        entitled = await entitlements.user_product_ids_async(db, tenant_id, user_id)
+        launch_urls = await product_auth.launch_urls([pid for pid in product_ids if pid in entitled], db)
+    else:
+        launch_urls = await product_crud.get_tenant_launch_urls(db, tenant_id, product_ids)
+
+    links = await product_auth.generate_product_tokens(launch_urls, ua, ip, tenant_id, user_id)
+    result = {
+        "links": links,
+        # Not entitled, not subscribed, or no such product
+        "denied": [pid for pid in product_ids if pid not in links],
+    }
+    return wrap_response(data=result, message="Magic links generated successfully")
+
 @router.get("/auth/verify-token")
-async def verify_token(token: str, request: Request, db: Session = Depends(get_db)):
+async def verify_token(token: str, request: Request):
   
     ua = request.headers.get("user-agent")
     ip = request.client.host
-    result = await product_auth.verify_product_token(ua, ip, token, db)
+    result = await product_auth.verify_product_token(ua, ip, token)
     return wrap_response(data=result, message="Token verified successfully")
@@ -2,27 +2,55 @@ from app.crud import product as product_crud
 from app.core.database import get_db
 from app.schemas.product import ProductInDBBase, ProductMarketplace
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.utils.response import wrap_response
+from app.utils.pagination import clamp_limit
 from app.schemas.base import BaseResponse
+from app.service import catalog
 
 
 router = APIRouter()
 
+
+def _cached_response(request: Request, cache_key: tuple, build) -> Response:
+    etag, body = catalog.cached_body(cache_key, build)
+    # no-cache lets browsers and the CDN store the body but revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if catalog.etag_matches(request.headers.get("if-none-match"), etag):
+        catalog.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/products", response_model=BaseResponse[List[ProductMarketplace]])
 def read_products(
+    request: Request,
     product_name: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Browse all products in marketplace. URLs hidden for security."""
-    result = product_crud.get_all_products(db=db, product_name=product_name)
-    return wrap_response(data=result, message="Products fetched successfully")
+    def build():
+        result, next_cursor = product_crud.get_all_products(db=db, product_name=product_name, limit=limit, cursor=cursor)
+        response = BaseResponse[List[ProductMarketplace]](
+            **wrap_response(data=result, message="Products fetched successfully", next_cursor=next_cursor)
+        )
+        return response.model_dump_json().encode()
+
+    return _cached_response(request, ("list", product_name, clamp_limit(limit), cursor), build)
 
 @router.get("/products/{product_id}", response_model=BaseResponse[ProductMarketplace])
-def read_product(product_id: int, db: Session = Depends(get_db)):
+def read_product(product_id: int, request: Request, db: Session = Depends(get_db)):
     """Get product details for marketplace. URL hidden for security."""
-    db_product = product_crud.get_product_by_id(db=db, product_id=product_id)
-    if db_product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return wrap_response(data=db_product, message="Product details fetched successfully")
+    def build():
+        db_product = product_crud.get_product_by_id(db=db, product_id=product_id)
+        if db_product is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        response = BaseResponse[ProductMarketplace](
+            **wrap_response(data=db_product, message="Product details fetched successfully")
+        )
+        return response.model_dump_json().encode()
+
+    return _cached_response(request, ("detail", product_id), build)
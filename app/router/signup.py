@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.schemas.tenant import TenantCreate, TenantInDBBase, TenantValidate
 from app.schemas.otp import OTPRequest, OTPVerify
 from app.api.dependencies import _parse_authorization_header
@@ -20,38 +20,38 @@ async def request_otp(data: OTPRequest):
     return wrap_response(data=result, message="OTP sent successfully")
 
 @router.post("/verify-otp")
-def verify_otp(data: OTPVerify):
-    result = otp_service.verify_otp_service(data.email, data.otp)
+async def verify_otp(data: OTPVerify):
+    result = await otp_service.verify_otp_service(data.email, data.otp)
     return wrap_response(data=result, message="OTP verified successfully")
 
 @router.post("/signup", response_model=BaseResponse[TenantInDBBase])
-def signup(tenant: TenantCreate, db: Session = Depends(get_db)):
-    result = tenant_service.signup_tenant_service(db, tenant)
+async def signup(tenant: TenantCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await tenant_service.signup_tenant_service(db, tenant)
     return wrap_response(data=result, message="Tenant registered successfully")
 
 @router.post("/login")
-def login(login_data: TenantValidate, db: Session = Depends(get_db)):
-    result = auth_service.login_service(db, login_data)
+async def login(login_data: TenantValidate, db: AsyncSession = Depends(get_async_db)):
+    result = await auth_service.login_service(db, login_data)
     return wrap_response(data=result, message="Login successful")
 
 @router.post("/logout")
-def logout(request: Request):
+async def logout(request: Request):
     token = _parse_authorization_header(request)
-    result = auth_service.logout_service(token)
+    result = await auth_service.logout_service(token)
     return wrap_response(data=result, message="Logout successful")
 
 @router.post("/refresh-token")
-def refresh_token(request: Request):
+async def refresh_token(request: Request):
     token = _parse_authorization_header(request)
-    result = auth_service.refresh_token_service(token)
+    result = await auth_service.refresh_token_service(token)
     return wrap_response(data=result, message="Token refreshed successfully")
 
 @router.post("/forgot-password-request")
-async def forgot_password_request(data: PasswordResetRequest, db: Session = Depends(get_db)):
+async def forgot_password_request(data: PasswordResetRequest, db: AsyncSession = Depends(get_async_db)):
     result = await password_reset_service.request_password_reset_service(db, data.email)
     return wrap_response(data=result, message="Password reset request initiated")
 
 @router.post("/reset-password")
-def reset_password(data: PasswordResetConfirm, db: Session = Depends(get_db)):
-    result = password_reset_service.reset_password_service(db, data.email, data.otp, data.new_password)
+async def reset_password(data: PasswordResetConfirm, db: AsyncSession = Depends(get_async_db)):
+    result = await password_reset_service.reset_password_service(db, data.email, data.otp, data.new_password)
     return wrap_response(data=result, message="Password reset successfully")
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from typing import Optional
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.crud import crud4super as superadmin_crud
 from app.crud import product as product_crud
 from app.schemas.superadmin import SuperAdminCreate
@@ -10,6 +10,13 @@ from app.schemas.tenant import TenantInDBBase
 from app.schemas.tenant_product_map import TenantProductMapInDBBase
 from app.schemas.product import ProductInDBBase, ProductCreate, ProductUpdate
 from app.utils.response import wrap_response
+from app.utils.export import ndjson_response
+from app.utils import session_cache, session_revocation, mx_resolver, rate_limit
+from app.core.security import password_hash_stats
+from app.core import hash_policy
+from app.service import catalog, usage_writer, usage_retention, usage_analytics, mailer
+from app.schemas.usage import UsageRow
+from datetime import date
 from app.schemas.base import BaseResponse
 
 router = APIRouter()
@@ -52,13 +59,61 @@ def delete_super_admin(super_admin_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Super admin not found")
     return wrap_response(data=result, message="Super admin deleted successfully")
 
+def _wants_ndjson(format: Optional[str]) -> bool:
+    if format is None or format == "json":
+        return False
+    if format == "ndjson":
+        return True
+    raise HTTPException(status_code=400, detail="Unsupported format, expected json or ndjson")
+
 @router.get("/tenants", response_model=BaseResponse[List[TenantInDBBase]])
-def get_all_tenant(db: Session = Depends(get_db)):
-    result = superadmin_crud.get_all_tenant(db=db)
-    return wrap_response(data=result, message="Tenants fetched successfully")
+def get_all_tenant(limit: Optional[int] = None, cursor: Optional[str] = None, format: Optional[str] = None):
+    # No request-scoped session: an export opens its own for as long as it streams
+    if _wants_ndjson(format):
+        return ndjson_response(superadmin_crud.stream_tenants, "tenants.ndjson")
+    with SessionLocal() as db:
+        result, next_cursor = superadmin_crud.get_all_tenant(db=db, limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Tenants fetched successfully", next_cursor=next_cursor)
 
 @router.get("/tenantproductmappings", response_model=BaseResponse[List[TenantProductMapInDBBase]])
-def get_all_tenant_product_mapping(tenant_id: Optional[int] = None, db: Session = Depends(get_db)):
-    result = superadmin_crud.get_product_mappings_for_a_tenant(db=db, tenant_id=tenant_id)
-    return wrap_response(data=result, message="Tenant product mappings fetched successfully")
+def get_all_tenant_product_mapping(tenant_id: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None, format: Optional[str] = None):
+    if _wants_ndjson(format):
+        return ndjson_response(
+            lambda export_db: superadmin_crud.stream_product_mappings(export_db, tenant_id=tenant_id),
+            "tenantproductmappings.ndjson",
+        )
+    with SessionLocal() as db:
+        result, next_cursor = superadmin_crud.get_product_mappings_for_a_tenant(db=db, tenant_id=tenant_id, limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Tenant product mappings fetched successfully", next_cursor=next_cursor)
+
+@router.get("/usage", response_model=BaseResponse[List[UsageRow]])
+def get_usage(
+    group_by: str = "day",
+    tenant_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    top: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Product launches per day, product or user, across all tenants unless tenant_id is given."""
+    result = usage_analytics.usage_report(
+        db, group_by=group_by, tenant_id=tenant_id, product_id=product_id, start=start, end=end, top=top
+    )
+    return wrap_response(data=result, message="Usage fetched successfully")
 
+@router.get("/metrics")
+def get_metrics():
+    result = {
+        "session_cache": session_cache.stats(),
+        "session_revocation": session_revocation.stats(),
+        "password_hashing": password_hash_stats(),
+        "hash_policy": hash_policy.policy_stats(),
+        "catalog_cache": catalog.stats(),
+        "usage_writer": usage_writer.stats(),
+        "usage_retention": usage_retention.stats(),
+        "mailer": mailer.stats(),
+        "mx_cache": mx_resolver.stats(),
+        "rate_limit": rate_limit.stats(),
+    }
+    return wrap_response(data=result, message="Metrics fetched successfully")
@@ -1,41 +1,63 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.utils.session_resolver import get_session_identity
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_async_db
+from app.utils.session_resolver import get_session_identity, get_session_identity_async
 from app.crud import crud4tent as user_crud
+from app.crud.aio import crud4tent as async_user_crud
 from app.schemas.user import UserInDBBase, UserCreate, UserWithRoles
 from app.crud import crud4role as role_crud
 from app.schemas.role import RoleInDBBase, RoleCreate, RoleUpdate
 from app.crud import crud4tpm as tenant_product_map_crud
 from app.schemas.tenant_product_map import TenantProductMapInDBBase, TenantProductMapCreate
 from app.crud import crud4rum as role_user_mapping_crud
-from app.schemas.role_user_mapping import RoleUserMappingInDBBase, RoleUserMappingCreate
+from app.schemas.role_user_mapping import RoleUserMappingInDBBase, RoleUserMappingCreate, RoleUsersAssign
+from app.crud.aio import crud4rum as async_role_user_mapping_crud
 from app.crud import crud4arm as app_role_mapping_crud
-from app.schemas.app_role_mapping import AppRoleMappingInDBBase, AppRoleMappingCreate
+from app.schemas.app_role_mapping import AppRoleMappingInDBBase, AppRoleMappingCreate, RoleProductsAssign
+from app.crud.aio import crud4arm as async_app_role_mapping_crud
 from app.crud import product as product_crud
 from app.schemas.product import ProductInDBBase
 from app.utils.response import wrap_response
+from app.service import usage_analytics, user_import
+from app.schemas.usage import UsageRow
+from datetime import date
 from app.schemas.base import BaseResponse
 
 router = APIRouter()
 
 @router.post("/users", response_model=BaseResponse[UserInDBBase])
-def create_user(session_id: str, user: UserCreate, db: Session = Depends(get_db)):
-    auth = get_session_identity(session_id)
-    result = user_crud.create_user(db=db, user=user, tenant_id=auth["tenant_id"])
+async def create_user(session_id: str, user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    auth = await get_session_identity_async(session_id)
+    result = await async_user_crud.create_user(db=db, user=user, tenant_id=auth["tenant_id"])
     return wrap_response(data=result, message="User created successfully")
 
+@router.post("/users/import")
+async def import_users(
+    session_id: str,
+    request: Request,
+    role_id: Optional[int] = Query(None),  # Assigned to every created user
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Body is a JSON array of users, or CSV with Content-Type: text/csv."""
+    auth = await get_session_identity_async(session_id)
+    rows = user_import.parse_rows(await request.body(), request.headers.get("content-type"))
+    result = await user_import.import_users(db=db, tenant_id=auth["tenant_id"], rows=rows, role_id=role_id)
+    return wrap_response(data=result, message="Users imported successfully")
+
 @router.get("/users", response_model=BaseResponse[List[UserWithRoles]])
 def read_users(
     session_id: str,
     name: Optional[str] = None,  # Filter by username
     email: Optional[str] = None,  # Filter by email
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     auth = get_session_identity(session_id)
-    result = user_crud.get_all_users(db=db, tenant_id=auth["tenant_id"], name=name, email=email)
-    return wrap_response(data=result, message="Users fetched successfully")
+    result, next_cursor = user_crud.get_all_users(db=db, tenant_id=auth["tenant_id"], name=name, email=email, limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Users fetched successfully", next_cursor=next_cursor)
 
 @router.get("/users/{user_id}", response_model=BaseResponse[UserInDBBase])
 def read_user(session_id: str, user_id: int, db: Session = Depends(get_db)):
@@ -56,11 +78,13 @@ def delete_user(session_id: str, user_id: int, db: Session = Depends(get_db)):
 def read_roles(
     session_id: str,
     role_name: Optional[str] = None,  # Filter by role name
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     auth = get_session_identity(session_id)
-    result = role_crud.get_all_roles(db=db, tenant_id=auth["tenant_id"], role_name=role_name)
-    return wrap_response(data=result, message="Roles fetched successfully")
+    result, next_cursor = role_crud.get_all_roles(db=db, tenant_id=auth["tenant_id"], role_name=role_name, limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Roles fetched successfully", next_cursor=next_cursor)
 
 @router.get("/roles/{role_id}", response_model=BaseResponse[RoleInDBBase])
 def read_role(session_id: str, role_id: int, db: Session = Depends(get_db)):
@@ -92,6 +116,18 @@ def delete_role(session_id: str, role_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Role not found")
     return wrap_response(data=result, message="Role deleted successfully")
 
+@router.post("/roles/{role_id}/users")
+async def assign_role_to_users(session_id: str, role_id: int, assignment: RoleUsersAssign, db: AsyncSession = Depends(get_async_db)):
+    auth = await get_session_identity_async(session_id)
+    result = await async_role_user_mapping_crud.assign_role_to_users(db=db, role_id=role_id, user_ids=assignment.user_ids, tenant_id=auth["tenant_id"])
+    return wrap_response(data=result, message="Role assigned to users successfully")
+
+@router.post("/roles/{role_id}/products")
+async def assign_products_to_role(session_id: str, role_id: int, assignment: RoleProductsAssign, db: AsyncSession = Depends(get_async_db)):
+    auth = await get_session_identity_async(session_id)
+    result = await async_app_role_mapping_crud.assign_products_to_role(db=db, role_id=role_id, product_ids=assignment.product_ids, tenant_id=auth["tenant_id"])
+    return wrap_response(data=result, message="Products assigned to role successfully")
+
 @router.post("/app_role_mappings", response_model=BaseResponse[AppRoleMappingInDBBase])
 def create_app_role_mapping(session_id: str, app_role_mapping: AppRoleMappingCreate, db: Session = Depends(get_db)):
     auth = get_session_identity(session_id)
@@ -99,10 +135,10 @@ def create_app_role_mapping(session_id: str, app_role_mapping: AppRoleMappingCre
     return wrap_response(data=result, message="App role mapping created successfully")
 
 @router.get("/app_role_mappings", response_model=BaseResponse[List[AppRoleMappingInDBBase]])
-def read_app_role_mappings(session_id: str, db: Session = Depends(get_db)):
+def read_app_role_mappings(session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     auth = get_session_identity(session_id)
-    result = app_role_mapping_crud.get_all_app_role_mappings(db=db, tenant_id=auth["tenant_id"])
-    return wrap_response(data=result, message="App role mappings fetched successfully")
+    result, next_cursor = app_role_mapping_crud.get_all_app_role_mappings(db=db, tenant_id=auth["tenant_id"], limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="App role mappings fetched successfully", next_cursor=next_cursor)
 
 @router.get("/app_role_mappings/{app_role_mapping_id}", response_model=BaseResponse[AppRoleMappingInDBBase])
 def read_app_role_mapping(session_id: str, app_role_mapping_id: int, db: Session = Depends(get_db)):
@@ -133,10 +169,10 @@ def create_role_user_mapping(session_id: str, role_user_mapping: RoleUserMapping
     return wrap_response(data=result, message="Role user mapping created successfully")
 
 @router.get("/role_user_mappings", response_model=BaseResponse[List[RoleUserMappingInDBBase]])
-def read_role_user_mappings(session_id: str, db: Session = Depends(get_db)):
+def read_role_user_mappings(session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     auth = get_session_identity(session_id)
-    result = role_user_mapping_crud.get_all_role_user_mappings(db=db, tenant_id=auth["tenant_id"])
-    return wrap_response(data=result, message="Role user mappings fetched successfully")
+    result, next_cursor = role_user_mapping_crud.get_all_role_user_mappings(db=db, tenant_id=auth["tenant_id"], limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Role user mappings fetched successfully", next_cursor=next_cursor)
 
 @router.get("/role_user_mappings/{role_user_mapping_id}", response_model=BaseResponse[RoleUserMappingInDBBase])
 def read_role_user_mapping(session_id: str, role_user_mapping_id: int, db: Session = Depends(get_db)):
@@ -163,10 +199,10 @@ def create_tenant_product_map(session_id: str, tenant_product_map: TenantProduct
     return wrap_response(data=result, message="Tenant product map created successfully")
 
 @router.get("/tenant_product_maps", response_model=BaseResponse[List[TenantProductMapInDBBase]])
-def read_tenant_product_maps(session_id: str, db: Session = Depends(get_db)):
+def read_tenant_product_maps(session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     auth = get_session_identity(session_id)
-    result = tenant_product_map_crud.get_all_tenant_product_maps(db=db, tenant_id=auth["tenant_id"])
-    return wrap_response(data=result, message="Tenant product maps fetched successfully")
+    result, next_cursor = tenant_product_map_crud.get_all_tenant_product_maps(db=db, tenant_id=auth["tenant_id"], limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Tenant product maps fetched successfully", next_cursor=next_cursor)
 
 @router.get("/tenant_product_maps/{tenant_product_map_id}", response_model=BaseResponse[TenantProductMapInDBBase])
 def read_tenant_product_map(session_id: str, tenant_product_map_id: int, db: Session = Depends(get_db)):
@@ -188,11 +224,13 @@ def delete_tenant_productmap(session_id: str, tenant_product_map_id: int, db: Se
 def get_my_products(
     session_id: str,
     product_name: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     auth = get_session_identity(session_id)
-    result = product_crud.get_tenant_products(db=db, tenant_id=auth["tenant_id"], product_name=product_name)
-    return wrap_response(data=result, message="Tenant products fetched successfully")
+    result, next_cursor = product_crud.get_tenant_products(db=db, tenant_id=auth["tenant_id"], product_name=product_name, limit=limit, cursor=cursor)
+    return wrap_response(data=result, message="Tenant products fetched successfully", next_cursor=next_cursor)
 
 
 @router.get("/my-products/{product_id}", response_model=BaseResponse[ProductInDBBase])
@@ -208,3 +246,20 @@ def get_my_product(
     
     return wrap_response(data=db_product, message="Product details fetched successfully")
 
+
+@router.get("/usage", response_model=BaseResponse[List[UsageRow]])
+def get_usage(
+    session_id: str,
+    group_by: str = "day",
+    product_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    top: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Launches of this tenant's products per day, product or user."""
+    auth = get_session_identity(session_id)
+    result = usage_analytics.usage_report(
+        db, group_by=group_by, tenant_id=auth["tenant_id"], product_id=product_id, start=start, end=end, top=top
+    )
+    return wrap_response(data=result, message="Usage fetched successfully")
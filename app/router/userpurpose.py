@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.utils.session_resolver import get_session_identity
-from app.crud.crud4user import update_user as crud_update_user, get_user as crud_get_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_async_db
+from app.utils.session_resolver import get_session_identity, get_session_identity_async
+from app.crud.crud4user import get_user as crud_get_user
+from app.crud.aio.crud4user import update_user as crud_update_user
 from app.schemas.user import UserUpdate
 from app.crud.crud4user_products import get_user_products as crud_get_user_products
 from app.schemas.product import ProductInDBBase
@@ -23,9 +25,9 @@ def get_user_products_endpoint(
     return wrap_response(data=result, message="User products fetched successfully")
 
 @router.put("/update-user")
-def update_user_endpoint(session_id: str, user: UserUpdate, db: Session = Depends(get_db)):
-    auth = get_session_identity(session_id)
-    result = crud_update_user(db, auth["user_id"], user, auth["tenant_id"])
+async def update_user_endpoint(session_id: str, user: UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    auth = await get_session_identity_async(session_id)
+    result = await crud_update_user(db, auth["user_id"], user, auth["tenant_id"])
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     return wrap_response(data=result, message="User updated successfully")
@@ -16,3 +16,7 @@ class AppRoleMappingInDBBase(AppRoleMappingBase):
 
     class Config:
         from_attributes = True
+
+
+class RoleProductsAssign(BaseModel):
+    product_ids: List[int]
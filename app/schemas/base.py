@@ -7,3 +7,4 @@ class BaseResponse(BaseModel, Generic[T]):
     status: str
     message: str
     data: Optional[T] = None
+    next_cursor: Optional[str] = None
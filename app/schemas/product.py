@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class ProductBase(BaseModel):
     product_name: str
@@ -43,3 +43,7 @@ class ProductInDBBase(ProductBase):
         from_attributes = True
     
 
+
+class ProductLinkBatch(BaseModel):
+    """Products to issue magic links for in one request."""
+    product_ids: List[int]
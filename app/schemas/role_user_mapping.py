@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class RoleUserMappingBase(BaseModel):
     role_id: int
@@ -16,4 +16,6 @@ class RoleUserMappingInDBBase(RoleUserMappingBase):
     class Config:
         from_attributes = True
 
-    
\ No newline at end of file
+
+class RoleUsersAssign(BaseModel):
+    user_ids: List[int]
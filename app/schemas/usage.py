@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class UsageRow(BaseModel):
+    # Only the column being grouped by is set
+    day: Optional[date] = None
+    product_id: Optional[int] = None
+    user_id: Optional[int] = None
+    launches: int
+    distinct_users: Optional[int] = None
@@ -1,132 +1,131 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.core.redis import redis_client
-from app.models.models import Tenant
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.redis import async_redis_client
+from app.models.models import Tenant, User
+import time
 import uuid
-import json
 from app.schemas.tenant import TenantValidate
-from app.core.security import verify_password, create_access_token, create_refresh_token, verify_token
-from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES
-from app.crud import crud4user as crud_user
+from app.core.security import hash_password_async
+from app.core import hash_policy
+from app.core.config import REFRESH_TOKEN_EXPIRE_MINUTES, SESSION_STATELESS, SESSION_STATELESS_ACCEPT_BARE
+from app.service import login_identity
+from app.utils import session_cache, session_vault, session_revocation
 
-def login_service(db: Session, login_data: TenantValidate):
-    tenant = db.query(Tenant).filter(Tenant.email == login_data.email).first()
-    if tenant and verify_password(login_data.password, tenant.hashed_password):
-        claims = {"role": "tenant", "tenant_id": tenant.tenant_id}
-        subject = str(tenant.tenant_id)
-        token_id = tenant.tenant_id
-        
-        access_token = create_access_token(subject, claims)
-        refresh_token = create_refresh_token(subject, claims)
+async def _upgrade_password_hash(db: AsyncSession, principal, password: str):
+    # Only possible right after a successful verify, while we hold the plaintext
+    if not hash_policy.needs_rehash(principal.hashed_password):
+        return
+    try:
+        new_hash = await hash_password_async(password)
+    except HTTPException:
+        # Hash pool is saturated, the upgrade can wait for the next login
+        return
 
-        session_id = str(uuid.uuid4())
-        
-        vault_data = {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "user_id": token_id, 
-            "role": "tenant",
-            "type": "tenant"
-        }
+    if principal.kind == "tenant":
+        stmt = update(Tenant).where(Tenant.tenant_id == principal.principal_id)
+    else:
+        stmt = update(User).where(User.user_id == principal.principal_id)
+    await db.execute(stmt.values(hashed_password=new_hash))
+    await db.commit()
+    hash_policy.record_rehash()
 
-        # Store in Redis (Vault)
-        redis_client.set(f"session:{session_id}", json.dumps(vault_data), ex=REFRESH_TOKEN_EXPIRE_MINUTES * 60)
-        
-        return {
-            "session_id": session_id,
-            "token_type": "bearer",
-            "role": "tenant",
-            "user": {
-                "id": tenant.tenant_id
-            }
-        }
+async def _store_session(handle: str, claims) -> str:
+    """Save the vault and return what the client should send as its session_id."""
+    # Stateless clients only ever see the handle; the vault key derived from it stays here
+    vault_id = session_vault.vault_id(handle) if SESSION_STATELESS else handle
+    # Store in Redis (Vault): claims only, see app/utils/session_vault.py
+    await async_redis_client.set(
+        session_vault.vault_key(vault_id),
+        session_vault.encode(vault_id, claims),
+        ex=REFRESH_TOKEN_EXPIRE_MINUTES * 60
+    )
+    if SESSION_STATELESS:
+        return session_vault.credential(handle, claims)
+    return vault_id
 
+async def _resolve_presented(presented: str):
+    """Vault id behind what the client sent, and the credential's claims if it sent one."""
+    if session_vault.is_credential(presented):
+        # Expired credentials are still good for refresh and logout
+        claims = session_vault.read_credential(presented)
+        return claims["session_id"], claims
+    if SESSION_STATELESS and not SESSION_STATELESS_ACCEPT_BARE:
+        raise HTTPException(status_code=401, detail="Invalid Session")
+    return presented, None
 
-    user = crud_user.get_user_by_email(db, email=login_data.email)
-    if user and verify_password(login_data.password, user.hashed_password):
-    
-        claims = {"role": "user", "tenant_id": user.tenant_id}
-        subject = str(user.user_id)
-        token_id = user.user_id 
-        
-        access_token = create_access_token(subject, claims)
-        refresh_token = create_refresh_token(subject, claims)
-        
-        # Generate Session ID
-        session_id = str(uuid.uuid4())
-        
-        # Prepare Vault
-        vault_data = {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "user_id": token_id, 
-            "role": "user",
-            "tenant_id": user.tenant_id,
-            "type": "user"
-        }
-        
-        # Store in Redis (Vault)
-        redis_client.set(f"session:{session_id}", json.dumps(vault_data), ex=REFRESH_TOKEN_EXPIRE_MINUTES * 60)
-        
+async def login_service(db: AsyncSession, login_data: TenantValidate):
+    # One query for every tenant/user under this email, verified in a fixed order
+    principal = await login_identity.authenticate(db, login_data.email, login_data.password)
+    if principal is None:
+        raise HTTPException(status_code=400, detail="Invalid email or password")
+
+    await _upgrade_password_hash(db, principal, login_data.password)
+
+    session_id = await _store_session(
+        str(uuid.uuid4()),
+        session_vault.issue(principal.kind, principal.principal_id, principal.tenant_id)
+    )
+
+    if principal.kind == "tenant":
         return {
             "session_id": session_id,
             "token_type": "bearer",
-            "role": "user",
+            "role": "tenant",
             "user": {
-                "id": user.user_id,
-                "tenant_id": user.tenant_id,
-                "user_name": user.username,
+                "id": principal.principal_id
             }
         }
 
-    raise HTTPException(status_code=400, detail="Invalid email or password")
+    return {
+        "session_id": session_id,
+        "token_type": "bearer",
+        "role": "user",
+        "user": {
+            "id": principal.principal_id,
+            "tenant_id": principal.tenant_id,
+            "user_name": principal.display_name,
+        }
+    }
 
-def logout_service(session_id: str):
+async def logout_service(session_id: str):
+    vault_id, credential = await _resolve_presented(session_id)
     # Just kill the session in Redis
-    redis_client.delete(f"session:{session_id}")
+    await async_redis_client.delete(session_vault.vault_key(vault_id))
+    await session_cache.invalidate_async(vault_id)
+    if credential is not None:
+        # Held by the client, so it has to be revoked until it expires
+        await session_revocation.revoke_async(credential["jti"], credential["access_exp"])
     return {"msg": "Logged out successfully"}
 
-def refresh_token_service(session_id: str):
-    # 1. Lookup Session
-    vault_json = redis_client.get(f"session:{session_id}")
-    if not vault_json:
-        raise HTTPException(401, "Invalid Session")
-        
-    try:
-        vault = json.loads(vault_json)
-    except:
-        raise HTTPException(401, "Invalid Session Data")
+async def refresh_token_service(session_id: str):
+    # 1. Lookup Session (legacy JSON vaults are upgraded by the write below)
+    vault_id, credential = await _resolve_presented(session_id)
+    claims = session_vault.decode(vault_id, await async_redis_client.get(session_vault.vault_key(vault_id)))
 
-    # 2. Get Internal Refresh Token
-    refresh_token = vault.get("refresh_token")
-    if not refresh_token:
-        raise HTTPException(401, "No refresh token in vault")
+    # Only the latest credential may refresh, so a rotated one can't fork the session
+    if credential is not None and credential["jti"] != claims["jti"]:
+        raise HTTPException(401, "Invalid Session")
 
-    # 3. Verify Internal Refresh Token
-    payload = verify_token(refresh_token)
-    if not payload:
+    # 2. Check the refresh expiry
+    if claims["refresh_exp"] <= time.time():
         raise HTTPException(401, "Session Expired (Internal Token)")
-    
-    # Check JTI revocation if you kept it
-    #jti = payload["jti"]
-    
-    subject = str(payload["sub"])
-    # Re-construct claims
-    claims = {
-        "role": payload.get("role"), 
-        "tenant_id": payload.get("tenant_id")
-    }
-    
-    # 5. Mint NEW Tokens
-    new_access_token = create_access_token(subject, claims)
-    new_refresh_token = create_refresh_token(subject, claims)
-    
-    # 6. Update Vault
-    vault["access_token"] = new_access_token
-    vault["refresh_token"] = new_refresh_token
-    
-    # Save back to Redis (Reset TTL)
-    redis_client.set(f"session:{session_id}", json.dumps(vault), ex=REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+
+    # 3. Re-issue both expiries under a new jti and save back (Reset TTL)
+    if not SESSION_STATELESS:
+        handle = vault_id
+    elif credential is not None:
+        handle = credential["handle"]
+    else:
+        # A session from before the switch to stateless: move it under a fresh handle
+        handle = str(uuid.uuid4())
+    session_id = await _store_session(handle, session_vault.issue(claims["type"], claims["sub"], claims["tenant_id"]))
+    if SESSION_STATELESS and credential is None:
+        await async_redis_client.delete(session_vault.vault_key(vault_id))
+    await session_cache.invalidate_async(vault_id)
+    if credential is not None:
+        # Rotated: the credential presented here must not outlive the refresh
+        await session_revocation.revoke_async(credential["jti"], credential["access_exp"])
     
     return {
         "session_id": session_id,
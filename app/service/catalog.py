@@ -0,0 +1,84 @@
+"""
+Pre-serialized marketplace responses keyed by a catalog version.
+
+Every product write bumps `catalog:version` in Redis. Readers fetch the
+version *before* querying, so a body built from data that a concurrent write
+has since replaced is stored under the old version and never served again.
+Bodies are cached per process in a bounded LRU and carry a strong ETag
+derived from their bytes, so every worker hands out the same tag.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import CATALOG_CACHE_MAX_ENTRIES
+
+VERSION_KEY = "catalog:version"
+
+# (version, cache_key) -> (etag, body)
+_entries: "OrderedDict[tuple, Tuple[str, bytes]]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def current_version() -> str:
+    return redis_client.get(VERSION_KEY) or "0"
+
+async def current_version_async() -> str:
+    return await async_redis_client.get(VERSION_KEY) or "0"
+
+
+def bump_version():
+    """Call after a product change is committed."""
+    redis_client.incr(VERSION_KEY)
+
+async def bump_version_async():
+    await async_redis_client.incr(VERSION_KEY)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def cached_body(cache_key: tuple, build: Callable[[], bytes]) -> Tuple[str, bytes]:
+    """Return (etag, body) for cache_key, calling build() only on a miss."""
+    version = current_version()
+    entry_key = (version, cache_key)
+    with _lock:
+        entry = _entries.get(entry_key)
+        if entry is not None:
+            _entries.move_to_end(entry_key)
+            _stats["hits"] += 1
+            return entry
+
+    body = build()
+    entry = (_etag(body), body)
+    with _lock:
+        _stats["misses"] += 1
+        _entries[entry_key] = entry
+        _entries.move_to_end(entry_key)
+        while len(_entries) > CATALOG_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def record_not_modified():
+    with _lock:
+        _stats["not_modified"] += 1
+
+
+def stats():
+    with _lock:
+        return {**_stats, "size": len(_entries), "max_entries": CATALOG_CACHE_MAX_ENTRIES}
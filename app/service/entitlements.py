@@ -0,0 +1,151 @@
+"""
+Materialized (tenant_id, user_id) -> {product_id} index in Redis.
+
+Each user's set lives under a key that embeds two generation counters: one
+per tenant (bumped when role/product mappings change) and one per user
+(bumped when that user's roles change). Bumping a counter makes the old set
+unreachable, and a rebuild always writes under the counters it read
+*before* querying the database, so a rebuild racing a change can never
+resurrect stale entitlements.
+"""
+from typing import Set
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import ENTITLEMENT_CACHE_SECONDS
+from app.models.models import RoleUserMapping, AppRoleMapping, Product
+
+# Marks a built-but-empty set; product ids are always positive integers
+EMPTY_MARKER = "-"
+# Outlives every set built under it, so an expired counter can't reuse a live key
+USER_VERSION_TTL = max(ENTITLEMENT_CACHE_SECONDS * 24, 86400)
+
+# Reads both generations and the set in one round trip.
+# ARGV[2] empty -> return all members, otherwise membership of that product.
+_LOOKUP_SCRIPT = """
+local tver = redis.call('GET', KEYS[1]) or '0'
+local uver = redis.call('GET', KEYS[2]) or '0'
+local key = ARGV[1] .. ':' .. tver .. ':' .. uver
+if redis.call('EXISTS', key) == 0 then
+    return {0, tver, uver}
+end
+if ARGV[2] == '' then
+    return {1, tver, uver, redis.call('SMEMBERS', key)}
+end
+return {1, tver, uver, redis.call('SISMEMBER', key, ARGV[2])}
+"""
+
+_lookup = redis_client.register_script(_LOOKUP_SCRIPT)
+_lookup_async = async_redis_client.register_script(_LOOKUP_SCRIPT)
+
+
+# All keys of a tenant share a hash tag so the script stays on one cluster slot
+def _tenant_version_key(tenant_id: int) -> str:
+    return f"entitlements:{{{tenant_id}}}:version"
+
+def _user_version_key(tenant_id: int, user_id: int) -> str:
+    return f"entitlements:{{{tenant_id}}}:user:{user_id}:version"
+
+def _set_prefix(tenant_id: int, user_id: int) -> str:
+    return f"entitlements:{{{tenant_id}}}:set:{user_id}"
+
+def _lookup_args(tenant_id: int, user_id: int, product_id=None):
+    keys = [_tenant_version_key(tenant_id), _user_version_key(tenant_id, user_id)]
+    args = [_set_prefix(tenant_id, user_id), "" if product_id is None else str(product_id)]
+    return keys, args
+
+
+def _product_ids_query(tenant_id: int, user_id: int):
+    return (
+        select(AppRoleMapping.product_id)
+        .join(Product, Product.product_id == AppRoleMapping.product_id)
+        .join(RoleUserMapping, RoleUserMapping.role_id == AppRoleMapping.role_id)
+        .where(
+            RoleUserMapping.user_id == user_id,
+            RoleUserMapping.tenant_id == tenant_id,
+            AppRoleMapping.tenant_id == tenant_id
+        )
+        .distinct()
+    )
+
+
+def _fill(pipe, tenant_id: int, user_id: int, tver, uver, product_ids: Set[int]):
+    key = f"{_set_prefix(tenant_id, user_id)}:{tver}:{uver}"
+    pipe.delete(key)
+    pipe.sadd(key, EMPTY_MARKER, *product_ids)
+    pipe.expire(key, ENTITLEMENT_CACHE_SECONDS)
+
+
+def _members(raw) -> Set[int]:
+    return {int(member) for member in raw if member != EMPTY_MARKER}
+
+
+def user_product_ids(db: Session, tenant_id: int, user_id: int) -> Set[int]:
+    keys, args = _lookup_args(tenant_id, user_id)
+    found, tver, uver, *rest = _lookup(keys=keys, args=args)
+    if found:
+        return _members(rest[0])
+
+    product_ids = set(db.execute(_product_ids_query(tenant_id, user_id)).scalars())
+    pipe = redis_client.pipeline(transaction=False)
+    _fill(pipe, tenant_id, user_id, tver, uver, product_ids)
+    pipe.execute()
+    return product_ids
+
+
+def has_product_access(db: Session, tenant_id: int, user_id: int, product_id: int) -> bool:
+    keys, args = _lookup_args(tenant_id, user_id, product_id)
+    found, tver, uver, *rest = _lookup(keys=keys, args=args)
+    if found:
+        return bool(rest[0])
+    return product_id in user_product_ids(db, tenant_id, user_id)
+
+
+async def user_product_ids_async(db: AsyncSession, tenant_id: int, user_id: int) -> Set[int]:
+    keys, args = _lookup_args(tenant_id, user_id)
+    found, tver, uver, *rest = await _lookup_async(keys=keys, args=args)
+    if found:
+        return _members(rest[0])
+
+    product_ids = set((await db.scalars(_product_ids_query(tenant_id, user_id))).all())
+    pipe = async_redis_client.pipeline(transaction=False)
+    _fill(pipe, tenant_id, user_id, tver, uver, product_ids)
+    await pipe.execute()
+    return product_ids
+
+
+async def has_product_access_async(db: AsyncSession, tenant_id: int, user_id: int, product_id: int) -> bool:
+    keys, args = _lookup_args(tenant_id, user_id, product_id)
+    found, tver, uver, *rest = await _lookup_async(keys=keys, args=args)
+    if found:
+        return bool(rest[0])
+    return product_id in await user_product_ids_async(db, tenant_id, user_id)
+
+
+# Invalidation. Call these only after the change is committed.
+
+def invalidate_user(tenant_id: int, user_id: int):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(_user_version_key(tenant_id, user_id))
+    pipe.expire(_user_version_key(tenant_id, user_id), USER_VERSION_TTL)
+    pipe.execute()
+
+def invalidate_tenant(tenant_id: int):
+    redis_client.incr(_tenant_version_key(tenant_id))
+
+async def invalidate_user_async(tenant_id: int, user_id: int):
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.incr(_user_version_key(tenant_id, user_id))
+    pipe.expire(_user_version_key(tenant_id, user_id), USER_VERSION_TTL)
+    await pipe.execute()
+
+async def invalidate_users_async(tenant_id: int, user_ids):
+    pipe = async_redis_client.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.incr(_user_version_key(tenant_id, user_id))
+        pipe.expire(_user_version_key(tenant_id, user_id), USER_VERSION_TTL)
+    await pipe.execute()
+
+async def invalidate_tenant_async(tenant_id: int):
+    await async_redis_client.incr(_tenant_version_key(tenant_id))
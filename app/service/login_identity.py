@@ -0,0 +1,78 @@
+from typing import Optional
+from sqlalchemy import select, union_all, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import LOGIN_NEGATIVE_CACHE_SECONDS
+from app.core.security import verify_password_async
+from app.models.models import Tenant, User
+
+# Verification order: the tenant account first, then users by id, so an
+# email registered in several tenants always resolves the same way
+TENANT_RANK = 0
+USER_RANK = 1
+
+
+def _unknown_email_key(email: str) -> str:
+    return f"login_unknown:{email}"
+
+
+def _candidates_query(email: str):
+    tenants = select(
+        literal("tenant").label("kind"),
+        literal(TENANT_RANK).label("rank"),
+        Tenant.tenant_id.label("principal_id"),
+        Tenant.tenant_id.label("tenant_id"),
+        Tenant.name.label("display_name"),
+        Tenant.hashed_password.label("hashed_password"),
+    ).where(Tenant.email == email)
+
+    users = select(
+        literal("user").label("kind"),
+        literal(USER_RANK).label("rank"),
+        User.user_id.label("principal_id"),
+        User.tenant_id.label("tenant_id"),
+        User.username.label("display_name"),
+        User.hashed_password.label("hashed_password"),
+    ).where(User.email == email)
+
+    combined = union_all(tenants, users).subquery()
+    return select(combined).order_by(combined.c.rank, combined.c.principal_id)
+
+
+async def get_login_candidates(db: AsyncSession, email: str):
+    """Every tenant and user registered under this email, in one query."""
+    return (await db.execute(_candidates_query(email))).all()
+
+
+async def authenticate(db: AsyncSession, email: str, password: str) -> Optional[object]:
+    """
+    Return the first candidate whose password matches, or None.
+    The row has kind, principal_id, tenant_id, display_name and hashed_password.
+    """
+    if await async_redis_client.exists(_unknown_email_key(email)):
+        return None
+
+    candidates = await get_login_candidates(db, email)
+    if not candidates:
+        await async_redis_client.set(_unknown_email_key(email), "1", ex=LOGIN_NEGATIVE_CACHE_SECONDS)
+        return None
+
+    for candidate in candidates:
+        if candidate.hashed_password and await verify_password_async(password, candidate.hashed_password):
+            return candidate
+    return None
+
+
+async def forget_unknown_email(email: str):
+    """Call whenever a tenant or user is created under an email."""
+    await async_redis_client.delete(_unknown_email_key(email))
+
+
+async def forget_unknown_emails(emails):
+    keys = [_unknown_email_key(email) for email in emails]
+    if keys:
+        await async_redis_client.delete(*keys)
+
+
+def forget_unknown_email_sync(email: str):
+    redis_client.delete(_unknown_email_key(email))
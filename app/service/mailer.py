@@ -0,0 +1,182 @@
+"""
+Outgoing email delivery.
+
+Messages are queued on a bounded asyncio queue and sent by SMTP_POOL_SIZE
+worker tasks, each holding one long-lived authenticated SMTP connection, so
+a message costs one MAIL/RCPT/DATA exchange instead of a TCP + STARTTLS +
+AUTH handshake. Transient failures are retried with exponential backoff;
+permanent (5xx) rejections are not. A dropped connection is reopened and the
+message resent without counting as an attempt.
+"""
+import asyncio
+import time
+from email.message import Message
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+import aiosmtplib
+from fastapi import HTTPException
+from app.core.config import (
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
+    SMTP_START_TLS, SMTP_TIMEOUT_SECONDS, SMTP_POOL_SIZE,
+    EMAIL_QUEUE_MAX, EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS, EMAIL_DRAIN_TIMEOUT_SECONDS,
+)
+
+# Called with the message once every attempt has failed
+FailureCallback = Callable[[Message], Awaitable[None]]
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_stats = {
+    "queued": 0,
+    "sent": 0,
+    "failed": 0,
+    "retries": 0,
+    "rejected": 0,
+    "connects": 0,
+    "last_send_ms": 0.0,
+}
+
+
+class _Connection:
+    """One pooled SMTP connection, opened on first use and reopened after a drop."""
+
+    def __init__(self):
+        self.smtp: Optional[aiosmtplib.SMTP] = None
+
+    async def _open(self):
+        await self.close()
+        smtp = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            start_tls=SMTP_START_TLS,
+            timeout=SMTP_TIMEOUT_SECONDS,
+        )
+        await smtp.connect()
+        if SMTP_USER:
+            await smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self.smtp = smtp
+        _stats["connects"] += 1
+
+    async def send(self, message: Message):
+        if self.smtp is None or not self.smtp.is_connected:
+            await self._open()
+        try:
+            await self.smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Idle connections get dropped by the server; one fresh try is free
+            await self._open()
+            await self.smtp.send_message(message)
+
+    async def close(self):
+        smtp, self.smtp = self.smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= refusal.code < 600 for refusal in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and 500 <= error.code < 600
+
+
+async def _deliver(connection: _Connection, message: Message, on_failure: Optional[FailureCallback]):
+    delay = EMAIL_RETRY_BASE_SECONDS
+    for attempt in range(1, EMAIL_MAX_ATTEMPTS + 1):
+        started = time.perf_counter()
+        try:
+            await connection.send(message)
+            _stats["sent"] += 1
+            _stats["last_send_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Don't reuse a connection left in an unknown state
+            await connection.close()
+            if _is_permanent(e) or attempt == EMAIL_MAX_ATTEMPTS:
+                print(f"Giving up on email to {message['To']} after {attempt} attempt(s): {str(e)}")
+                break
+            _stats["retries"] += 1
+            print(f"Email to {message['To']} failed, retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    _stats["failed"] += 1
+    if on_failure is not None:
+        try:
+            await on_failure(message)
+        except Exception as e:
+            print(f"Email failure callback raised: {str(e)}")
+
+
+async def _work():
+    connection = _Connection()
+    try:
+        while True:
+            message, on_failure = await _queue.get()
+            try:
+                await _deliver(connection, message, on_failure)
+            finally:
+                _queue.task_done()
+    finally:
+        await connection.close()
+
+
+async def enqueue(message: Message, on_failure: Optional[FailureCallback] = None):
+    """Queue a message for delivery and return immediately."""
+    if _queue is None:
+        # Mailer not running (scripts, tests): send inline on a one-off connection
+        connection = _Connection()
+        try:
+            await _deliver(connection, message, on_failure)
+        finally:
+            await connection.close()
+        return
+    try:
+        _queue.put_nowait((message, on_failure))
+    except asyncio.QueueFull:
+        _stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Email service is busy, please try again shortly",
+            headers={"Retry-After": "5"}
+        )
+    _stats["queued"] += 1
+
+
+def start_mailer():
+    """Must be called on the event loop."""
+    global _queue
+    if not _workers:
+        _queue = asyncio.Queue(maxsize=EMAIL_QUEUE_MAX)
+        for _ in range(SMTP_POOL_SIZE):
+            _workers.append(asyncio.create_task(_work()))
+
+
+async def stop_mailer():
+    """Give queued messages a chance to go out, then close the pool."""
+    global _queue
+    if not _workers:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), EMAIL_DRAIN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"Mailer did not drain in time, {_queue.qsize()} email(s) not sent")
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "pending": _queue.qsize() if _queue is not None else 0,
+        "max_pending": EMAIL_QUEUE_MAX,
+        "pool_size": SMTP_POOL_SIZE,
+        "running": bool(_workers),
+    }
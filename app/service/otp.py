@@ -1,66 +1,128 @@
 from fastapi import HTTPException
-from app.core.redis import redis_client
+from app.core.redis import async_redis_client
+from app.core.config import (
+    OTP_TTL_SECONDS, OTP_COOLDOWN_SECONDS, OTP_MAX_ATTEMPTS,
+    OTP_ATTEMPT_WINDOW_SECONDS, OTP_LOCKOUT_SECONDS, VERIFIED_EMAIL_TTL_SECONDS
+)
 from app.utils.otp import generate_otp
 from app.utils.email import send_otp_email
 from app.utils.email_validator import validate_email_address
 
+# Both flows run as one server-side script each, so concurrent requests for
+# the same email can't slip between the check and the write.
+# KEYS: otp, cooldown, lock   ARGV: otp, otp ttl, cooldown ttl
+# -> {1} issued | {0, ms} cooling down | {-1, ms} locked out
+_ISSUE_SCRIPT = """
+local locked = redis.call('PTTL', KEYS[3])
+if locked > 0 then
+    return {-1, locked}
+end
+local cooling = redis.call('PTTL', KEYS[2])
+if cooling > 0 then
+    return {0, cooling}
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+return {1}
+"""
+
+# KEYS: otp, lock, attempts, verified
+# ARGV: code, verified ttl, max attempts, attempt window, lockout
+# -> {1} verified | {0} no code | {2, left} wrong code | {-1, ms} locked out
+_VERIFY_SCRIPT = """
+local locked = redis.call('PTTL', KEYS[2])
+if locked > 0 then
+    return {-1, locked}
+end
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return {0}
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[3])
+    redis.call('SET', KEYS[4], 'true', 'EX', ARGV[2])
+    return {1}
+end
+local attempts = redis.call('INCR', KEYS[3])
+if attempts == 1 then
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+end
+if attempts >= tonumber(ARGV[3]) then
+    -- Burn the code too, so the lockout can't be waited out against it
+    redis.call('DEL', KEYS[1], KEYS[3])
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[5])
+    return {-1, tonumber(ARGV[5]) * 1000}
+end
+return {2, tonumber(ARGV[3]) - attempts}
+"""
+
+_issue = async_redis_client.register_script(_ISSUE_SCRIPT)
+_verify = async_redis_client.register_script(_VERIFY_SCRIPT)
+
+
+def _seconds(ms: int) -> int:
+    return max(1, -(-int(ms) // 1000))
+
+
+def _locked_out(ms: int) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many incorrect codes. Please try again in {_seconds(ms)} seconds.",
+        headers={"Retry-After": str(_seconds(ms))}
+    )
+
+
 async def request_otp_service(email: str):
-    email = validate_email_address(email)
-    
+    email = await validate_email_address(email)
+
+    otp_key = f"otp:{email}"
     cooldown_key = f"otp_cooldown:{email}"
-    if redis_client.get(cooldown_key):
+    otp = generate_otp(length=6)
+
+    status, *rest = await _issue(
+        keys=[otp_key, cooldown_key, f"otp_lock:{email}"],
+        args=[otp, OTP_TTL_SECONDS, OTP_COOLDOWN_SECONDS]
+    )
+    if status == -1:
+        raise _locked_out(rest[0])
+    if status == 0:
         raise HTTPException(
-            status_code=429, 
-            detail="Too many requests. Please wait 60 seconds before requesting another code."
+            status_code=429,
+            detail=f"Too many requests. Please wait {_seconds(rest[0])} seconds before requesting another code.",
+            headers={"Retry-After": str(_seconds(rest[0]))}
         )
-    
-    otp = generate_otp(length=6)
-    
-    redis_client.setex(f"otp:{email}", 300, otp)
-    
+
+    async def forget_otp(message):
+        # Undeliverable: let the user ask again straight away
+        await async_redis_client.delete(otp_key, cooldown_key)
+
     try:
-        email_sent = await send_otp_email(email, otp)
-        
-        if not email_sent:
-            redis_client.delete(f"otp:{email}")
-            raise HTTPException(
-                status_code=500, 
-                detail="Failed to send verification email. Please try again."
-            )
-        
-        redis_client.setex(cooldown_key, 60, "true")
-        
-        return {
-            "message": "Verification code sent to email. Please check your inbox.",
-            "email": email
-        }
-        
-    except HTTPException:
+        # Returns once queued; the mailer sends and retries in the background
+        await send_otp_email(email, otp, on_failure=forget_otp)
+    except Exception:
+        await forget_otp(None)
         raise
-    except Exception as e:
-        redis_client.delete(f"otp:{email}")
-        print(f"Error in request_otp_service: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="An error occurred while processing your request"
-        )
 
-def verify_otp_service(email: str, otp: str):
+    return {
+        "message": "Verification code sent to email. Please check your inbox.",
+        "email": email
+    }
+
+async def verify_otp_service(email: str, otp: str):
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
     if not otp:
         raise HTTPException(status_code=400, detail="OTP code is required")
-    
-    stored_otp = redis_client.get(f"otp:{email}")
-    
-    if not stored_otp:
+
+    status, *rest = await _verify(
+        keys=[f"otp:{email}", f"otp_lock:{email}", f"otp_attempts:{email}", f"verified_email:{email}"],
+        args=[otp, VERIFIED_EMAIL_TTL_SECONDS, OTP_MAX_ATTEMPTS, OTP_ATTEMPT_WINDOW_SECONDS, OTP_LOCKOUT_SECONDS]
+    )
+    if status == -1:
+        raise _locked_out(rest[0])
+    if status == 0:
         raise HTTPException(status_code=400, detail="OTP expired or not found. Please request a new code.")
-    
-    if stored_otp != otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP code")
-    
-    redis_client.setex(f"verified_email:{email}", 900, "true")
-    
-    redis_client.delete(f"otp:{email}")
-    
+    if status == 2:
+        raise HTTPException(status_code=400, detail=f"Invalid OTP code. {rest[0]} attempt(s) left.")
+
     return {"message": "Email verified successfully", "email": email}
@@ -1,62 +1,161 @@
 import secrets
 import json
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.core.redis import redis_client
-from app.models.models import Product, TokenUsageStorage
+from typing import Dict, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import PRODUCT_TOKEN_TTL_SECONDS, PRODUCT_CACHE_SECONDS
+from app.models.models import Product
+from app.service import usage_writer
 
-async def generate_product_token(product_id: int, db: Session, user_agent: str, client_ip: str, tenant_id: int, user_id: int = None):
-    product = db.query(Product).filter(Product.product_id == product_id).first()
+# Outlives every token issued before the product was deleted
+TOMBSTONE_SECONDS = max(PRODUCT_TOKEN_TTL_SECONDS * 6, 60)
+
+# Burns the token and reports whether its product has since been deleted.
+# Both keys share the product's hash tag, so this stays on one cluster slot.
+_VERIFY_SCRIPT = """
+local payload = redis.call('GET', KEYS[1])
+if not payload then
+    return {0}
+end
+redis.call('DEL', KEYS[1])
+return {1, payload, redis.call('EXISTS', KEYS[2])}
+"""
+
+_verify = async_redis_client.register_script(_VERIFY_SCRIPT)
+
+
+def _token_key(product_id, secret: str) -> str:
+    return f"p_access:{{{product_id}}}:{secret}"
+
+def _launch_url_key(product_id) -> str:
+    return f"product:{{{product_id}}}:launch_url"
+
+def _tombstone_key(product_id) -> str:
+    return f"product:{{{product_id}}}:tombstone"
+
+
+# Product cache invalidation. Call these only after the change is committed.
+
+def forget_product(product_id: int, deleted: bool = False):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(_launch_url_key(product_id))
+    if deleted:
+        pipe.setex(_tombstone_key(product_id), TOMBSTONE_SECONDS, "1")
+    else:
+        # Ids can be reused after a delete on some backends
+        pipe.delete(_tombstone_key(product_id))
+    pipe.execute()
+
+async def forget_product_async(product_id: int, deleted: bool = False):
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.delete(_launch_url_key(product_id))
+    if deleted:
+        pipe.setex(_tombstone_key(product_id), TOMBSTONE_SECONDS, "1")
+    else:
+        pipe.delete(_tombstone_key(product_id))
+    await pipe.execute()
+
+
+async def _launch_url(product_id: int, db: AsyncSession) -> str:
+    launch_url = await async_redis_client.get(_launch_url_key(product_id))
+    if launch_url is not None:
+        return launch_url
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    token = secrets.token_urlsafe(32)
-    
+    await async_redis_client.setex(_launch_url_key(product_id), PRODUCT_CACHE_SECONDS, product.launch_url)
+    return product.launch_url
+
+
+async def launch_urls(product_ids: List[int], db: AsyncSession) -> Dict[int, str]:
+    """Launch URLs for several products: one MGET, plus one query for any misses."""
+    if not product_ids:
+        return {}
+    cached = await async_redis_client.mget([_launch_url_key(product_id) for product_id in product_ids])
+    urls = {product_id: url for product_id, url in zip(product_ids, cached) if url is not None}
+
+    missing = [product_id for product_id in product_ids if product_id not in urls]
+    if missing:
+        rows = (await db.execute(
+            select(Product.product_id, Product.launch_url).where(Product.product_id.in_(missing))
+        )).all()
+        pipe = async_redis_client.pipeline(transaction=False)
+        for product_id, launch_url in rows:
+            urls[product_id] = launch_url
+            pipe.setex(_launch_url_key(product_id), PRODUCT_CACHE_SECONDS, launch_url)
+        await pipe.execute()
+    return urls
+
+
+def _new_token(product_id: int, user_agent: str, client_ip: str, tenant_id: int, user_id):
+    secret = secrets.token_urlsafe(32)
+    # The product id prefix lets verification find the token and tombstone together
+    token = f"{product_id}.{secret}"
+    # Everything verification needs, so it never has to touch the database
     data = {
-        "pid": product_id, 
+        "pid": product_id,
         "ua": user_agent,
         "ip": client_ip,
         "tid": tenant_id,
         "uid": user_id
     }
-    redis_client.setex(f"p_access:{token}", 10, json.dumps(data))
-    
-    # Store in database
-    db_token = TokenUsageStorage(
-        token=token,
-        tenant_id=tenant_id,
-        user_id=user_id,
-        product_id=product_id
-    )
-    db.add(db_token)
-    db.commit()
-    
+    return token, _token_key(product_id, secret), json.dumps(data)
+
+
+def _with_token(launch_url: str, token: str) -> str:
     # Simple logic to append token to URL
-    separator = "&" if "?" in product.launch_url else "?"
-    full_url = f"{product.launch_url}{separator}magic_token={token}"
+    separator = "&" if "?" in launch_url else "?"
+    return f"{launch_url}{separator}magic_token={token}"
+
+
+async def generate_product_token(product_id: int, db: AsyncSession, user_agent: str, client_ip: str, tenant_id: int, user_id: int = None, product: Product = None):
+    # Callers that already loaded the product (tenant access check) pass it in
+    launch_url = product.launch_url if product is not None else await _launch_url(product_id, db)
+    token, key, payload = _new_token(product_id, user_agent, client_ip, tenant_id, user_id)
+    await async_redis_client.setex(key, PRODUCT_TOKEN_TTL_SECONDS, payload)
     
-    return full_url
+    # Audit row is written behind, off the request path
+    await usage_writer.enqueue(usage_writer.usage_record(token, tenant_id, user_id, product_id))
+    
+    return _with_token(launch_url, token)
+
+async def generate_product_tokens(launch_urls: Dict[int, str], user_agent: str, client_ip: str, tenant_id: int, user_id: int = None) -> Dict[int, str]:
+    """
+    Issue one magic link per product (access already checked by the caller).
+    All tokens go out in one pipeline and all usage rows in one enqueue.
+    """
+    links, records = {}, []
+    pipe = async_redis_client.pipeline(transaction=False)
+    for product_id, launch_url in launch_urls.items():
+        token, key, payload = _new_token(product_id, user_agent, client_ip, tenant_id, user_id)
+        pipe.setex(key, PRODUCT_TOKEN_TTL_SECONDS, payload)
+        records.append(usage_writer.usage_record(token, tenant_id, user_id, product_id))
+        links[product_id] = _with_token(launch_url, token)
+    await pipe.execute()
 
-async def verify_product_token(user_agent: str, client_ip: str, token: str, db: Session):
+    await usage_writer.enqueue_many(records)
+    return links
+
+async def verify_product_token(user_agent: str, client_ip: str, token: str):
     """
     Verifies the magic token and burns it immediately (one-time use).
-    Prevents URL reuse by deleting the token from Redis.
+    One Redis round trip: fetch + delete the token and check the product tombstone.
     """
-    try:
-        # getdel is available in Redis 6.2+
-        raw_data = redis_client.getdel(f"p_access:{token}")
-    except AttributeError:
-        # Fallback for older Redis versions
-        raw_data = redis_client.get(f"p_access:{token}")
-        if raw_data:
-            redis_client.delete(f"p_access:{token}")
-
-    if not raw_data:
+    product_id, _, secret = token.partition(".")
+    if not product_id.isdigit() or not secret:
         raise HTTPException(status_code=400, detail="Token expired, invalid, or already used")
-    
-    stored = json.loads(raw_data)
-    product = db.query(Product).filter(Product.product_id == stored["pid"]).first()
-    if not product:
+
+    found, *rest = await _verify(keys=[_token_key(product_id, secret), _tombstone_key(product_id)])
+    if not found:
+        raise HTTPException(status_code=400, detail="Token expired, invalid, or already used")
+
+    raw_data, deleted = rest
+    if deleted:
         raise HTTPException(status_code=404, detail="Product not found")
+
+    stored = json.loads(raw_data)
     
     if stored.get("ua") != user_agent:
         raise HTTPException(status_code=403, detail="Security error: Use the same browser")
@@ -64,4 +163,4 @@ async def verify_product_token(user_agent: str, client_ip: str, token: str, db:
     if stored.get("ip") != client_ip:
         raise HTTPException(status_code=403, detail="Security error: Use the same network/IP")
     
-    return {"status": "success", "valid": True}
\ No newline at end of file
+    return {"status": "success", "valid": True}
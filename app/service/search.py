@@ -0,0 +1,224 @@
+"""
+Ranked substring search for the list filters (product name, role name,
+username, email).
+
+Backends:
+  trigram - PostgreSQL pg_trgm GIN indexes, ranked by similarity()
+  fts5    - SQLite FTS5 trigram shadow tables, ranked by bm25
+  memory  - in-process trigram index over product names, rebuilt per catalog version
+  like    - plain ILIKE, ordered by primary key (no index, last resort)
+
+Each backend returns matching primary keys best-first, capped at
+SEARCH_MAX_RESULTS; callers page through them with paginate_ranked. When a
+filter matches more than that, the ranking is marked truncated and
+paginate_ranked pages the plain ILIKE filter by primary key instead, so no
+matches are lost past the cap (they just come unranked).
+"""
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import select, text, table, column, func
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import SEARCH_BACKEND, SEARCH_MAX_RESULTS
+from app.models.models import Product, Role, User
+from app.models.search_index import SHADOW_TABLES
+from app.service import catalog
+
+# filter name -> (primary key, searched column)
+TARGETS = {
+    "product_name": (Product.product_id, Product.product_name),
+    "role_name": (Role.role_id, Role.role_name),
+    "username": (User.user_id, User.username),
+    "email": (User.user_id, User.email),
+}
+
+# Trigram tokenizers can't match anything shorter than one trigram
+MIN_TRIGRAM_TERM = 3
+
+_FTS_PROBE = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_search'")
+_fts_available: Dict[str, bool] = {}
+
+
+class Ranking(list):
+    """Ranked keys, plus the unranked filter to page by key if `truncated`."""
+
+    def __init__(self, keys, truncated: bool = False, where=()):
+        super().__init__(keys)
+        self.truncated = truncated
+        self.where = list(where)
+
+
+def _backend(dialect: str, has_fts: bool, target: str, term: str) -> str:
+    backend = SEARCH_BACKEND
+    if backend == "auto":
+        if dialect == "postgresql":
+            backend = "trigram"
+        elif dialect == "sqlite" and has_fts:
+            backend = "fts5"
+        else:
+            backend = "memory"
+    if backend == "fts5" and len(term) < MIN_TRIGRAM_TERM:
+        backend = "like"
+    if backend == "memory" and target != "product_name":
+        backend = "like"
+    return backend
+
+
+def _pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _ranked_stmt(backend: str, target: str, term: str, within):
+    key, col = TARGETS[target]
+
+    if backend == "fts5":
+        shadow = SHADOW_TABLES[col.table.name][0]
+        fts = table(shadow, column("rowid"), column("rank"))
+        phrase = '"' + term.replace('"', '""') + '"'
+        stmt = (
+            select(fts.c.rowid)
+            .where(text(f"{shadow} MATCH :match").bindparams(match=f"{col.key} : {phrase}"))
+            .order_by(fts.c.rank, fts.c.rowid)
+        )
+        if within is not None:
+            stmt = stmt.where(fts.c.rowid.in_(within))
+        return stmt.limit(SEARCH_MAX_RESULTS)
+
+    stmt = select(key).where(col.ilike(_pattern(term), escape="\\"))
+    if within is not None:
+        stmt = stmt.where(key.in_(within))
+    if backend == "trigram":
+        stmt = stmt.order_by(func.similarity(col, term).desc(), key)
+    else:
+        stmt = stmt.order_by(key)
+    return stmt.limit(SEARCH_MAX_RESULTS)
+
+
+# In-memory product index
+
+_memory = {"version": None, "names": {}, "grams": {}}
+_memory_lock = threading.Lock()
+
+
+def _trigrams(value: str):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _rebuild_memory(version: str, rows):
+    names, grams = {}, {}
+    for product_id, product_name in rows:
+        name = (product_name or "").lower()
+        names[product_id] = name
+        for gram in _trigrams(name):
+            grams.setdefault(gram, set()).add(product_id)
+    with _memory_lock:
+        _memory.update(version=version, names=names, grams=grams)
+
+
+def _match_rank(name: str, term: str) -> int:
+    if name == term:
+        return 0
+    if name.startswith(term):
+        return 1
+    if f" {term}" in name:
+        return 2
+    return 3
+
+
+def _memory_ranked(term: str, allowed: Optional[set]) -> List[int]:
+    term = term.lower()
+    with _memory_lock:
+        names, grams = _memory["names"], _memory["grams"]
+
+    if len(term) >= MIN_TRIGRAM_TERM:
+        # Intersect the rarest posting lists first
+        postings = sorted((grams.get(gram, set()) for gram in _trigrams(term)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+    else:
+        candidates = names.keys()
+
+    matches = [
+        product_id for product_id in candidates
+        if term in names[product_id] and (allowed is None or product_id in allowed)
+    ]
+    matches.sort(key=lambda product_id: (_match_rank(names[product_id], term), len(names[product_id]), product_id))
+    return matches[:SEARCH_MAX_RESULTS]
+
+
+def _memory_stale(version: str) -> bool:
+    with _memory_lock:
+        return _memory["version"] != version
+
+
+def _combine(active, ranked_lists: List[List[int]]) -> Ranking:
+    # Rank by the first filter, keep only ids every other filter matched too
+    ranked = ranked_lists[0]
+    for other in ranked_lists[1:]:
+        allowed = set(other)
+        ranked = [key for key in ranked if key in allowed]
+    # A capped list may have cut off matches (and, for several filters, the
+    # intersection too), so the caller has to fall back to the plain filter
+    if any(len(keys) >= SEARCH_MAX_RESULTS for keys in ranked_lists):
+        where = [TARGETS[target][1].ilike(_pattern(term), escape="\\") for target, term in active]
+        return Ranking(ranked, truncated=True, where=where)
+    return Ranking(ranked)
+
+
+def _active(filters: Dict[str, Optional[str]]):
+    return [(target, term) for target, term in filters.items() if term]
+
+
+def ranked_ids(db: Session, filters: Dict[str, Optional[str]], within=None) -> Optional[Ranking]:
+    """
+    Primary keys matching every non-empty filter, best match first.
+    `within` is an optional select() of allowed keys (e.g. one tenant's rows).
+    Returns None when no filter is set so callers can skip search entirely.
+    """
+    active = _active(filters)
+    if not active:
+        return None
+
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    url = str(bind.url)
+    if dialect == "sqlite" and url not in _fts_available:
+        _fts_available[url] = db.execute(_FTS_PROBE).first() is not None
+
+    results = []
+    for target, term in active:
+        backend = _backend(dialect, _fts_available.get(url, False), target, term)
+        if backend == "memory":
+            version = catalog.current_version()
+            if _memory_stale(version):
+                _rebuild_memory(version, db.execute(select(Product.product_id, Product.product_name)).all())
+            allowed = set(db.execute(within).scalars()) if within is not None else None
+            results.append(_memory_ranked(term, allowed))
+        else:
+            results.append(list(db.execute(_ranked_stmt(backend, target, term, within)).scalars()))
+    return _combine(active, results)
+
+
+async def ranked_ids_async(db: AsyncSession, filters: Dict[str, Optional[str]], within=None) -> Optional[Ranking]:
+    active = _active(filters)
+    if not active:
+        return None
+
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    url = str(bind.url)
+    if dialect == "sqlite" and url not in _fts_available:
+        _fts_available[url] = (await db.execute(_FTS_PROBE)).first() is not None
+
+    results = []
+    for target, term in active:
+        backend = _backend(dialect, _fts_available.get(url, False), target, term)
+        if backend == "memory":
+            version = await catalog.current_version_async()
+            if _memory_stale(version):
+                _rebuild_memory(version, (await db.execute(select(Product.product_id, Product.product_name))).all())
+            allowed = set((await db.scalars(within)).all()) if within is not None else None
+            results.append(_memory_ranked(term, allowed))
+        else:
+            results.append(list((await db.scalars(_ranked_stmt(backend, target, term, within))).all()))
+    return _combine(active, results)
@@ -1,13 +1,15 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.core.redis import redis_client
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.redis import async_redis_client
 from app.models.models import Tenant
 from app.schemas.tenant import TenantCreate
-from app.core.security import hash_password
+from app.core.security import hash_password_async
+from app.service import login_identity
 
-def signup_tenant_service(db: Session, tenant_data: TenantCreate):
+async def signup_tenant_service(db: AsyncSession, tenant_data: TenantCreate):
     verification_key = f"verified_email:{tenant_data.email}"
-    is_verified = redis_client.get(verification_key)
+    is_verified = await async_redis_client.get(verification_key)
     
     if not is_verified or is_verified != "true":
         raise HTTPException(
@@ -15,18 +17,18 @@ def signup_tenant_service(db: Session, tenant_data: TenantCreate):
             detail="Email not verified. Please verify your email with OTP first."
         )
 
-    existing_tenant = db.query(Tenant).filter(Tenant.email == tenant_data.email).first()
+    existing_tenant = await db.scalar(select(Tenant).where(Tenant.email == tenant_data.email))
     if existing_tenant:
         raise HTTPException(status_code=400, detail="A tenant with this email already exists")
     
-    existing_name = db.query(Tenant).filter(Tenant.name == tenant_data.name).first()
+    existing_name = await db.scalar(select(Tenant).where(Tenant.name == tenant_data.name))
     if existing_name:
         raise HTTPException(
             status_code=400, 
             detail=f"Tenant name '{tenant_data.name}' is already taken. Please choose a different name."
         )
     
-    hashed_pwd = hash_password(tenant_data.password)
+    hashed_pwd = await hash_password_async(tenant_data.password)
     new_tenant = Tenant(
         name=tenant_data.name,
         email=tenant_data.email,
@@ -36,9 +38,10 @@ def signup_tenant_service(db: Session, tenant_data: TenantCreate):
     )
 
     db.add(new_tenant)
-    db.commit()
-    db.refresh(new_tenant)
+    await db.commit()
+    await db.refresh(new_tenant)
+    await login_identity.forget_unknown_email(new_tenant.email)
 
-    redis_client.delete(f"verified_email:{tenant_data.email}")
+    await async_redis_client.delete(f"verified_email:{tenant_data.email}")
 
     return new_tenant
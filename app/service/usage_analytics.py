@@ -0,0 +1,101 @@
+"""
+Launch analytics read from token_usage_daily.
+
+The rollup is maintained incrementally: every write-behind flush of
+token_usage_storage upserts its per-(day, tenant, product, user) counts in
+the same transaction, so reports never touch the raw token table. Rows are
+per user, which makes distinct-user counts exact.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.models.models import TokenUsageDaily
+from app.utils.upsert import dialect_insert
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+GROUPINGS = ("day", "product", "user")
+
+
+async def record_launches(conn, rows: List[Dict[str, Any]]):
+    """Add a batch of token usage rows to the daily rollup, inside the caller's transaction."""
+    counts = Counter(
+        (row["created_at"].astimezone(timezone.utc).date(), row["tenant_id"], row["product_id"], row["user_id"] or 0)
+        for row in rows
+    )
+    # Sorted keys keep concurrent flushes from locking rows in different orders
+    values = [
+        {"day": day, "tenant_id": tenant_id, "product_id": product_id, "user_id": user_id, "launches": launches}
+        for (day, tenant_id, product_id, user_id), launches in sorted(counts.items())
+    ]
+    insert, mysql = dialect_insert(conn.dialect.name)
+    stmt = insert(TokenUsageDaily).values(values)
+    if mysql:
+        stmt = stmt.on_duplicate_key_update(launches=TokenUsageDaily.launches + stmt.inserted.launches)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "tenant_id", "product_id", "user_id"],
+            set_={"launches": TokenUsageDaily.launches + stmt.excluded.launches},
+        )
+    await conn.execute(stmt)
+
+
+def _date_range(start: Optional[date], end: Optional[date]):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def usage_report(
+    db: Session,
+    group_by: str = "day",
+    tenant_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    top: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Launches (and distinct users) per day, product or user over [start, end].
+    Product and user groupings are ordered busiest first; `top` keeps the first N.
+    """
+    if group_by not in GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUPINGS)}")
+    start, end = _date_range(start, end)
+
+    launches = func.sum(TokenUsageDaily.launches).label("launches")
+    # user_id 0 is the tenant owner, not a user
+    distinct_users = func.count(func.distinct(func.nullif(TokenUsageDaily.user_id, 0))).label("distinct_users")
+
+    if group_by == "day":
+        stmt = select(TokenUsageDaily.day, launches, distinct_users).group_by(TokenUsageDaily.day).order_by(TokenUsageDaily.day)
+    elif group_by == "product":
+        stmt = (
+            select(TokenUsageDaily.product_id, launches, distinct_users)
+            .group_by(TokenUsageDaily.product_id)
+            .order_by(launches.desc(), TokenUsageDaily.product_id)
+        )
+    else:
+        stmt = (
+            select(TokenUsageDaily.user_id, launches)
+            .where(TokenUsageDaily.user_id != 0)
+            .group_by(TokenUsageDaily.user_id)
+            .order_by(launches.desc(), TokenUsageDaily.user_id)
+        )
+
+    stmt = stmt.where(TokenUsageDaily.day >= start, TokenUsageDaily.day <= end)
+    if tenant_id is not None:
+        stmt = stmt.where(TokenUsageDaily.tenant_id == tenant_id)
+    if product_id is not None:
+        stmt = stmt.where(TokenUsageDaily.product_id == product_id)
+    if top:
+        stmt = stmt.limit(max(1, top))
+
+    return [dict(row._mapping) for row in db.execute(stmt)]
@@ -0,0 +1,187 @@
+"""
+Retention and compaction for token_usage_storage.
+
+One worker per interval (Redis lock) runs a compaction pass:
+  1. prune raw rows older than USAGE_RETENTION_DAYS
+  2. on PostgreSQL, create the upcoming daily partitions
+
+Daily counts survive pruning in token_usage_daily, which the write-behind
+flush keeps current (see app/service/usage_analytics.py); rows stored
+before the rollup existed were counted into it by the migration that
+created it.
+
+On PostgreSQL the migration turns token_usage_storage into a table
+partitioned by day, so pruning drops whole partitions and every partition
+keeps small indexes. SQLite (or a PostgreSQL table made by create_all) has no
+partitions, so rows are pruned with batched DELETEs on the created_at index.
+
+    python -m app.service.usage_retention   # run one pass now
+"""
+import asyncio
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+from sqlalchemy import select, delete, text
+from app.core.database import get_async_engine, dispose_async_engine
+from app.core.redis import async_redis_client
+from app.core.config import (
+    USAGE_RETENTION_DAYS,
+    USAGE_COMPACT_INTERVAL_SECONDS,
+    USAGE_PARTITION_PREMAKE_DAYS,
+    USAGE_PRUNE_BATCH_SIZE,
+)
+from app.models.models import TokenUsageStorage
+
+LOCK_KEY = "usage_compactor:lock"
+PARTITION_NAME = re.compile(r"^token_usage_storage_p(\d{8})$")
+DEFAULT_PARTITION = "token_usage_storage_default"
+
+_compactor_task = None
+_stats = {"runs": 0, "failures": 0, "last_run_at": None, "last_run_ms": 0.0, "last_result": None}
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def partition_name(day: date) -> str:
+    return f"token_usage_storage_p{day:%Y%m%d}"
+
+
+def partition_ddl(day: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF token_usage_storage "
+        f"FOR VALUES FROM ('{_midnight(day).isoformat()}') TO ('{_midnight(day + timedelta(days=1)).isoformat()}')"
+    )
+
+
+async def _is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    found = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'token_usage_storage'"
+    ))
+    return found.first() is not None
+
+
+async def _delete_older_than(engine, table, cutoff: datetime) -> int:
+    # Small batches, each in its own transaction, so writers never wait long
+    pruned = 0
+    while True:
+        async with engine.begin() as conn:
+            if table is TokenUsageStorage:
+                doomed = select(TokenUsageStorage.id).where(TokenUsageStorage.created_at < cutoff).limit(USAGE_PRUNE_BATCH_SIZE)
+                result = await conn.execute(delete(TokenUsageStorage).where(TokenUsageStorage.id.in_(doomed)))
+            else:
+                result = await conn.execute(text(
+                    f"DELETE FROM {table} WHERE ctid IN "
+                    f"(SELECT ctid FROM {table} WHERE created_at < :cutoff LIMIT :batch)"
+                ), {"cutoff": cutoff, "batch": USAGE_PRUNE_BATCH_SIZE})
+        pruned += result.rowcount
+        if result.rowcount < USAGE_PRUNE_BATCH_SIZE:
+            return pruned
+
+
+async def prune(engine, now: datetime) -> Dict[str, int]:
+    async with engine.connect() as conn:
+        partitioned = await _is_partitioned(conn)
+
+    cutoff_day = now.date() - timedelta(days=USAGE_RETENTION_DAYS)
+    cutoff = _midnight(cutoff_day)
+
+    if not partitioned:
+        return {"pruned_rows": await _delete_older_than(engine, TokenUsageStorage, cutoff), "dropped_partitions": 0}
+
+    dropped = 0
+    async with engine.begin() as conn:
+        partitions = (await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'token_usage_storage'"
+        ))).scalars().all()
+        for name in partitions:
+            match = PARTITION_NAME.match(name)
+            if match and datetime.strptime(match.group(1), "%Y%m%d").date() < cutoff_day:
+                await conn.execute(text(f"DROP TABLE {name}"))
+                dropped += 1
+
+    # Rows that landed in the default partition (before their day existed) age out by DELETE
+    pruned = await _delete_older_than(engine, DEFAULT_PARTITION, cutoff)
+    return {"pruned_rows": pruned, "dropped_partitions": dropped}
+
+
+async def premake_partitions(engine, today: date) -> int:
+    created = 0
+    async with engine.connect() as conn:
+        if not await _is_partitioned(conn):
+            return 0
+    for offset in range(1, USAGE_PARTITION_PREMAKE_DAYS + 1):
+        async with engine.begin() as conn:
+            try:
+                await conn.execute(text(partition_ddl(today + timedelta(days=offset))))
+                created += 1
+            except Exception as e:
+                # e.g. the default partition already holds rows for that day
+                print(f"Could not create usage partition for {today + timedelta(days=offset)}: {str(e)}")
+    return created
+
+
+async def compact_once(now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    engine = get_async_engine()
+    result = await prune(engine, now)
+    result["premade_partitions"] = await premake_partitions(engine, now.date())
+    return result
+
+
+async def _run():
+    while True:
+        try:
+            # One worker per interval does the pass
+            if await async_redis_client.set(LOCK_KEY, "1", nx=True, ex=USAGE_COMPACT_INTERVAL_SECONDS):
+                started = time.perf_counter()
+                _stats["last_result"] = await compact_once()
+                _stats["runs"] += 1
+                _stats["last_run_at"] = datetime.now(timezone.utc).isoformat()
+                _stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["failures"] += 1
+            print(f"Token usage compaction failed: {str(e)}")
+        await asyncio.sleep(USAGE_COMPACT_INTERVAL_SECONDS)
+
+
+def start_compactor():
+    """Must be called on the event loop."""
+    global _compactor_task
+    if _compactor_task is None:
+        _compactor_task = asyncio.create_task(_run())
+
+
+async def stop_compactor():
+    global _compactor_task
+    if _compactor_task is None:
+        return
+    _compactor_task.cancel()
+    try:
+        await _compactor_task
+    except asyncio.CancelledError:
+        pass
+    _compactor_task = None
+
+
+def stats() -> Dict[str, Any]:
+    return {**_stats, "retention_days": USAGE_RETENTION_DAYS, "running": _compactor_task is not None}
+
+
+if __name__ == "__main__":
+    async def _main():
+        try:
+            print(await compact_once())
+        finally:
+            await dispose_async_engine()
+
+    asyncio.run(_main())
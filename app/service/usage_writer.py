@@ -0,0 +1,240 @@
+"""
+Write-behind queue for TokenUsageStorage.
+
+Magic-link generation only enqueues the audit row; a background task on the
+event loop flushes the queue with multi-row INSERTs whenever USAGE_BATCH_SIZE
+rows are waiting or USAGE_FLUSH_SECONDS have passed since the first one.
+Each flush also adds its rows to the token_usage_daily rollup. When the
+queue is full callers wait up to USAGE_ENQUEUE_TIMEOUT_SECONDS for room,
+then get a 503 (a batch is queued whole or not at all), and the lifespan
+shutdown drains whatever is left.
+
+Only transient database errors (lost connection, lock timeout) are retried.
+A batch the database rejects outright is split in half until the offending
+rows are isolated; those are dropped and counted, so one bad row (say, for a
+product deleted while it was queued) can't stall the writer.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+from app.core.database import get_async_engine
+from app.core.config import (
+    USAGE_QUEUE_MAX,
+    USAGE_BATCH_SIZE,
+    USAGE_FLUSH_SECONDS,
+    USAGE_DRAIN_TIMEOUT_SECONDS,
+    USAGE_ENQUEUE_TIMEOUT_SECONDS,
+)
+from app.models.models import TokenUsageStorage
+from app.service import usage_analytics
+
+_queue: Optional[asyncio.Queue] = None
+_writer_task = None
+# Chunks of the current batch taken off the queue but not yet committed
+_in_flight: List[List[Dict[str, Any]]] = []
+_stats = {
+    "enqueued": 0,
+    "written": 0,
+    "batches": 0,
+    "failed_batches": 0,
+    "dropped": 0,
+    "blocked_enqueues": 0,
+    "rejected_enqueues": 0,
+    "last_batch_size": 0,
+    "last_flush_ms": 0.0,
+}
+
+
+def usage_record(token: str, tenant_id: int, user_id: Optional[int], product_id: int) -> Dict[str, Any]:
+    # Stamp the time now, not when the batch happens to be flushed
+    return {
+        "token": token,
+        "tenant_id": tenant_id,
+        "user_id": user_id,
+        "product_id": product_id,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+async def _insert(rows: List[Dict[str, Any]]):
+    started = time.perf_counter()
+    async with get_async_engine().begin() as conn:
+        await conn.execute(insert(TokenUsageStorage), rows)
+        # Same transaction, so the rollup never counts a row that was not stored
+        await usage_analytics.record_launches(conn, rows)
+    _stats["written"] += len(rows)
+    _stats["batches"] += 1
+    _stats["last_batch_size"] = len(rows)
+    _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def _busy():
+    _stats["rejected_enqueues"] += 1
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "5"}
+    )
+
+
+async def enqueue(record: Dict[str, Any]):
+    if _queue is None:
+        # Writer not running (scripts, tests): write through
+        await _insert([record])
+        return
+    try:
+        _queue.put_nowait(record)
+    except asyncio.QueueFull:
+        # Backpressure: wait a little for the writer rather than lose audit rows
+        _stats["blocked_enqueues"] += 1
+        try:
+            await asyncio.wait_for(_queue.put(record), USAGE_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise _busy()
+    _stats["enqueued"] += 1
+
+
+async def enqueue_many(records: List[Dict[str, Any]]):
+    """All or nothing: a 503 means none of the records were queued."""
+    if not records:
+        return
+    if _queue is None:
+        await _insert(records)
+        return
+    if len(records) > _queue.maxsize:
+        raise _busy()
+    if _queue.maxsize - _queue.qsize() < len(records):
+        _stats["blocked_enqueues"] += 1
+        deadline = time.monotonic() + USAGE_ENQUEUE_TIMEOUT_SECONDS
+        # Queue has no "room for n" wait, so poll while the writer drains it
+        while _queue.maxsize - _queue.qsize() < len(records):
+            if time.monotonic() >= deadline:
+                raise _busy()
+            await asyncio.sleep(0.05)
+    # No await from the check to here, so nothing else can take the room
+    for record in records:
+        _queue.put_nowait(record)
+    _stats["enqueued"] += len(records)
+
+
+async def _next_batch() -> List[Dict[str, Any]]:
+    batch = [await _queue.get()]
+    deadline = time.monotonic() + USAGE_FLUSH_SECONDS
+    while len(batch) < USAGE_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+def _is_transient(e: Exception) -> bool:
+    # The database was unavailable, as opposed to rejecting the rows themselves
+    if isinstance(e, DBAPIError):
+        return isinstance(e, OperationalError) or e.connection_invalidated
+    return isinstance(e, (OSError, asyncio.TimeoutError))
+
+
+async def _flush(retry: bool = True) -> int:
+    """
+    Write the chunks in _in_flight, popping each once committed.
+    Returns how many rows were left unwritten (only when retry is False).
+    """
+    delay = 0.5
+    while _in_flight:
+        rows = _in_flight[-1]
+        try:
+            await _insert(rows)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if _is_transient(e):
+                _stats["failed_batches"] += 1
+                if not retry:
+                    print(f"Token usage flush of {len(rows)} rows failed: {str(e)}")
+                    return sum(len(chunk) for chunk in _in_flight)
+                print(f"Token usage flush of {len(rows)} rows failed, retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+            _in_flight.pop()
+            if len(rows) == 1:
+                _stats["dropped"] += 1
+                print(f"Dropped token usage row for product {rows[0]['product_id']}, rejected by the database: {str(e)}")
+            else:
+                # Retry each half, first half first, until the bad rows are isolated
+                middle = len(rows) // 2
+                _in_flight.extend([rows[middle:], rows[:middle]])
+            continue
+        _in_flight.pop()
+        delay = 0.5
+    return 0
+
+
+async def _run():
+    while True:
+        batch = await _next_batch()
+        _in_flight.append(batch)
+        await _flush()
+        for _ in batch:
+            _queue.task_done()
+
+
+def _drain_remaining() -> List[Dict[str, Any]]:
+    rows = []
+    while True:
+        try:
+            rows.append(_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            return rows
+
+
+def start_writer():
+    """Must be called on the event loop."""
+    global _queue, _writer_task
+    if _writer_task is None:
+        _queue = asyncio.Queue(maxsize=USAGE_QUEUE_MAX)
+        _writer_task = asyncio.create_task(_run())
+
+
+async def stop_writer():
+    """Flush everything still queued, then stop the background task."""
+    global _queue, _writer_task
+    if _writer_task is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), USAGE_DRAIN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("Token usage writer did not drain in time, flushing the rest directly")
+    _writer_task.cancel()
+    try:
+        await _writer_task
+    except asyncio.CancelledError:
+        pass
+
+    leftover = _drain_remaining()
+    _queue, _writer_task = None, None
+    # Chunks are written from the end of _in_flight, after any interrupted one
+    for start in range(0, len(leftover), USAGE_BATCH_SIZE):
+        _in_flight.insert(0, leftover[start:start + USAGE_BATCH_SIZE])
+    lost = await _flush(retry=False)
+    _in_flight.clear()
+    if lost:
+        print(f"Lost {lost} token usage rows on shutdown")
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "in_flight": sum(len(chunk) for chunk in _in_flight),
+        "max_queued": USAGE_QUEUE_MAX,
+        "running": _writer_task is not None,
+    }
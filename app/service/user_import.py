@@ -0,0 +1,158 @@
+"""
+Bulk user import for a tenant (POST /users/import).
+
+The upload is either a JSON array of {username, email, password} objects or
+CSV with a username,email,password header. Every row gets an entry in the
+report: created (with its user_id), duplicate, or invalid (with the reason).
+Valid rows are inserted in one transaction, so an import either lands whole
+or not at all.
+"""
+import csv
+import io
+import json
+from typing import List, Dict, Any, Optional
+from fastapi import HTTPException
+from pydantic import ValidationError
+from email_validator import validate_email, EmailNotValidError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import USER_IMPORT_MAX_ROWS, USER_IMPORT_CHUNK_SIZE
+from app.core.security import hash_passwords_async
+from app.models.models import User, Role, RoleUserMapping
+from app.schemas.user import UserCreate
+from app.service import login_identity
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_rows(body: bytes, content_type: Optional[str]) -> List[Dict[str, Any]]:
+    """Decode a JSON or CSV upload into a list of row dicts."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded")
+
+    if content_type and "csv" in content_type:
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Upload must be a JSON array or CSV (Content-Type: text/csv)")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="JSON upload must be an array of users")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="Upload contains no users")
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {USER_IMPORT_MAX_ROWS} users per import")
+    return rows
+
+
+def _validate(row: Any) -> UserCreate:
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    user = UserCreate(**row)
+    if not user.username.strip() or not user.password:
+        raise ValueError("username and password are required")
+    # bcrypt refuses longer input, and one bad row must not fail the whole hash batch
+    if len(user.password.encode("utf-8")) > 72:
+        raise ValueError("password must be at most 72 bytes")
+    # Syntax only (an MX lookup per row would dominate the import). The address
+    # is stored as given, like POST /users, so duplicate checks stay consistent
+    validate_email(user.email, check_deliverability=False)
+    return user
+
+
+async def _check_tenant_role(db: AsyncSession, tenant_id: int, role_id: int):
+    found = await db.scalar(select(Role.role_id).where(Role.tenant_id == tenant_id, Role.role_id == role_id))
+    if found is None:
+        raise HTTPException(status_code=400, detail=f"Role not found in this tenant: {role_id}")
+
+
+async def import_users(db: AsyncSession, tenant_id: int, rows: List[Dict[str, Any]], role_id: Optional[int] = None) -> Dict[str, Any]:
+    # 1. The role is checked up front so a typo fails the import before any hashing
+    if role_id is not None:
+        await _check_tenant_role(db, tenant_id, role_id)
+
+    # 2. Validate every row and drop repeats within the upload itself
+    report: List[Dict[str, Any]] = []
+    candidates = {}  # email -> (report index, UserCreate)
+    for index, row in enumerate(rows):
+        entry = {"row": index + 1, "email": row.get("email") if isinstance(row, dict) else None}
+        report.append(entry)
+        try:
+            user = _validate(row)
+        except ValidationError as e:
+            fields = sorted(set(str(error["loc"][0]) for error in e.errors() if error["loc"]))
+            entry.update(status="invalid", error=f"Missing or invalid: {', '.join(fields)}")
+            continue
+        except (EmailNotValidError, ValueError, TypeError) as e:
+            entry.update(status="invalid", error=str(e))
+            continue
+        if user.email in candidates:
+            entry.update(status="duplicate", error="Repeated earlier in this upload")
+            continue
+        candidates[user.email] = (index, user)
+
+    # 3. One set-based lookup (per chunk) for emails already in the tenant
+    for emails in _chunks(list(candidates), USER_IMPORT_CHUNK_SIZE):
+        existing = (await db.scalars(
+            select(User.email).where(User.tenant_id == tenant_id, User.email.in_(emails))
+        )).all()
+        for email in existing:
+            index, _ = candidates.pop(email)
+            report[index].update(status="duplicate", error="User with this email already exists in this tenant")
+
+    # 4. Hash the survivors in parallel, off the event loop
+    pending = list(candidates.values())
+    hashes = await hash_passwords_async([user.password for _, user in pending])
+
+    # 5. Chunked multi-row inserts, role mappings alongside, one commit
+    try:
+        for chunk in _chunks(list(zip(pending, hashes)), USER_IMPORT_CHUNK_SIZE):
+            stmt = insert(User).values([
+                {
+                    "username": user.username,
+                    "email": user.email,
+                    "hashed_password": hashed_password,
+                    "tenant_id": tenant_id,
+                    "is_active": True,
+                }
+                for (_, user), hashed_password in chunk
+            ])
+            if db.get_bind().dialect.insert_returning:
+                created = (await db.execute(stmt.returning(User.user_id, User.email))).all()
+            else:
+                # No RETURNING (MySQL): read the new ids back, emails are unique per tenant
+                await db.execute(stmt)
+                created = (await db.execute(
+                    select(User.user_id, User.email)
+                    .where(User.tenant_id == tenant_id, User.email.in_([user.email for (_, user), _ in chunk]))
+                )).all()
+            user_ids = dict((email, user_id) for user_id, email in created)
+            for (index, user), _ in chunk:
+                report[index].update(status="created", user_id=user_ids[user.email])
+
+            # Users hold one role each (see crud4rum), so at most one mapping per user
+            if role_id is not None:
+                await db.execute(insert(RoleUserMapping).values([
+                    {"user_id": user_id, "role_id": role_id, "tenant_id": tenant_id}
+                    for user_id in user_ids.values()
+                ]))
+        await db.commit()
+    except IntegrityError:
+        # A concurrent create slipped in between the duplicate check and the insert
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Users changed during the import, please retry")
+
+    await login_identity.forget_unknown_emails([user.email for _, user in pending])
+
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    for entry in report:
+        counts[entry["status"]] += 1
+    return {**counts, "rows": report}
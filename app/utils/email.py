@@ -1,14 +1,12 @@
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import (
-    SMTP_HOST, SMTP_PORT, SMTP_USER, 
-    SMTP_PASSWORD, SMTP_FROM_EMAIL, 
-    SMTP_FROM_NAME
+    SMTP_FROM_EMAIL, SMTP_FROM_NAME, OTP_TTL_SECONDS
 )
+from app.service import mailer
 
 
-async def send_otp_email(email: str, otp: str) -> bool:
+def build_otp_message(email: str, otp: str) -> MIMEMultipart:
 
     message = MIMEMultipart("alternative")
     message["Subject"] = "Your Verification Code"
@@ -21,7 +19,7 @@ Verify Your Email
 
 Your verification code is: {otp}
 
-This code will expire in 5 minutes.
+This code will expire in {OTP_TTL_SECONDS // 60} minutes.
 
 If you didn't request this code, please ignore this email.
     """
@@ -70,7 +68,7 @@ If you didn't request this code, please ignore this email.
                             </table>
                             
                             <p style="margin: 20px 0 0 0; color: #666666; font-size: 14px; line-height: 1.6; text-align: center;">
-                                This code is valid for <strong>5 minutes</strong>.
+                                This code is valid for <strong>{OTP_TTL_SECONDS // 60} minutes</strong>.
                             </p>
                         </td>
                     </tr>
@@ -100,20 +98,9 @@ If you didn't request this code, please ignore this email.
     # Attach both versions
     message.attach(MIMEText(text, "plain"))
     message.attach(MIMEText(html, "html"))
-    
-    # Send email
-    try:
-        await aiosmtplib.send(
-            message,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            username=SMTP_USER,
-            password=SMTP_PASSWORD,
-            start_tls=True,
-            timeout=10
-        )
-        print(f"OTP email sent successfully to {email}")
-        return True
-    except Exception as e:
-        print(f"Error sending email to {email}: {str(e)}")
-        return False
+    return message
+
+
+async def send_otp_email(email: str, otp: str, on_failure=None):
+    """Queue the OTP email; delivery (and retries) happen in the background."""
+    await mailer.enqueue(build_otp_message(email, otp), on_failure)
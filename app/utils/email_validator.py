@@ -1,9 +1,9 @@
 from email_validator import validate_email, EmailNotValidError
-import dns.resolver
 from fastapi import HTTPException
+from app.utils import mx_resolver
 
 
-def validate_email_address(email: str) -> str:
+async def validate_email_address(email: str) -> str:
     
     if not email:
         raise HTTPException(
@@ -21,37 +21,11 @@ def validate_email_address(email: str) -> str:
             detail=f"Invalid email format: {str(e)}"
         )
     
-    try:
-        mx_records = dns.resolver.resolve(domain, 'MX')
-        if not mx_records:
-            raise HTTPException(
-                status_code=400,
-                detail="Email domain does not accept emails"
-            )
-    except dns.resolver.NXDOMAIN:
-        raise HTTPException(
-            status_code=400,
-            detail="Email domain does not exist"
-        )
-    except dns.resolver.NoAnswer:
-        raise HTTPException(
-            status_code=400,
-            detail="Email domain has no mail server configured"
-        )
-    except dns.resolver.Timeout:
-        raise HTTPException(
-            status_code=400,
-            detail="Could not verify email domain. Please try again."
-        )
-    except dns.resolver.NoNameservers:
-        raise HTTPException(
-            status_code=400,
-            detail="Email domain DNS is not reachable"
-        )
-    except Exception as e:
+    problem = await mx_resolver.mx_problem(domain)
+    if problem:
         raise HTTPException(
             status_code=400,
-            detail=f"Email validation failed: {str(e)}"
+            detail=problem
         )
     
     return normalized_email
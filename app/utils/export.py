@@ -0,0 +1,43 @@
+import json
+from datetime import date, datetime
+from typing import Callable
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.config import EXPORT_BATCH_SIZE
+
+
+def _encode(value):
+    # Same ISO form as the JSON responses (str() would drop the "T")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_response(fetch_rows: Callable[[Session], object], filename: str) -> StreamingResponse:
+    """
+    Stream rows as newline-delimited JSON while the query is still running.
+    fetch_rows gets a session of its own for the life of the body, so routes
+    should not also hold a request session, and must return an iterable of
+    column rows.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            lines = []
+            for row in fetch_rows(db):
+                lines.append(json.dumps(dict(row._mapping), default=_encode))
+                # Hand the server one chunk per batch rather than per row
+                if len(lines) >= EXPORT_BATCH_SIZE:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
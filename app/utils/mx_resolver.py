@@ -0,0 +1,181 @@
+"""
+Async MX checks for email validation.
+
+Lookups go through dns.asyncresolver, so the event loop never blocks on
+DNS. Answers are cached per domain: positive ones for the record TTL,
+NXDOMAIN/no-MX for MX_NEGATIVE_CACHE_SECONDS, both bounded by
+MX_CACHE_MAX_ENTRIES. Concurrent checks of one domain share a single query,
+and well-known mail providers skip DNS altogether. Timeouts and unreachable
+nameservers are never cached.
+
+Point MX_NAMESERVERS at a local stub DNS server, or call set_resolver() with
+anything that has an async resolve(name, rdtype), to run without real DNS.
+"""
+import asyncio
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+import dns.asyncresolver
+import dns.nameserver
+import dns.resolver
+from app.core.config import (
+    MX_CACHE_MAX_ENTRIES,
+    MX_CACHE_MIN_SECONDS,
+    MX_CACHE_MAX_SECONDS,
+    MX_NEGATIVE_CACHE_SECONDS,
+    MX_LOOKUP_TIMEOUT_SECONDS,
+    MX_NAMESERVERS,
+    MX_ALLOWLIST_EXTRA,
+)
+
+# Domains that certainly accept mail; checking them only adds latency
+KNOWN_PROVIDERS = frozenset({
+    "gmail.com", "googlemail.com",
+    "outlook.com", "hotmail.com", "live.com", "msn.com",
+    "yahoo.com", "ymail.com", "rocketmail.com",
+    "icloud.com", "me.com", "mac.com",
+    "aol.com", "proton.me", "protonmail.com", "pm.me",
+    "zoho.com", "fastmail.com", "gmx.com", "gmx.de", "mail.com",
+    "yandex.com", "yandex.ru", "qq.com", "163.com",
+}) | frozenset(domain.strip().lower() for domain in MX_ALLOWLIST_EXTRA.split(",") if domain.strip())
+
+NO_DOMAIN = "Email domain does not exist"
+NO_MX = "Email domain has no mail server configured"
+NULL_MX = "Email domain does not accept emails"
+TIMEOUT = "Could not verify email domain. Please try again."
+UNREACHABLE = "Email domain DNS is not reachable"
+
+# domain -> (expires_at, problem or None), oldest-used first
+_entries: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_inflight: Dict[str, asyncio.Task] = {}
+_resolver = None
+_stats = {"allowlisted": 0, "hits": 0, "misses": 0, "coalesced": 0, "lookups": 0, "errors": 0, "evictions": 0}
+
+
+def _parse_nameserver(entry: str):
+    """(address, port) from "addr", "ipv4:port" or "[addr]:port"."""
+    entry = entry.strip()
+    address, port = entry, "53"
+    if entry.startswith("["):
+        address, _, rest = entry[1:].partition("]")
+        if rest:
+            port = rest[1:] if rest.startswith(":") else ""
+    elif entry.count(":") == 1:
+        # Exactly one colon can only be IPv4 with a port; bare IPv6 has several
+        address, port = entry.split(":")
+    try:
+        return str(ipaddress.ip_address(address)), int(port)
+    except ValueError:
+        raise ValueError(f"Invalid MX_NAMESERVERS entry: {entry}")
+
+
+def _default_resolver():
+    if not MX_NAMESERVERS:
+        resolver = dns.asyncresolver.Resolver()
+    else:
+        # e.g. a stub server on 127.0.0.1:5353 or [::1]:5353, each with its own port
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = [
+            dns.nameserver.Do53Nameserver(*_parse_nameserver(entry))
+            for entry in MX_NAMESERVERS.split(",") if entry.strip()
+        ]
+    resolver.lifetime = MX_LOOKUP_TIMEOUT_SECONDS
+    return resolver
+
+
+def set_resolver(resolver):
+    """Swap the resolver (None restores the default) and forget cached answers."""
+    global _resolver
+    _resolver = resolver
+    clear()
+
+
+def _get(domain: str):
+    with _lock:
+        entry = _entries.get(domain)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del _entries[domain]
+            return None
+        _entries.move_to_end(domain)
+        return entry
+
+
+def _put(domain: str, problem: Optional[str], ttl: float):
+    with _lock:
+        _entries[domain] = (time.time() + ttl, problem)
+        _entries.move_to_end(domain)
+        while len(_entries) > MX_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+async def _lookup(domain: str) -> Optional[str]:
+    global _resolver
+    if _resolver is None:
+        _resolver = _default_resolver()
+    _stats["lookups"] += 1
+    try:
+        answer = await _resolver.resolve(domain, "MX")
+    except dns.resolver.NXDOMAIN:
+        _put(domain, NO_DOMAIN, MX_NEGATIVE_CACHE_SECONDS)
+        return NO_DOMAIN
+    except dns.resolver.NoAnswer:
+        _put(domain, NO_MX, MX_NEGATIVE_CACHE_SECONDS)
+        return NO_MX
+    except dns.resolver.Timeout:
+        _stats["errors"] += 1
+        return TIMEOUT
+    except dns.resolver.NoNameservers:
+        _stats["errors"] += 1
+        return UNREACHABLE
+    except Exception as e:
+        _stats["errors"] += 1
+        return f"Email validation failed: {str(e)}"
+
+    # A lone "0 ." record is an explicit no-mail declaration (RFC 7505)
+    exchanges = [str(record.exchange) for record in answer]
+    problem = NULL_MX if not exchanges or exchanges == ["."] else None
+    rrset = getattr(answer, "rrset", None)
+    ttl = rrset.ttl if rrset is not None else MX_CACHE_MIN_SECONDS
+    _put(domain, problem, min(max(ttl, MX_CACHE_MIN_SECONDS), MX_CACHE_MAX_SECONDS))
+    return problem
+
+
+async def mx_problem(domain: str) -> Optional[str]:
+    """None if the domain accepts mail, otherwise why not."""
+    domain = domain.lower().rstrip(".")
+    if domain in KNOWN_PROVIDERS:
+        _stats["allowlisted"] += 1
+        return None
+
+    entry = _get(domain)
+    if entry is not None:
+        _stats["hits"] += 1
+        return entry[1]
+    _stats["misses"] += 1
+
+    task = _inflight.get(domain)
+    if task is not None:
+        _stats["coalesced"] += 1
+    else:
+        task = asyncio.ensure_future(_lookup(domain))
+        _inflight[domain] = task
+        task.add_done_callback(lambda _: _inflight.pop(domain, None))
+    # Shielded so one cancelled request doesn't cancel the lookup for the rest
+    return await asyncio.shield(task)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        size = len(_entries)
+    return {**_stats, "size": size, "max_entries": MX_CACHE_MAX_ENTRIES, "in_flight": len(_inflight)}
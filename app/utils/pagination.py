@@ -0,0 +1,98 @@
+import base64
+from typing import Optional
+from fastapi import HTTPException
+from app.core.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+# Cursors carry their kind: a key for keyset pages, a position for ranked ones.
+# The same listing can switch between the two, so a cursor of the wrong kind is rejected.
+KEYSET = "key"
+RANKED = "rank"
+
+
+def encode_cursor(value: int, kind: str = KEYSET) -> str:
+    return base64.urlsafe_b64encode(f"{kind}:{value}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str = KEYSET) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_kind, _, value = base64.urlsafe_b64decode(padded.encode()).decode().partition(":")
+        value = int(value)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_kind != kind:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this listing, start again without it")
+    return value
+
+
+def _next_cursor(rows, key_column, limit):
+    # One extra row was fetched only to learn whether another page exists
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], key_column.key))
+
+
+def paginate(query, key_column, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Keyset-paginate a Query on an ascending integer key.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        query = query.filter(key_column > decode_cursor(cursor))
+    rows = query.order_by(key_column).limit(limit + 1).all()
+    return _next_cursor(rows, key_column, limit)
+
+
+async def paginate_async(db, stmt, key_column, limit: Optional[int] = None, cursor: Optional[str] = None):
+    limit = clamp_limit(limit)
+    if cursor:
+        stmt = stmt.where(key_column > decode_cursor(cursor))
+    rows = (await db.scalars(stmt.order_by(key_column).limit(limit + 1))).all()
+    return _next_cursor(rows, key_column, limit)
+
+
+def _ranked_page(ranked_ids, limit, cursor):
+    limit = clamp_limit(limit)
+    offset = decode_cursor(cursor, RANKED) if cursor else 0
+    page_ids = ranked_ids[offset:offset + limit]
+    next_cursor = encode_cursor(offset + limit, RANKED) if offset + limit < len(ranked_ids) else None
+    return page_ids, next_cursor
+
+
+def _in_rank_order(rows, key_column, page_ids):
+    position = {key: index for index, key in enumerate(page_ids)}
+    return sorted(rows, key=lambda row: position[getattr(row, key_column.key)])
+
+
+def paginate_ranked(query, key_column, ranked_ids, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Page through keys a search backend already ranked (best first).
+    Here the cursor is a position in that ranking rather than a key, unless
+    the ranking was truncated: then the plain filter is keyset-paged instead.
+    """
+    if getattr(ranked_ids, "truncated", False):
+        return paginate(query.filter(*ranked_ids.where), key_column, limit, cursor)
+    page_ids, next_cursor = _ranked_page(ranked_ids, limit, cursor)
+    if not page_ids:
+        return [], None
+    rows = query.filter(key_column.in_(page_ids)).all()
+    return _in_rank_order(rows, key_column, page_ids), next_cursor
+
+
+async def paginate_ranked_async(db, stmt, key_column, ranked_ids, limit: Optional[int] = None, cursor: Optional[str] = None):
+    if getattr(ranked_ids, "truncated", False):
+        return await paginate_async(db, stmt.where(*ranked_ids.where), key_column, limit, cursor)
+    page_ids, next_cursor = _ranked_page(ranked_ids, limit, cursor)
+    if not page_ids:
+        return [], None
+    rows = (await db.scalars(stmt.where(key_column.in_(page_ids)))).all()
+    return _in_rank_order(rows, key_column, page_ids), next_cursor
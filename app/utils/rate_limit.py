@@ -0,0 +1,238 @@
+"""
+ASGI rate limiting for the policies in RATE_LIMIT_POLICIES.
+
+Each (policy, key) pair is a GCRA bucket in Redis, updated by one Lua call,
+so every worker shares the same budget. To keep most decisions off the
+network, each worker also keeps a small local table:
+
+- a key Redis has refused stays refused locally until its retry time, so a
+  client hammering an endpoint is turned away without any Redis traffic;
+- policies with a large burst lease several tokens per Redis call and spend
+  them locally (a lease that isn't used up in time is simply lost, which
+  errs on the side of the limit).
+
+If Redis is unreachable requests are let through rather than failing.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from app.core.redis import async_redis_client
+from app.core.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_POLICIES,
+    RATE_LIMIT_LEASE_MAX,
+    RATE_LIMIT_LOCAL_MAX_KEYS,
+    RATE_LIMIT_TRUST_FORWARDED,
+)
+from app.utils.session_resolver import get_session_identity_async
+
+# Larger bodies are passed through without looking for an email
+MAX_INSPECTED_BODY = 64 * 1024
+
+# KEYS: bucket   ARGV: ms per token, burst tolerance in ms, lease size
+# Tries to take a whole lease, then a single token.
+# -> {granted, 0} or {0, ms until a token is available}
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+for _, cost in ipairs({tonumber(ARGV[3]), 1}) do
+    local new_tat = tat + cost * interval
+    if new_tat - now <= tolerance then
+        redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+        return {cost, 0}
+    end
+end
+return {0, math.ceil(tat + interval - tolerance - now)}
+"""
+
+_gcra = async_redis_client.register_script(_GCRA_SCRIPT)
+
+
+class _Policy:
+    def __init__(self, index: int, spec: Dict[str, Any]):
+        self.name = f"{index}:{spec['key']}:{spec['path']}"
+        self.method = spec.get("method", "*").upper()
+        self.path = spec["path"]
+        self.key = spec["key"]
+        burst = spec.get("burst", spec["rate"])
+        self.interval_ms = spec["per"] * 1000 / spec["rate"]
+        self.tolerance_ms = burst * self.interval_ms
+        # Leasing only pays off for generous buckets; tight ones stay exact
+        self.lease = max(1, min(RATE_LIMIT_LEASE_MAX, burst // 10))
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and self.path in ("*", path)
+
+
+_policies = [_Policy(index, spec) for index, spec in enumerate(RATE_LIMIT_POLICIES)]
+
+# (policy, key) -> [leased tokens, lease expires at, refused until], oldest-used first
+_local: "OrderedDict[tuple, list]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"local_allowed": 0, "local_denied": 0, "remote_allowed": 0, "remote_denied": 0, "redis_errors": 0}
+
+
+def _local_state(bucket: tuple) -> list:
+    with _lock:
+        state = _local.get(bucket)
+        if state is None:
+            state = _local[bucket] = [0, 0.0, 0.0]
+            while len(_local) > RATE_LIMIT_LOCAL_MAX_KEYS:
+                _local.popitem(last=False)
+        else:
+            _local.move_to_end(bucket)
+        return state
+
+
+async def _acquire(policy: _Policy, key: str) -> Optional[float]:
+    """Take one token; None if allowed, otherwise seconds until retry."""
+    state = _local_state((policy.name, key))
+    now = time.time()
+    if state[2] > now:
+        _stats["local_denied"] += 1
+        return state[2] - now
+    if state[0] > 0 and state[1] > now:
+        state[0] -= 1
+        _stats["local_allowed"] += 1
+        return None
+
+    try:
+        granted, wait_ms = await _gcra(
+            keys=[f"rate:{policy.name}:{key}"],
+            args=[policy.interval_ms, policy.tolerance_ms, policy.lease]
+        )
+    except Exception as e:
+        _stats["redis_errors"] += 1
+        print(f"Rate limiter unavailable, allowing request: {str(e)}")
+        return None
+
+    if not granted:
+        state[2] = now + wait_ms / 1000
+        _stats["remote_denied"] += 1
+        return wait_ms / 1000
+    # Keep the extra tokens for only as long as they stand for
+    state[0] = granted - 1
+    state[1] = now + granted * policy.interval_ms / 1000
+    _stats["remote_allowed"] += 1
+    return None
+
+
+def _client_ip(scope) -> Optional[str]:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+async def _key_for(policy: _Policy, scope, query: Dict[str, List[str]], body: Optional[dict]) -> Optional[str]:
+    if policy.key == "ip":
+        return _client_ip(scope)
+    if policy.key == "email":
+        email = body.get("email") if isinstance(body, dict) else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+    session_id = (query.get("session_id") or [None])[0]
+    if not session_id:
+        return None
+    if policy.key == "session":
+        return session_id
+    if policy.key == "tenant":
+        try:
+            identity = await get_session_identity_async(session_id)
+        except HTTPException:
+            # The route itself will reject the session
+            return None
+        except Exception as e:
+            # Session store unreachable: fail open, like an unreachable limiter
+            _stats["redis_errors"] += 1
+            print(f"Rate limiter could not resolve session, allowing request: {str(e)}")
+            return None
+        return str(identity["tenant_id"])
+    return None
+
+
+async def _read_body(receive, limit: int):
+    """
+    Buffer request messages until the body is complete or passes limit.
+    Returns (messages, body), body being None if it was too large to inspect.
+    """
+    messages, size = [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, None
+        size += len(message.get("body", b""))
+        if size > limit:
+            # The rest stays unread for the app to stream
+            return messages, None
+        if not message.get("more_body"):
+            return messages, b"".join(m.get("body", b"") for m in messages)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        matched = [policy for policy in _policies if policy.matches(scope["method"], scope["path"])]
+        if not matched:
+            return await self.app(scope, receive, send)
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        body = None
+        if any(policy.key == "email" for policy in matched):
+            # Buffer the body to find the email, then replay it to the app
+            buffered, raw = await _read_body(receive, MAX_INSPECTED_BODY)
+            if raw is not None:
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    pass
+
+            async def receive_replay():
+                if buffered:
+                    return buffered.pop(0)
+                return await receive()
+
+            app_receive = receive_replay
+        else:
+            app_receive = receive
+
+        for policy in matched:
+            key = await _key_for(policy, scope, query, body)
+            if key is None:
+                continue
+            retry_after = await _acquire(policy, key)
+            if retry_after is not None:
+                seconds = max(1, math.ceil(retry_after))
+                response = JSONResponse(
+                    status_code=429,
+                    content={"status": "error", "message": "Too many requests, please slow down", "data": None},
+                    headers={"Retry-After": str(seconds)}
+                )
+                return await response(scope, app_receive, send)
+
+        await self.app(scope, app_receive, send)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        size = len(_local)
+    return {**_stats, "enabled": RATE_LIMIT_ENABLED, "policies": len(_policies), "local_keys": size}
@@ -1,9 +1,13 @@
 from typing import Any, Optional
 from app.schemas.base import BaseResponse
 
-def wrap_response(data: Any = None, message: str = "Success", status: str = "success") -> dict:
-    return {
+def wrap_response(data: Any = None, message: str = "Success", status: str = "success", next_cursor: Optional[str] = None) -> dict:
+    response = {
         "status": status,
         "message": message,
         "data": data
     }
+    # Only paginated listings carry a cursor
+    if next_cursor is not None:
+        response["next_cursor"] = next_cursor
+    return response
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import (
+    SESSION_CACHE_MAX_ENTRIES,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_INVALIDATION_CHANNEL,
+)
+
+# session_id -> (expires_at, identity). Ordered oldest-used first so the
+# front of the dict is always the next eviction candidate.
+_entries: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "stale_puts": 0}
+# Bumped by every invalidation. A reader captures it before reading the vault
+# and put() drops the write if it moved, so a resolve racing a logout can't
+# re-cache the identity the logout just removed.
+_epoch = 0
+
+_listener_task = None
+_listening = False
+
+
+def get(session_id: str) -> Optional[Dict[str, Any]]:
+    now = time.time()
+    with _lock:
+        entry = _entries.get(session_id)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+
+        expires_at, identity = entry
+        if expires_at <= now:
+            del _entries[session_id]
+            _stats["misses"] += 1
+            return None
+
+        _entries.move_to_end(session_id)
+        _stats["hits"] += 1
+        return dict(identity)
+
+
+def epoch() -> int:
+    return _epoch
+
+
+def put(session_id: str, identity: Dict[str, Any], token_exp: Optional[float] = None, since: Optional[int] = None):
+    # Without the invalidation listener another worker's logout would go
+    # unnoticed until expiry, so only cache while it is running
+    if not _listening:
+        return
+
+    # Never outlive the access token the identity was resolved from
+    expires_at = time.time() + SESSION_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, float(token_exp))
+
+    with _lock:
+        if since is not None and since != _epoch:
+            _stats["stale_puts"] += 1
+            return
+        _entries[session_id] = (expires_at, dict(identity))
+        _entries.move_to_end(session_id)
+        while len(_entries) > SESSION_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def discard(session_id: str):
+    """Drop a session from this worker's cache only."""
+    global _epoch
+    with _lock:
+        _epoch += 1
+        if _entries.pop(session_id, None) is not None:
+            _stats["invalidations"] += 1
+
+
+def invalidate(session_id: str):
+    """Drop a session locally and tell every other worker to do the same."""
+    discard(session_id)
+    try:
+        redis_client.publish(SESSION_INVALIDATION_CHANNEL, session_id)
+    except Exception as e:
+        print(f"Failed to publish session invalidation for {session_id}: {str(e)}")
+
+
+async def invalidate_async(session_id: str):
+    discard(session_id)
+    try:
+        await async_redis_client.publish(SESSION_INVALIDATION_CHANNEL, session_id)
+    except Exception as e:
+        print(f"Failed to publish session invalidation for {session_id}: {str(e)}")
+
+
+def clear():
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _entries.clear()
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "size": len(_entries),
+            "max_entries": SESSION_CACHE_MAX_ENTRIES,
+            "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "listening": _listening,
+        }
+
+
+async def _listen():
+    global _listening
+    while True:
+        try:
+            async with async_redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+                _listening = True
+                async for message in pubsub.listen():
+                    discard(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Session invalidation listener disconnected: {str(e)}")
+        finally:
+            # Invalidations may have been missed while disconnected
+            _listening = False
+            clear()
+        await asyncio.sleep(1)
+
+
+def start_listener():
+    """Subscribe to cross-worker invalidations. Must be called on the event loop."""
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_listener():
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
@@ -1,51 +1,83 @@
-import json
+import time
 from fastapi import HTTPException
-from app.core.redis import redis_client
-from app.core.security import verify_token
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import SESSION_STATELESS, SESSION_STATELESS_ACCEPT_BARE
+from app.utils import session_cache, session_vault, session_revocation
 
-def get_session_identity(session_id: str):
-    
-    # 1. Lookup Session in Redis
-    vault_json = redis_client.get(f"session:{session_id}")
-    if not vault_json:
+
+def _identity(claims):
+    return {
+        "tenant_id": claims["tenant_id"],
+        "user_id": claims["sub"] if claims["type"] == "user" else None,
+        "role": claims["type"],
+        "type": claims["type"]
+    }
+
+
+def _read_credential(session_id: str):
+    # Stateless credential: signature and expiry are checked locally
+    claims = session_vault.read_credential(session_id)
+    if claims["access_exp"] <= time.time():
+        raise HTTPException(status_code=401, detail="Session Expired")
+    return claims
+
+
+def _require_bare_allowed():
+    # In stateless mode only credentials are sessions (see session_vault)
+    if SESSION_STATELESS and not SESSION_STATELESS_ACCEPT_BARE:
         raise HTTPException(status_code=401, detail="Invalid Session")
-        
-    # 2. Open Vault
-    try:
-        vault = json.loads(vault_json)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=401, detail="Invalid Session Data")
-
-    # 3. Verify Internal Access Token 
-    access_token = vault.get("access_token")
-    payload = verify_token(access_token)
-    
-    if not payload:
+
+
+def _open_vault(session_id: str, raw_vault, since: int):
+    # 2. Open Vault (compact claims, or a legacy JSON vault of JWTs)
+    claims = session_vault.decode(session_id, raw_vault)
+
+    # 3. Check the access expiry; past it the client must refresh
+    if claims["access_exp"] <= time.time():
         raise HTTPException(status_code=401, detail="Session Expired")
 
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Invalid token type")
-        
     # 4. Extract Identity Information
-    tenant_id = vault.get("tenant_id")
-    user_id = vault.get("user_id")
-    role = vault.get("role")
-    
-    # Logic to normalize tenant_id for different roles
-    # If the user is a tenant themselves, the user_id is the tenant_id
-    if tenant_id is None:
-        if role == "tenant":
-            tenant_id = user_id
-        else:
-            # Check payload as fallback if vault structure is older
-            tenant_id = payload.get("tenant_id")
-
-    if tenant_id is None:
-        raise HTTPException(status_code=401, detail="Tenant identity not found")
+    identity = _identity(claims)
+    session_cache.put(session_id, identity, token_exp=claims["access_exp"], since=since)
+    return identity
 
-    return {
-        "tenant_id": int(tenant_id),
-        "user_id": int(user_id) if vault.get("type") == "user" else None,
-        "role": role,
-        "type": vault.get("type")
-    }
+
+def get_session_identity(session_id: str):
+    """Sync variant for plain `def` routes, which run in the threadpool."""
+
+    if session_vault.is_credential(session_id):
+        claims = _read_credential(session_id)
+        if session_revocation.is_revoked(claims["jti"]):
+            raise HTTPException(status_code=401, detail="Invalid Session")
+        return _identity(claims)
+    _require_bare_allowed()
+
+    # 0. Recently resolved sessions skip Redis and the vault check entirely
+    cached = session_cache.get(session_id)
+    if cached is not None:
+        return cached
+
+    # 1. Lookup Session in Redis (noting the cache epoch first, see session_cache.put)
+    since = session_cache.epoch()
+    raw_vault = redis_client.get(session_vault.vault_key(session_id))
+    return _open_vault(session_id, raw_vault, since)
+
+
+async def get_session_identity_async(session_id: str):
+
+    if session_vault.is_credential(session_id):
+        claims = _read_credential(session_id)
+        if await session_revocation.is_revoked_async(claims["jti"]):
+            raise HTTPException(status_code=401, detail="Invalid Session")
+        return _identity(claims)
+    _require_bare_allowed()
+
+    # 0. Recently resolved sessions skip Redis and the vault check entirely
+    cached = session_cache.get(session_id)
+    if cached is not None:
+        return cached
+
+    # 1. Lookup Session in Redis (noting the cache epoch first, see session_cache.put)
+    since = session_cache.epoch()
+    raw_vault = await async_redis_client.get(session_vault.vault_key(session_id))
+    return _open_vault(session_id, raw_vault, since)
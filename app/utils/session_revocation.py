@@ -0,0 +1,141 @@
+"""
+Revoked stateless credentials (see SESSION_STATELESS).
+
+A credential is revoked by its jti until its access expiry, after which it is
+dead anyway, so the set only ever holds credentials from the last
+ACCESS_TOKEN_EXPIRE_MINUTES. Redis keeps the shared copy as a sorted set
+scored by expiry; each worker mirrors it in memory, reloading the set when it
+(re)subscribes and applying revocations published on
+SESSION_REVOCATION_CHANNEL. While the mirror may be stale (not subscribed),
+checks go to Redis instead.
+"""
+import asyncio
+import heapq
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Tuple
+from app.core.redis import redis_client, async_redis_client
+from app.core.config import SESSION_REVOCATION_CHANNEL, ACCESS_TOKEN_EXPIRE_MINUTES
+
+REVOKED_KEY = "session_revoked"
+
+# jti -> access expiry
+_revoked: Dict[str, float] = {}
+# (expiry, jti), soonest first, so pruning only ever looks at entries that are due
+_expiries: List[Tuple[float, str]] = []
+_lock = threading.Lock()
+_stats = {"revoked": 0, "local_checks": 0, "redis_checks": 0}
+
+_listener_task = None
+_synced = False
+
+
+def _prune(now: float):
+    # Caller holds _lock
+    while _expiries and _expiries[0][0] <= now:
+        until, jti = heapq.heappop(_expiries)
+        # Skip entries superseded by a later revocation of the same jti
+        if _revoked.get(jti) == until:
+            del _revoked[jti]
+
+
+def _remember(jti: str, exp: float):
+    with _lock:
+        _revoked[jti] = exp
+        heapq.heappush(_expiries, (exp, jti))
+        _prune(time.time())
+
+
+def _remember_many(entries: Iterable[Tuple[str, float]]):
+    # Reload after (re)subscribing: one heapify instead of a push per entry
+    global _expiries
+    with _lock:
+        _revoked.update(entries)
+        _expiries = [(until, jti) for jti, until in _revoked.items()]
+        heapq.heapify(_expiries)
+        _prune(time.time())
+
+
+async def revoke_async(jti: str, exp: float):
+    now = time.time()
+    if exp <= now:
+        return
+    _remember(jti, exp)
+    _stats["revoked"] += 1
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.zadd(REVOKED_KEY, {jti: exp})
+    pipe.zremrangebyscore(REVOKED_KEY, "-inf", now)
+    # No credential outlives this, so neither does the set
+    pipe.expire(REVOKED_KEY, ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 60)
+    pipe.publish(SESSION_REVOCATION_CHANNEL, f"{jti}:{exp}")
+    await pipe.execute()
+
+
+def _local_verdict(jti: str):
+    with _lock:
+        until = _revoked.get(jti)
+    _stats["local_checks"] += 1
+    return until is not None and until > time.time()
+
+
+def is_revoked(jti: str) -> bool:
+    if _synced:
+        return _local_verdict(jti)
+    _stats["redis_checks"] += 1
+    score = redis_client.zscore(REVOKED_KEY, jti)
+    return score is not None and score > time.time()
+
+
+async def is_revoked_async(jti: str) -> bool:
+    if _synced:
+        return _local_verdict(jti)
+    _stats["redis_checks"] += 1
+    score = await async_redis_client.zscore(REVOKED_KEY, jti)
+    return score is not None and score > time.time()
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        size = len(_revoked)
+    return {**_stats, "size": size, "synced": _synced}
+
+
+async def _listen():
+    global _synced
+    while True:
+        try:
+            async with async_redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(SESSION_REVOCATION_CHANNEL)
+                # Subscribed first, so nothing published during the reload is lost
+                _remember_many(await async_redis_client.zrangebyscore(REVOKED_KEY, time.time(), "+inf", withscores=True))
+                _synced = True
+                async for message in pubsub.listen():
+                    jti, _, exp = message["data"].rpartition(":")
+                    _remember(jti, float(exp))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Session revocation listener disconnected: {str(e)}")
+        finally:
+            # Revocations may be missed while disconnected
+            _synced = False
+        await asyncio.sleep(1)
+
+
+def start_listener():
+    """Mirror revocations locally. Must be called on the event loop."""
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_listener():
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
@@ -0,0 +1,207 @@
+"""
+Encoding of the session:{id} vault in Redis.
+
+The access/refresh JWTs kept in the vault never leave the server; only their
+claims were ever used. A session is therefore stored as the claims alone,
+in one short delimited string:
+
+    1:<t|u>:<sub>:<tenant_id>:<access exp>:<refresh exp>:<jti>:<mac>
+
+where the MAC is a truncated HMAC-SHA256 (SECRET_KEY) over the session id
+and the fields, so a vault can neither be forged nor copied to another
+session id. That is well under 150 bytes per session including the key, a
+fraction of the two signed JWTs and JSON it replaces.
+
+In stateless mode (SESSION_STATELESS) the client also holds the access
+claims, as a credential used in place of the session id:
+
+    1.<handle>.<t|u>.<sub>.<tenant_id>.<access exp>.<jti>.<mac>
+
+It is verified with the same MAC and needs no Redis read until it expires;
+the vault then only backs refresh. The vault is stored under an id derived
+from the handle with SECRET_KEY (vault_id), so a credential never reveals a
+vault key that could be presented as a plain session id.
+
+Legacy JSON vaults are still read (their JWTs verified as before) and are
+rewritten in the compact form on the next token refresh. Run
+`python -m app.utils.session_vault` to convert any still live in place.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import Dict, Any
+from fastapi import HTTPException
+from app.core.redis import redis_client
+from app.core.config import SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES
+from app.core.security import verify_token
+
+VERSION = "1"
+KINDS = {"tenant": "t", "user": "u"}
+_KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+MAC_BYTES = 12
+
+
+def vault_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def vault_id(handle: str) -> str:
+    """Vault session id behind a stateless credential's handle."""
+    digest = hmac.new(SECRET_KEY.encode(), f"vault:{handle}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def _mac(session_id: str, body: str) -> str:
+    digest = hmac.new(SECRET_KEY.encode(), f"{session_id}:{body}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:MAC_BYTES]).decode().rstrip("=")
+
+
+def issue(kind: str, subject: int, tenant_id: int) -> Dict[str, Any]:
+    """Fresh claims for a login or a refresh."""
+    now = int(time.time())
+    return {
+        "type": kind,
+        "sub": int(subject),
+        "tenant_id": int(tenant_id),
+        "jti": secrets.token_urlsafe(6),
+        "access_exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "refresh_exp": now + REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def encode(session_id: str, claims: Dict[str, Any]) -> str:
+    body = ":".join([
+        VERSION,
+        KINDS[claims["type"]],
+        str(claims["sub"]),
+        str(claims["tenant_id"]),
+        str(claims["access_exp"]),
+        str(claims["refresh_exp"]),
+        claims["jti"],
+    ])
+    return f"{body}:{_mac(session_id, body)}"
+
+
+def _decode_legacy(raw: str) -> Dict[str, Any]:
+    try:
+        vault = json.loads(raw)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=401, detail="Invalid Session Data")
+
+    access = verify_token(vault.get("access_token")) if vault.get("access_token") else None
+    refresh = verify_token(vault.get("refresh_token")) if vault.get("refresh_token") else None
+    if access is not None and access.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+
+    kind = vault.get("type") or vault.get("role")
+    subject = vault.get("user_id")
+    tenant_id = vault.get("tenant_id")
+    if tenant_id is None:
+        # Tenant vaults never stored it: the tenant is the subject
+        tenant_id = subject if kind == "tenant" else (access or refresh or {}).get("tenant_id")
+    if kind not in KINDS or subject is None or tenant_id is None:
+        raise HTTPException(status_code=401, detail="Tenant identity not found")
+
+    return {
+        "type": kind,
+        "sub": int(subject),
+        "tenant_id": int(tenant_id),
+        # Legacy jtis are uuids; the short form keeps migrated vaults compact
+        "jti": (access or refresh or {}).get("jti", "").replace("-", "")[:8],
+        # An expired or missing token simply reads as expired
+        "access_exp": int(access["exp"]) if access else 0,
+        "refresh_exp": int(refresh["exp"]) if refresh else 0,
+    }
+
+
+def decode(session_id: str, raw) -> Dict[str, Any]:
+    """Claims of a stored vault in either format; 401 if missing or tampered with."""
+    if not raw:
+        raise HTTPException(status_code=401, detail="Invalid Session")
+    if raw.startswith("{"):
+        return _decode_legacy(raw)
+
+    body, _, mac = raw.rpartition(":")
+    parts = body.split(":")
+    if len(parts) != 7 or parts[0] != VERSION or parts[1] not in _KIND_NAMES:
+        raise HTTPException(status_code=401, detail="Invalid Session Data")
+    if not hmac.compare_digest(mac, _mac(session_id, body)):
+        raise HTTPException(status_code=401, detail="Invalid Session Data")
+
+    _, kind, subject, tenant_id, access_exp, refresh_exp, jti = parts
+    return {
+        "type": _KIND_NAMES[kind],
+        "sub": int(subject),
+        "tenant_id": int(tenant_id),
+        "jti": jti,
+        "access_exp": int(access_exp),
+        "refresh_exp": int(refresh_exp),
+    }
+
+
+def is_credential(value: str) -> bool:
+    return value.startswith(VERSION + ".")
+
+
+def credential(handle: str, claims: Dict[str, Any]) -> str:
+    body = ".".join([
+        VERSION,
+        handle,
+        KINDS[claims["type"]],
+        str(claims["sub"]),
+        str(claims["tenant_id"]),
+        str(claims["access_exp"]),
+        claims["jti"],
+    ])
+    return f"{body}.{_mac(handle, body)}"
+
+
+def read_credential(value: str) -> Dict[str, Any]:
+    """Claims (plus handle and vault session_id) of a stateless credential; expiry is left to the caller."""
+    body, _, mac = value.rpartition(".")
+    parts = body.split(".")
+    if len(parts) != 7 or parts[0] != VERSION or parts[2] not in _KIND_NAMES:
+        raise HTTPException(status_code=401, detail="Invalid Session")
+    _, handle, kind, subject, tenant_id, access_exp, jti = parts
+    if not hmac.compare_digest(mac, _mac(handle, body)):
+        raise HTTPException(status_code=401, detail="Invalid Session")
+    return {
+        "handle": handle,
+        "session_id": vault_id(handle),
+        "type": _KIND_NAMES[kind],
+        "sub": int(subject),
+        "tenant_id": int(tenant_id),
+        "jti": jti,
+        "access_exp": int(access_exp),
+    }
+
+
+def migrate_legacy(batch_size: int = 1000) -> Dict[str, int]:
+    """Rewrite every live legacy JSON vault in the compact form, keeping its TTL."""
+    counts = {"scanned": 0, "migrated": 0, "dropped": 0}
+    for key in redis_client.scan_iter(match="session:*", count=batch_size):
+        counts["scanned"] += 1
+        raw = redis_client.get(key)
+        if not raw or not raw.startswith("{"):
+            continue
+        session_id = key[len("session:"):]
+        try:
+            claims = decode(session_id, raw)
+        except HTTPException:
+            # Unreadable legacy vaults could never be used again anyway
+            redis_client.delete(key)
+            counts["dropped"] += 1
+            continue
+        ttl = redis_client.ttl(key)
+        if ttl > 0:
+            # SET XX so a logout racing the migration isn't undone
+            redis_client.set(key, encode(session_id, claims), ex=ttl, xx=True)
+            counts["migrated"] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    print(migrate_legacy())
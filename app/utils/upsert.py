@@ -0,0 +1,24 @@
+from typing import List, Dict, Any
+
+
+def dialect_insert(dialect: str):
+    """The dialect's INSERT construct, and whether it is MySQL-flavoured (ON DUPLICATE KEY)."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        return insert, True
+    else:
+        raise RuntimeError(f"No upsert support for dialect {dialect}")
+    return insert, False
+
+
+def insert_ignore(dialect: str, model, values: List[Dict[str, Any]], index_elements: List[str]):
+    """INSERT ... ON CONFLICT DO NOTHING; rowcount is the number of rows actually inserted."""
+    insert, mysql = dialect_insert(dialect)
+    stmt = insert(model).values(values)
+    if mysql:
+        return stmt.prefix_with("IGNORE")
+    return stmt.on_conflict_do_nothing(index_elements=index_elements)
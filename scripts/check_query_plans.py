@@ -0,0 +1,198 @@
+"""
+Fail if any crud query falls back to a full table scan.
+
+Seeds a throwaway SQLite database from the models, runs every read path in
+app/crud (plus the shared login and entitlement queries) while recording the
+SQL they emit, and checks EXPLAIN QUERY PLAN for each statement.
+
+    python scripts/check_query_plans.py
+
+Exits 1 and prints the offending plans if an unexpected scan is found.
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Must be set before app.core.database builds its engine
+_workdir = tempfile.mkdtemp(prefix="query_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/plans.db"
+
+from sqlalchemy import event, insert, select
+
+from app.core.database import engine, SessionLocal, Base
+from app.models.models import (
+    Tenant, User, Role, Product, TenantProductMapping,
+    AppRoleMapping, RoleUserMapping, TokenUsageStorage, TokenUsageDaily
+)
+from app.crud import crud4arm, crud4role, crud4rum, crud4super, crud4tent, crud4tpm, crud4user, product
+from app.service import entitlements, login_identity, usage_analytics
+
+TENANTS = 20
+USERS_PER_TENANT = 250
+ROLES_PER_TENANT = 10
+PRODUCTS = 100
+PRODUCTS_PER_TENANT = 20
+USAGE_ROWS = 20000
+
+# "SCAN users" is a full table scan; "SCAN users USING INDEX ..." is not
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+TABLES = set(Base.metadata.tables)
+
+
+def seed(db):
+    now = datetime.now(timezone.utc)
+    db.execute(insert(Tenant), [
+        {"tenant_id": t, "name": f"tenant{t}", "email": f"owner@tenant{t}.test", "hashed_password": "x"}
+        for t in range(1, TENANTS + 1)
+    ])
+    db.execute(insert(Product), [
+        {"product_id": p, "product_name": f"product {p}", "launch_url": "https://example.test", "price": p}
+        for p in range(1, PRODUCTS + 1)
+    ])
+    users, roles, tpms, arms, rums = [], [], [], [], []
+    for t in range(1, TENANTS + 1):
+        role_base = (t - 1) * ROLES_PER_TENANT
+        for r in range(1, ROLES_PER_TENANT + 1):
+            roles.append({"role_id": role_base + r, "role_name": f"role{r}", "tenant_id": t})
+        for p in range(1, PRODUCTS_PER_TENANT + 1):
+            product_id = (t + p) % PRODUCTS + 1
+            tpms.append({"tenant_id": t, "product_id": product_id})
+            arms.append({"tenant_id": t, "product_id": product_id, "role_id": role_base + p % ROLES_PER_TENANT + 1})
+        for u in range(1, USERS_PER_TENANT + 1):
+            user_id = (t - 1) * USERS_PER_TENANT + u
+            users.append({"user_id": user_id, "username": f"user{u}", "email": f"user{u}@shared.test", "tenant_id": t, "hashed_password": "x"})
+            rums.append({"user_id": user_id, "role_id": role_base + u % ROLES_PER_TENANT + 1, "tenant_id": t})
+    db.execute(insert(User), users)
+    db.execute(insert(Role), roles)
+    db.execute(insert(TenantProductMapping), tpms)
+    db.execute(insert(AppRoleMapping), arms)
+    db.execute(insert(RoleUserMapping), rums)
+    db.execute(insert(TokenUsageStorage), [
+        {
+            "token": f"token-{i}",
+            "tenant_id": i % TENANTS + 1,
+            "user_id": i % (TENANTS * USERS_PER_TENANT) + 1,
+            "product_id": i % PRODUCTS + 1,
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(USAGE_ROWS)
+    ])
+    db.execute(insert(TokenUsageDaily), [
+        {"day": (now - timedelta(days=d)).date(), "tenant_id": t, "product_id": p, "user_id": u, "launches": 1}
+        for d in range(60) for t in range(1, TENANTS + 1) for p in range(1, 4) for u in range(0, 3)
+    ])
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")
+
+
+def checks(db):
+    """(label, call, reason a full scan is acceptable or None)"""
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    return [
+        ("product.get_all_products", lambda: product.get_all_products(db), "unfiltered catalog listing"),
+        ("product.get_all_products(product_name)", lambda: product.get_all_products(db, product_name="duct 4"), None),
+        ("product.get_product_by_id", lambda: product.get_product_by_id(db, 7), None),
+        ("product.get_tenant_products", lambda: product.get_tenant_products(db, 3), None),
+        ("product.get_tenant_products(product_name)", lambda: product.get_tenant_products(db, 3, product_name="duct"), None),
+        ("product.get_tenant_product_by_id", lambda: product.get_tenant_product_by_id(db, 3, 5), None),
+        ("crud4arm.get_all_app_role_mappings", lambda: crud4arm.get_all_app_role_mappings(db, 3), None),
+        ("crud4arm.get_all_app_role_mappings(product_id)", lambda: crud4arm.get_all_app_role_mappings(db, 3, product_id=5), None),
+        ("crud4arm.get_all_app_role_mappings(role_id)", lambda: crud4arm.get_all_app_role_mappings(db, 3, role_id=22), None),
+        ("crud4arm.get_app_role_mapping_by_id", lambda: crud4arm.get_app_role_mapping_by_id(db, 11, 3), None),
+        ("crud4rum.get_all_role_user_mappings", lambda: crud4rum.get_all_role_user_mappings(db, 3), None),
+        ("crud4rum.get_all_role_user_mappings(user_id)", lambda: crud4rum.get_all_role_user_mappings(db, 3, user_id=510), None),
+        ("crud4rum.get_all_role_user_mappings(role_id)", lambda: crud4rum.get_all_role_user_mappings(db, 3, role_id=22), None),
+        ("crud4rum.get_role_user_mapping_by_id", lambda: crud4rum.get_role_user_mapping_by_id(db, 40, 3), None),
+        ("crud4role.get_role_by_id", lambda: crud4role.get_role_by_id(db, 22, 3), None),
+        ("crud4role.get_all_roles", lambda: crud4role.get_all_roles(db, 3), None),
+        ("crud4role.get_all_roles(role_name)", lambda: crud4role.get_all_roles(db, 3, role_name="ole1"), None),
+        ("crud4tent.get_user_by_id", lambda: crud4tent.get_user_by_id(db, 510, 3), None),
+        ("crud4tent.get_all_users", lambda: crud4tent.get_all_users(db, 3), None),
+        ("crud4tent.get_all_users(name, email)", lambda: crud4tent.get_all_users(db, 3, name="ser1", email="shared"), None),
+        ("crud4tpm.get_all_tenant_product_maps", lambda: crud4tpm.get_all_tenant_product_maps(db, 3), None),
+        ("crud4tpm.get_all_tenant_product_maps(product_id)", lambda: crud4tpm.get_all_tenant_product_maps(db, 3, product_id=5), None),
+        ("crud4tpm.get_tenant_product_map_by_id", lambda: crud4tpm.get_tenant_product_map_by_id(db, 41, 3), None),
+        ("crud4super.get_all_tenant", lambda: crud4super.get_all_tenant(db), "unfiltered superadmin listing"),
+        ("crud4super.get_product_mappings_for_a_tenant", lambda: crud4super.get_product_mappings_for_a_tenant(db), "unfiltered superadmin listing"),
+        ("crud4super.get_product_mappings_for_a_tenant(tenant_id)", lambda: crud4super.get_product_mappings_for_a_tenant(db, 3), None),
+        ("crud4user.get_user_by_email", lambda: crud4user.get_user_by_email(db, "user7@shared.test"), None),
+        ("crud4user.get_user", lambda: crud4user.get_user(db, 510, 3), None),
+        ("entitlements product ids", lambda: db.execute(entitlements._product_ids_query(3, 510)).all(), None),
+        ("login candidates", lambda: db.execute(login_identity._candidates_query("user7@shared.test")).all(), None),
+        ("token usage window", lambda: db.execute(
+            select(TokenUsageStorage.product_id)
+            .where(TokenUsageStorage.tenant_id == 3, TokenUsageStorage.created_at >= since)
+        ).all(), None),
+        ("usage_analytics.usage_report(tenant, product)", lambda: usage_analytics.usage_report(db, "product", tenant_id=3, top=5), None),
+        ("usage_analytics.usage_report(tenant, user)", lambda: usage_analytics.usage_report(db, "user", tenant_id=3), None),
+        ("usage_analytics.usage_report(day)", lambda: usage_analytics.usage_report(db, "day"), None),
+        ("token usage prune batch", lambda: db.execute(
+            select(TokenUsageStorage.id).where(TokenUsageStorage.created_at < since).limit(5000)
+        ).all(), None),
+    ]
+
+
+def full_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scanned = []
+    for row in plan:
+        detail = row[-1]
+        match = FULL_SCAN.match(detail)
+        # Aliases like users_1 come from eager loads; anon_1 etc. are subqueries
+        if match and re.sub(r"_\d+$", "", match.group(1)) in TABLES:
+            scanned.append(detail)
+        elif "AUTOMATIC" in detail:
+            # SQLite built a throwaway index because a real one is missing
+            scanned.append(detail)
+    return scanned, [row[-1] for row in plan]
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    seed(db)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    for label, call, allowed in checks(db):
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            call()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        with engine.connect() as conn:
+            for statement, parameters in captured:
+                scanned, plan = full_scans(conn, statement, parameters)
+                if not scanned:
+                    print(f"ok    {label}")
+                elif allowed:
+                    print(f"allow {label}: {allowed}")
+                else:
+                    failures += 1
+                    print(f"FAIL  {label}")
+                    print("      " + " ".join(statement.split()))
+                    for line in plan:
+                        print(f"      | {line}")
+    db.close()
+
+    if failures:
+        print(f"\n{failures} statement(s) fall back to a full table scan")
+        return 1
+    print("\nNo unexpected full table scans")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Shared test setup.
+
+Redis is replaced by fakeredis before any app module binds a client (the
+Lua scripts need fakeredis' lupa support), and the database is a throwaway
+SQLite file. Async tests run on anyio's pytest plugin; the mailer tests
+also need aiosmtpd. All of it is in requirements-dev.txt:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+import app.core.redis
+
+_server = fakeredis.FakeServer()
+app.core.redis.redis_client = fakeredis.FakeRedis(server=_server, decode_responses=True)
+app.core.redis.async_redis_client = fakeredis.aioredis.FakeRedis(server=_server, decode_responses=True)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def redis():
+    app.core.redis.redis_client.flushall()
+    yield app.core.redis.redis_client
@@ -0,0 +1,41 @@
+import pytest
+
+from app.core.database import Base, SessionLocal, engine
+from app.crud import product as product_crud
+from app.models.models import Tenant, User, Role, Product, RoleUserMapping, AppRoleMapping
+from app.service import entitlements
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        yield session
+    Base.metadata.drop_all(bind=engine)
+
+
+def _grant(db) -> tuple:
+    tenant = Tenant(name="acme", email="ops@acme.test")
+    product = Product(product_name="crm", launch_url="https://crm.test")
+    db.add_all([tenant, product])
+    db.flush()
+    user = User(username="ann", email="ann@acme.test", tenant_id=tenant.tenant_id)
+    role = Role(role_name="sales", tenant_id=tenant.tenant_id)
+    db.add_all([user, role])
+    db.flush()
+    db.add_all([
+        RoleUserMapping(user_id=user.user_id, role_id=role.role_id, tenant_id=tenant.tenant_id),
+        AppRoleMapping(product_id=product.product_id, role_id=role.role_id, tenant_id=tenant.tenant_id),
+    ])
+    db.commit()
+    return tenant.tenant_id, user.user_id, product.product_id
+
+
+def test_deleting_a_product_drops_it_from_cached_entitlements(db):
+    tenant_id, user_id, product_id = _grant(db)
+    assert entitlements.has_product_access(db, tenant_id, user_id, product_id)
+
+    product_crud.delete_product(db, product_id)
+
+    assert not entitlements.has_product_access(db, tenant_id, user_id, product_id)
+    assert entitlements.user_product_ids(db, tenant_id, user_id) == set()
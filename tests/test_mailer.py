@@ -0,0 +1,156 @@
+import asyncio
+import socket
+import threading
+from email.message import EmailMessage
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from fastapi import HTTPException
+from app.service import mailer
+
+pytestmark = pytest.mark.anyio
+
+
+class _Handler:
+    """Accepts mail, after refusing the first `busy` messages with a 451."""
+
+    def __init__(self):
+        self.busy = 0
+        self.received = []
+        self.release = threading.Event()
+        self.release.set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.busy:
+            self.busy -= 1
+            return "451 Try again later"
+        # The server runs on its own thread and loop, so blocking here is fine
+        self.release.wait(5)
+        self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    handler = _Handler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(mailer, "SMTP_HOST", controller.hostname)
+    monkeypatch.setattr(mailer, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(mailer, "SMTP_START_TLS", False)
+    monkeypatch.setattr(mailer, "SMTP_USER", "")
+    monkeypatch.setattr(mailer, "EMAIL_RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(mailer, "EMAIL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(mailer, "_stats", dict.fromkeys(mailer._stats, 0))
+    yield handler
+    handler.release.set()
+    controller.stop()
+
+
+@pytest.fixture
+async def running_mailer(smtp):
+    mailer.start_mailer()
+    yield mailer
+    await mailer.stop_mailer()
+
+
+def _message(to: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = to
+    message["Subject"] = "Test"
+    message.set_content("hello")
+    return message
+
+
+async def test_transient_failures_are_retried(smtp):
+    smtp.busy = 2
+    failed = []
+
+    async def on_failure(message):
+        failed.append(message["To"])
+
+    await mailer.enqueue(_message("a@example.com"), on_failure)
+
+    assert smtp.received == ["a@example.com"]
+    assert mailer.stats()["retries"] == 2
+    assert mailer.stats()["sent"] == 1
+    assert failed == []
+
+
+async def test_transient_failures_give_up_after_max_attempts(smtp):
+    smtp.busy = 10
+    failed = []
+
+    async def on_failure(message):
+        failed.append(message["To"])
+
+    await mailer.enqueue(_message("a@example.com"), on_failure)
+
+    assert smtp.received == []
+    assert mailer.stats()["retries"] == mailer.EMAIL_MAX_ATTEMPTS - 1
+    assert failed == ["a@example.com"]
+
+
+async def test_permanent_rejection_is_not_retried(smtp):
+    failed = []
+
+    async def on_failure(message):
+        failed.append(message["To"])
+
+    await mailer.enqueue(_message("bounce@example.com"), on_failure)
+
+    assert failed == ["bounce@example.com"]
+    assert mailer.stats()["retries"] == 0
+    assert mailer.stats()["failed"] == 1
+
+
+async def test_full_queue_is_rejected_with_503(smtp, monkeypatch):
+    monkeypatch.setattr(mailer, "SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(mailer, "EMAIL_QUEUE_MAX", 1)
+    # Hold the only worker inside its first send so nothing else leaves the queue
+    smtp.release.clear()
+    mailer.start_mailer()
+    try:
+        await mailer.enqueue(_message("first@example.com"))
+        for _ in range(100):
+            if mailer.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        await mailer.enqueue(_message("second@example.com"))
+
+        with pytest.raises(HTTPException) as exc:
+            await mailer.enqueue(_message("third@example.com"))
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"]
+        assert mailer.stats()["rejected"] == 1
+    finally:
+        smtp.release.set()
+        await mailer.stop_mailer()
+
+    assert sorted(smtp.received) == ["first@example.com", "second@example.com"]
+
+
+async def test_shutdown_drains_the_queue(smtp, running_mailer):
+    for index in range(5):
+        await mailer.enqueue(_message(f"user{index}@example.com"))
+
+    await mailer.stop_mailer()
+
+    assert sorted(smtp.received) == sorted(f"user{index}@example.com" for index in range(5))
+    assert mailer.stats()["running"] is False
+    assert mailer.stats()["pending"] == 0
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import dns.resolver
+import pytest
+
+from app.utils import mx_resolver
+
+pytestmark = pytest.mark.anyio
+
+
+class _Answer(list):
+    def __init__(self, records, ttl):
+        super().__init__(records)
+        self.rrset = SimpleNamespace(ttl=ttl)
+
+
+class _StubResolver:
+    """Answers MX queries from a dict: domain -> (exchanges, ttl) or an exception."""
+
+    def __init__(self, answers, gate: asyncio.Event = None):
+        self.answers = answers
+        self.gate = gate
+        self.queries = []
+
+    async def resolve(self, name, rdtype):
+        self.queries.append(name)
+        if self.gate is not None:
+            await self.gate.wait()
+        answer = self.answers[name]
+        if isinstance(answer, Exception):
+            raise answer
+        exchanges, ttl = answer
+        records = [SimpleNamespace(exchange=exchange) for exchange in exchanges]
+        return _Answer(records, ttl)
+
+
+@pytest.fixture
+def stub():
+    def install(answers, gate=None):
+        resolver = _StubResolver(answers, gate)
+        mx_resolver.set_resolver(resolver)
+        return resolver
+    yield install
+    mx_resolver.set_resolver(None)
+
+
+def _cached_for(domain: str) -> float:
+    return mx_resolver._entries[domain][0] - time.time()
+
+
+async def test_positive_ttl_is_clamped(stub):
+    stub({"short.example": (["mx.short.example."], 1), "long.example": (["mx.long.example."], 10 ** 7)})
+
+    assert await mx_resolver.mx_problem("short.example") is None
+    assert await mx_resolver.mx_problem("long.example") is None
+
+    assert _cached_for("short.example") == pytest.approx(mx_resolver.MX_CACHE_MIN_SECONDS, abs=5)
+    assert _cached_for("long.example") == pytest.approx(mx_resolver.MX_CACHE_MAX_SECONDS, abs=5)
+
+
+async def test_answers_are_served_from_cache(stub):
+    resolver = stub({"cached.example": (["mx.cached.example."], 300)})
+
+    for _ in range(3):
+        assert await mx_resolver.mx_problem("Cached.Example.") is None
+
+    assert resolver.queries == ["cached.example"]
+
+
+async def test_missing_domains_are_cached_negatively(stub):
+    resolver = stub({"gone.example": dns.resolver.NXDOMAIN(), "nomx.example": dns.resolver.NoAnswer()})
+
+    assert await mx_resolver.mx_problem("gone.example") == mx_resolver.NO_DOMAIN
+    assert await mx_resolver.mx_problem("gone.example") == mx_resolver.NO_DOMAIN
+    assert await mx_resolver.mx_problem("nomx.example") == mx_resolver.NO_MX
+
+    assert resolver.queries == ["gone.example", "nomx.example"]
+    assert _cached_for("gone.example") == pytest.approx(mx_resolver.MX_NEGATIVE_CACHE_SECONDS, abs=5)
+
+
+async def test_null_mx_is_rejected(stub):
+    stub({"nomail.example": (["."], 300)})
+
+    assert await mx_resolver.mx_problem("nomail.example") == mx_resolver.NULL_MX
+
+
+async def test_timeouts_are_not_cached(stub):
+    resolver = stub({"slow.example": dns.resolver.Timeout()})
+
+    assert await mx_resolver.mx_problem("slow.example") == mx_resolver.TIMEOUT
+    assert await mx_resolver.mx_problem("slow.example") == mx_resolver.TIMEOUT
+
+    assert resolver.queries == ["slow.example", "slow.example"]
+    assert "slow.example" not in mx_resolver._entries
+
+
+async def test_concurrent_checks_share_one_lookup(stub):
+    gate = asyncio.Event()
+    resolver = stub({"busy.example": (["mx.busy.example."], 300)}, gate)
+
+    checks = [asyncio.ensure_future(mx_resolver.mx_problem("busy.example")) for _ in range(20)]
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await asyncio.gather(*checks) == [None] * 20
+    assert resolver.queries == ["busy.example"]
+    assert mx_resolver.stats()["in_flight"] == 0
+
+
+async def test_cancelled_check_does_not_cancel_the_shared_lookup(stub):
+    gate = asyncio.Event()
+    resolver = stub({"shared.example": (["mx.shared.example."], 300)}, gate)
+
+    first = asyncio.ensure_future(mx_resolver.mx_problem("shared.example"))
+    second = asyncio.ensure_future(mx_resolver.mx_problem("shared.example"))
+    await asyncio.sleep(0)
+    first.cancel()
+    gate.set()
+
+    assert await second is None
+    assert resolver.queries == ["shared.example"]
+
+
+async def test_known_providers_skip_dns(stub):
+    resolver = stub({})
+
+    assert await mx_resolver.mx_problem("gmail.com") is None
+    assert resolver.queries == []
+
+
+@pytest.mark.parametrize("entry, expected", [
+    ("127.0.0.1", ("127.0.0.1", 53)),
+    ("127.0.0.1:5353", ("127.0.0.1", 5353)),
+    ("::1", ("::1", 53)),
+    ("2001:db8::1", ("2001:db8::1", 53)),
+    ("[::1]:5353", ("::1", 5353)),
+    ("[2001:db8::1]", ("2001:db8::1", 53)),
+])
+def test_nameserver_entries(entry, expected):
+    assert mx_resolver._parse_nameserver(entry) == expected
+
+
+@pytest.mark.parametrize("entry", ["dns.example", "1.2.3.4:dns", "[::1]5353", "[::1]:"])
+def test_invalid_nameserver_entries(entry):
+    with pytest.raises(ValueError):
+        mx_resolver._parse_nameserver(entry)
+
+
+def test_configured_nameservers_keep_their_ports(monkeypatch):
+    monkeypatch.setattr(mx_resolver, "MX_NAMESERVERS", "127.0.0.1:5353, [::1]:5354, 2001:db8::1")
+
+    resolver = mx_resolver._default_resolver()
+
+    assert [(server.address, server.port) for server in resolver.nameservers] == [
+        ("127.0.0.1", 5353), ("::1", 5354), ("2001:db8::1", 53)
+    ]
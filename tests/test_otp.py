@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.service import otp as otp_service
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "otp@example.com"
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Codes "emailed" so far, newest last; no DNS or SMTP involved."""
+    codes = []
+
+    async def validate(email):
+        return email
+
+    async def send(email, code, on_failure=None):
+        codes.append(code)
+
+    monkeypatch.setattr(otp_service, "validate_email_address", validate)
+    monkeypatch.setattr(otp_service, "send_otp_email", send)
+    return codes
+
+
+def _wrong(code: str) -> str:
+    return "000000" if code != "000000" else "111111"
+
+
+async def _rejected(call) -> HTTPException:
+    with pytest.raises(HTTPException) as exc:
+        await call
+    return exc.value
+
+
+async def test_cooldown_race_has_one_winner(sent):
+    results = await asyncio.gather(
+        otp_service.request_otp_service(EMAIL),
+        otp_service.request_otp_service(EMAIL),
+        return_exceptions=True,
+    )
+
+    assert len([result for result in results if isinstance(result, dict)]) == 1
+    [error] = [result for result in results if isinstance(result, HTTPException)]
+    assert error.status_code == 429
+    assert len(sent) == 1
+
+
+async def test_cooldown_retry_after(sent):
+    await otp_service.request_otp_service(EMAIL)
+
+    error = await _rejected(otp_service.request_otp_service(EMAIL))
+
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) == otp_service.OTP_COOLDOWN_SECONDS
+
+
+async def test_code_is_burned_on_success(sent, redis):
+    await otp_service.request_otp_service(EMAIL)
+
+    result = await otp_service.verify_otp_service(EMAIL, sent[-1])
+
+    assert result["email"] == EMAIL
+    assert redis.get(f"verified_email:{EMAIL}") == "true"
+    error = await _rejected(otp_service.verify_otp_service(EMAIL, sent[-1]))
+    assert error.status_code == 400
+
+
+async def test_wrong_codes_count_across_resends(sent, redis):
+    await otp_service.request_otp_service(EMAIL)
+    error = await _rejected(otp_service.verify_otp_service(EMAIL, _wrong(sent[-1])))
+    assert error.status_code == 400
+    assert f"{otp_service.OTP_MAX_ATTEMPTS - 1} attempt(s) left" in error.detail
+
+    # A fresh code does not reset the count
+    redis.delete(f"otp_cooldown:{EMAIL}")
+    await otp_service.request_otp_service(EMAIL)
+    error = await _rejected(otp_service.verify_otp_service(EMAIL, _wrong(sent[-1])))
+    assert f"{otp_service.OTP_MAX_ATTEMPTS - 2} attempt(s) left" in error.detail
+
+
+async def test_lockout_blocks_verify_and_issue(sent, redis):
+    await otp_service.request_otp_service(EMAIL)
+    code = sent[-1]
+
+    for _ in range(otp_service.OTP_MAX_ATTEMPTS - 1):
+        error = await _rejected(otp_service.verify_otp_service(EMAIL, _wrong(code)))
+        assert error.status_code == 400
+    error = await _rejected(otp_service.verify_otp_service(EMAIL, _wrong(code)))
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) == otp_service.OTP_LOCKOUT_SECONDS
+
+    # Even the right code is refused, and it was burned with the lockout
+    error = await _rejected(otp_service.verify_otp_service(EMAIL, code))
+    assert error.status_code == 429
+    assert redis.get(f"otp:{EMAIL}") is None
+
+    redis.delete(f"otp_cooldown:{EMAIL}")
+    error = await _rejected(otp_service.request_otp_service(EMAIL))
+    assert error.status_code == 429
+    assert 0 < int(error.headers["Retry-After"]) <= otp_service.OTP_LOCKOUT_SECONDS
+    assert len(sent) == 1
+
+
+async def test_lockout_expires(sent, redis):
+    redis.set(f"otp_lock:{EMAIL}", "1", px=1)
+    await asyncio.sleep(0.01)
+
+    result = await otp_service.request_otp_service(EMAIL)
+
+    assert result["email"] == EMAIL
+    assert len(sent) == 1
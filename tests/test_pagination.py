@@ -0,0 +1,36 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils import pagination
+
+
+def _status(call) -> int:
+    with pytest.raises(HTTPException) as exc:
+        call()
+    return exc.value.status_code
+
+
+def test_cursor_round_trips_with_its_kind():
+    assert pagination.decode_cursor(pagination.encode_cursor(41)) == 41
+    assert pagination.decode_cursor(pagination.encode_cursor(20, pagination.RANKED), pagination.RANKED) == 20
+
+
+def test_cursor_of_the_other_kind_is_rejected():
+    keyset = pagination.encode_cursor(41)
+    ranked = pagination.encode_cursor(20, pagination.RANKED)
+
+    assert _status(lambda: pagination.decode_cursor(keyset, pagination.RANKED)) == 400
+    assert _status(lambda: pagination.decode_cursor(ranked)) == 400
+
+
+def test_ranked_page_hands_out_ranked_cursors():
+    page_ids, next_cursor = pagination._ranked_page([5, 3, 9], 2, None)
+
+    assert page_ids == [5, 3]
+    assert pagination._ranked_page([5, 3, 9], 2, next_cursor) == ([9], None)
+    assert _status(lambda: pagination._ranked_page([5, 3, 9], 2, pagination.encode_cursor(3))) == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "a", "MTI"])
+def test_garbage_cursor_is_rejected(cursor):
+    assert _status(lambda: pagination.decode_cursor(cursor)) == 400
@@ -0,0 +1,44 @@
+import pytest
+
+from app.utils import rate_limit
+
+pytestmark = pytest.mark.anyio
+
+
+def _receiver(chunks):
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    read = []
+
+    async def receive():
+        read.append(messages[len(read)])
+        return read[-1]
+
+    return receive, read
+
+
+async def test_small_body_is_read_whole():
+    receive, read = _receiver([b'{"email":', b' "a@b.c"}'])
+
+    buffered, body = await rate_limit._read_body(receive, 64)
+
+    assert body == b'{"email": "a@b.c"}'
+    assert buffered == read
+
+
+async def test_large_body_stops_past_the_cap():
+    receive, read = _receiver([b"x" * 40, b"x" * 40, b"x" * 40, b"x" * 40])
+
+    buffered, body = await rate_limit._read_body(receive, 64)
+
+    assert body is None
+    assert len(read) == 2 and buffered == read
+
+
+async def test_tenant_key_fails_open_when_sessions_are_unreachable(monkeypatch):
+    async def unreachable(session_id):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(rate_limit, "get_session_identity_async", unreachable)
+    policy = rate_limit._Policy(0, {"path": "*", "key": "tenant", "rate": 1, "per": 1})
+
+    assert await rate_limit._key_for(policy, {}, {"session_id": ["s"]}, None) is None
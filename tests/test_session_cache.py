@@ -0,0 +1,47 @@
+import pytest
+
+from app.utils import session_cache, session_resolver, session_vault
+
+IDENTITY = {"tenant_id": 1, "user_id": 2, "role": "user", "type": "user"}
+
+
+@pytest.fixture(autouse=True)
+def listening(monkeypatch):
+    monkeypatch.setattr(session_cache, "_listening", True)
+    session_cache.clear()
+    yield
+    session_cache.clear()
+
+
+def test_put_is_cached():
+    session_cache.put("s1", IDENTITY, since=session_cache.epoch())
+
+    assert session_cache.get("s1") == IDENTITY
+
+
+def test_put_after_invalidation_is_dropped():
+    since = session_cache.epoch()
+    session_cache.invalidate("s1")
+
+    session_cache.put("s1", IDENTITY, since=since)
+
+    assert session_cache.get("s1") is None
+    assert session_cache.stats()["stale_puts"] == 1
+
+
+def test_logout_during_vault_read_is_not_re_cached(redis, monkeypatch):
+    claims = session_vault.issue("user", 2, 1)
+    redis.set(session_vault.vault_key("s1"), session_vault.encode("s1", claims))
+    real_get = redis.get
+
+    def get_then_logout(key):
+        # The vault was read just before a logout on another request
+        raw = real_get(key)
+        redis.delete(key)
+        session_cache.invalidate("s1")
+        return raw
+
+    monkeypatch.setattr(session_resolver.redis_client, "get", get_then_logout)
+    assert session_resolver.get_session_identity("s1")["user_id"] == 2
+
+    assert session_cache.get("s1") is None
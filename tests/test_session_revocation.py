@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from app.utils import session_revocation
+
+
+@pytest.fixture(autouse=True)
+def empty(monkeypatch):
+    monkeypatch.setattr(session_revocation, "_revoked", {})
+    monkeypatch.setattr(session_revocation, "_expiries", [])
+
+
+def test_expired_revocations_are_pruned():
+    now = time.time()
+    session_revocation._remember_many([("old", now + 0.01), ("live", now + 60)])
+    time.sleep(0.02)
+
+    session_revocation._remember("new", now + 60)
+
+    assert set(session_revocation._revoked) == {"live", "new"}
+    assert session_revocation._local_verdict("live")
+    assert not session_revocation._local_verdict("old")
+
+
+def test_later_revocation_of_the_same_jti_survives_the_earlier_expiry():
+    now = time.time()
+    session_revocation._remember("jti", now + 0.01)
+    session_revocation._remember("jti", now + 60)
+    time.sleep(0.02)
+
+    session_revocation._remember("other", now + 60)
+
+    assert session_revocation._local_verdict("jti")
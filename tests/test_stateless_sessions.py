@@ -0,0 +1,96 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.service import auth
+from app.utils import session_resolver, session_vault
+
+pytestmark = pytest.mark.anyio
+
+
+def _mode(monkeypatch, stateless: bool, accept_bare: bool = False):
+    for module in (auth, session_resolver):
+        monkeypatch.setattr(module, "SESSION_STATELESS", stateless)
+        monkeypatch.setattr(module, "SESSION_STATELESS_ACCEPT_BARE", accept_bare)
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    _mode(monkeypatch, True)
+
+
+async def _login() -> str:
+    # What login_service does once the password checks out
+    return await auth._store_session(str(uuid.uuid4()), session_vault.issue("user", 7, 3))
+
+
+async def _rejected(call) -> HTTPException:
+    with pytest.raises(HTTPException) as exc:
+        await call
+    assert exc.value.status_code == 401
+    return exc.value
+
+
+def _handle(credential: str) -> str:
+    return credential.split(".")[1]
+
+
+async def test_credential_resolves_without_exposing_the_vault_key(stateless, redis):
+    credential = await _login()
+
+    identity = await session_resolver.get_session_identity_async(credential)
+
+    assert identity["user_id"] == 7 and identity["tenant_id"] == 3
+    [key] = redis.keys("session:*")
+    assert key == session_vault.vault_key(session_vault.vault_id(_handle(credential)))
+    assert _handle(credential) not in key
+
+
+async def test_rotated_credential_is_rejected(stateless):
+    credential = await _login()
+    rotated = (await auth.refresh_token_service(credential))["session_id"]
+
+    assert (await session_resolver.get_session_identity_async(rotated))["user_id"] == 7
+    await _rejected(session_resolver.get_session_identity_async(credential))
+    # Only the latest credential may refresh
+    await _rejected(auth.refresh_token_service(credential))
+    assert (await auth.refresh_token_service(rotated))["session_id"]
+
+
+async def test_bare_ids_are_rejected(stateless):
+    credential = await _login()
+    rotated = (await auth.refresh_token_service(credential))["session_id"]
+
+    for bare in (_handle(credential), _handle(rotated), session_vault.vault_id(_handle(rotated))):
+        await _rejected(session_resolver.get_session_identity_async(bare))
+        await _rejected(auth.refresh_token_service(bare))
+        await _rejected(auth.logout_service(bare))
+        with pytest.raises(HTTPException):
+            session_resolver.get_session_identity(bare)
+
+
+async def test_logged_out_credential_is_rejected(stateless, redis):
+    credential = await _login()
+
+    await auth.logout_service(credential)
+
+    await _rejected(session_resolver.get_session_identity_async(credential))
+    await _rejected(auth.refresh_token_service(credential))
+    assert redis.keys("session:*") == []
+
+
+async def test_rollout_moves_pre_switch_sessions_to_credentials(monkeypatch, redis):
+    _mode(monkeypatch, False)
+    session_id = await _login()
+
+    _mode(monkeypatch, True, accept_bare=True)
+    assert (await session_resolver.get_session_identity_async(session_id))["user_id"] == 7
+    credential = (await auth.refresh_token_service(session_id))["session_id"]
+
+    assert session_vault.is_credential(credential)
+    assert (await session_resolver.get_session_identity_async(credential))["user_id"] == 7
+    # The old id's vault is gone, and the handle is no use as a plain id either
+    await _rejected(auth.refresh_token_service(session_id))
+    await _rejected(auth.refresh_token_service(_handle(credential)))
+    assert redis.keys("session:*") == [session_vault.vault_key(session_vault.vault_id(_handle(credential)))]
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.service import usage_writer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = asyncio.Queue(maxsize=3)
+    monkeypatch.setattr(usage_writer, "_queue", queue)
+    monkeypatch.setattr(usage_writer, "USAGE_ENQUEUE_TIMEOUT_SECONDS", 0.2)
+    return queue
+
+
+def _records(n: int):
+    return [usage_writer.usage_record(f"t{i}", 1, None, 1) for i in range(n)]
+
+
+async def test_batch_without_room_is_rejected_whole(queue):
+    queue.put_nowait({"token": "earlier"})
+    queue.put_nowait({"token": "earlier"})
+
+    with pytest.raises(HTTPException) as exc:
+        await usage_writer.enqueue_many(_records(2))
+
+    assert exc.value.status_code == 503
+    assert queue.qsize() == 2
+
+
+async def test_batch_waits_for_room(queue):
+    queue.put_nowait({"token": "earlier"})
+    queue.put_nowait({"token": "earlier"})
+
+    async def drain():
+        await asyncio.sleep(0.05)
+        queue.get_nowait()
+
+    await asyncio.gather(usage_writer.enqueue_many(_records(2)), drain())
+
+    assert [queue.get_nowait()["token"] for _ in range(queue.qsize())] == ["earlier", "t0", "t1"]
+
+
+async def test_batch_larger_than_the_queue_is_rejected(queue):
+    with pytest.raises(HTTPException):
+        await usage_writer.enqueue_many(_records(4))
+    assert queue.empty()
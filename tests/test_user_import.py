@@ -0,0 +1,10 @@
+import pytest
+
+from app.service import user_import
+
+
+def test_password_over_bcrypt_limit_is_invalid():
+    # 24 three-byte characters: 72 bytes is fine, one more byte is not
+    assert user_import._validate({"username": "ann", "email": "ann@example.com", "password": "€" * 24})
+    with pytest.raises(ValueError, match="72 bytes"):
+        user_import._validate({"username": "ann", "email": "ann@example.com", "password": "€" * 24 + "x"})